@@ -112,6 +112,104 @@ def optimal_set_for_capacity(product_sets, marginal_values):
         optimal_set.append(curr_opt_set)
     return optimal_set
 
+
+# Array-based version of efficient_sets(): the efficient sets are the vertices of the upper concave hull of the
+# (probability, revenue) points of all sets, starting from the empty set at (0, 0), up to the set with max revenue.
+# Uses O(n_sets log n_sets) time, instead of O(n_sets^2).
+def efficient_sets_hull(products, sets):
+    """
+    Parameter
+    ----------
+    products: 2D np array
+        contains products, each represented in the form of [product_name, expected_revenue], 
+        size n_products * 2
+    sets: 2D np array
+        contains sets of products, each consists of probabilities of every product
+        size n_sets * n_products
+        
+    Returns
+    -------
+    effi_sets: 2D np array
+        contains efficient sets, each in the form of [products_name, total_probability, total_expected_revenue]
+    """
+    
+    sets = np.asarray(sets, dtype=float).reshape(len(sets), len(products))
+    fares = np.array([p[1] for p in products], dtype=float)
+    probs = sets.sum(axis=1)
+    revenues = sets.dot(fares)
+
+    # sort by probability, and by revenue descending among sets with the same probability
+    order = np.lexsort((-revenues, probs))
+    hull = [-1]   # indices of the vertices on the hull, -1 as the empty set
+    hull_probs = [0.0]
+    hull_revs = [0.0]
+    for i in order:
+        if probs[i] <= hull_probs[-1] or revenues[i] <= hull_revs[-1]:
+            # dominated by the last vertex
+            continue
+        # remove the vertices not above the line from the previous vertex to this set, i.e. a set on the segment
+        # between two efficient sets has no higher marginal revenue ratio, and is not kept as efficient
+        while len(hull) > 1 and (hull_revs[-1] - hull_revs[-2]) * (probs[i] - hull_probs[-2]) <= \
+                (revenues[i] - hull_revs[-2]) * (hull_probs[-1] - hull_probs[-2]):
+            hull.pop()
+            hull_probs.pop()
+            hull_revs.pop()
+        hull.append(i)
+        hull_probs.append(probs[i])
+        hull_revs.append(revenues[i])
+
+    effi_sets = []
+    for i in hull[1:]:
+        set_name = ''.join(products[j][0] for j in np.flatnonzero(sets[i] > 0))
+        effi_sets.append([set_name, float(probs[i]), float(revenues[i])])
+    return effi_sets
+
+# Array-based version of optimal_set_for_capacity(), finds the index of the optimal set for every capacity x at once.
+def optimal_set_indices(probs, revenues, marginal_values):
+    """
+    Parameter
+    ----------
+    probs: np array
+        contains the total probability of each set, size n_product_sets
+    revenues: np array
+        contains the total expected revenue of each set, size n_product_sets
+    marginal_values: np array
+        contains expected marginal value of every capacity at time t+1, size n_capacity
+   
+    Returns
+    -------
+    optimal_set: np array
+        contains the index of the optimal set for each capacity, or -1 if no set is worth offering, size n_capacity
+    """
+    
+    probs = np.asarray(probs, dtype=float)
+    revenues = np.asarray(revenues, dtype=float)
+    marginal_values = np.asarray(marginal_values, dtype=float)
+    if len(probs) == 0:
+        return np.full(len(marginal_values), -1, dtype=int)
+    diffs = revenues - np.outer(marginal_values, probs)
+    optimal_set = np.argmax(diffs, axis=1)
+    optimal_set[diffs[np.arange(len(marginal_values)), optimal_set] <= 0] = -1
+    return optimal_set
+
+def optimal_sets_for_capacities(product_sets, marginal_values):
+    """
+    Parameter
+    ----------
+    product_sets: np array
+        contains product sets, each in the form of [product_name, prob, revenue], size n_product_sets
+    marginal_values: np array
+        contains expected marginal value of every capacity at time t+1, size n_capacity
+   
+    Returns
+    -------
+    optimal_set: np array
+        contains the name of the optimal set for capacity x, or -1 if no set is worth offering, size n_capacity
+    """
+    
+    indices = optimal_set_indices([s[1] for s in product_sets], [s[2] for s in product_sets], marginal_values)
+    return [product_sets[i][0] if i >= 0 else -1 for i in indices]
+
                                 
 # In nested policy, calculate the optimal protection levels for each (efficient) class, at the given time, 
 # given the result from value-function
@@ -202,6 +300,71 @@ def SINGLE_value_function(product_sets, total_capacity, max_time, arrival_rate):
         prev_V = curr_V
     return V
 
+# Vectorized version of SINGLE_value_function(), each period is computed for all capacities x at once.
+# If the product sets are efficient sets in order(e.g. from efficient_sets_hull()), the optimal set is monotone in the
+# marginal value of capacity, so it's found by a binary search over the breakpoints of the sets, instead of comparing
+# all sets for every x.
+def SINGLE_value_function_vectorized(product_sets, total_capacity, max_time, arrival_rate, decimals = None,
+                                     full = True):
+    """
+    Parameter
+    ----------
+    product_sets: np array
+        contains sets of products on offer, each in the form of [product_name, prob, revenue], size n_product_sets
+        where the prob(probability) and revenue are aggregated values
+    total_capacity(C): integer
+        the total capacity
+    max_time(T): integer
+        the number of time periods
+    arrival_rate: number
+        the probability of arrival of a request, assumed to be constant for all time periods
+    decimals: integer
+        number of decimals to round the values to in every period, as SINGLE_value_function() does with 3,
+        default as no rounding
+    full: boolean
+        whether to return the values of all time periods, or only of the first one, to save memory for large T and C
+    Returns
+    -------
+    value: 2D np array
+        contains the value functions, size (max_time + 1) * (total_capacity + 1),
+        or the value function of the first time period, size (total_capacity + 1), if not full
+    """
+    
+    product_sets = [s for s in product_sets if len(s) > 0]
+    if not product_sets:
+        V = np.zeros((max_time + 1, total_capacity + 1))
+        return V if full else V[0]
+    # one of the sets is always offered, as SINGLE_value_function() does
+    probs = np.array([s[1] for s in product_sets], dtype=float)
+    revenues = np.array([s[2] for s in product_sets], dtype=float)
+    prob_increments = np.diff(probs)
+    monotone = np.all(prob_increments > 0)
+    if monotone:
+        breakpoints = np.diff(revenues) / prob_increments  # the marginal revenue ratio of each set
+        monotone = np.all(np.diff(breakpoints) <= 0)
+
+    if full:
+        V = np.zeros((max_time + 1, total_capacity + 1))
+    prev_V = np.zeros(total_capacity + 1)
+    for t in reversed(range(max_time + 1)):
+        delta = np.diff(prev_V)  # the marginal cost of capacity in the next period
+        if monotone:
+            # the optimal set is the largest set whose marginal revenue ratio exceeds the marginal cost
+            optimal_set = np.searchsorted(-breakpoints, -delta)
+            max_obj_val = revenues[optimal_set] - probs[optimal_set] * delta
+        else:
+            max_obj_val = np.max(revenues - np.outer(delta, probs), axis=1)
+        curr_V = np.zeros(total_capacity + 1)
+        curr_V[1:] = prev_V[1:] + arrival_rate * max_obj_val
+        if decimals is not None:
+            curr_V = np.round(curr_V, decimals)
+        if full:
+            V[t] = curr_V
+        prev_V = curr_V
+    if full:
+        return V
+    return prev_V
+
 
 # effi_sets = [['Y', 0.3, 240], ['YK', 0.8, 465], ['YMK', 1, 505]]
 # values = calc_value_function(effi_sets, 10, 10, 0.2)
@@ -225,8 +388,8 @@ def SINGLE_value_function(product_sets, total_capacity, max_time, arrival_rate):
 
 # print(SINGLE_optimal_protection_levels(efficient_sets, values, 6))
 
-sets = [['AB', 0.5, 50.0]]
-print(SINGLE_value_function(sets, 1, 2, 2.5) )
+# sets = [['AB', 0.5, 50.0]]
+# print(SINGLE_value_function(sets, 1, 2, 2.5) )
 
 
 # In[2]:
@@ -712,14 +875,14 @@ def iterative_DAVN(products, resources, n_virtual_class, total_capacity, max_tim
 
 # products = [['AB', 0.5, 100], ['CD', 0.5, 100]]
 # products = [['AB', 0.05, 2000], ['CD', 0.25, 500], ['ABC', 0.5, 700], ['BCD', 0.2, 200]]
-products = [['AB', 0.2, 2000], ['CD', 0.1, 500], ['ABC', 0.5, 700], ['BCD', 0.2, 200]]
-resources =  ['AB', 'BC', 'CD']
-n_virtual_class = 2
+# products = [['AB', 0.2, 2000], ['CD', 0.1, 500], ['ABC', 0.5, 700], ['BCD', 0.2, 200]]
+# resources =  ['AB', 'BC', 'CD']
+# n_virtual_class = 2
 # static_price = [0.5, 0.5, 0.5]
 # disp_adjusted_revenue = calc_displacement_adjusted_revenue(products, resources, static_price)
 # calculate_value_function(products, resources, static_price, n_virtual_class, mean_demands, 10, 2, 0.5)
 
-iterative_DAVN(products, resources, n_virtual_class, 2, 10, 0.3, 8)
+# iterative_DAVN(products, resources, n_virtual_class, 2, 10, 0.3, 8)
 
 # network_DAVN_value_function(products, resources, static_price, n_virtual_class, mean_demands, 1, 2, 5)
 
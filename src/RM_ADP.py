@@ -3,11 +3,14 @@
 
 # In[37]:
 
+import concurrent.futures
 import numpy as np
+import scipy.optimize
+import scipy.sparse
 import scipy.stats
-import time
 import random
 import bisect
+import warnings
 
 import sys
 sys.path.append('.')
@@ -15,8 +18,9 @@ import RM_helper
 import RM_exact
 import RM_demand_model
 import RM_approx
+import RM_instrument
 
-import pulp
+pulp = RM_helper.lazy_import('pulp')
 
 
 # In[2]:
@@ -96,88 +100,87 @@ class One_state_transition():
             print("random = ", rand, " fall into ", fall_into)
         return sample_index
     
-    def calc_value_func(self, n_iterations):
-        prev_ests = [[0] * self.n_states for _ in range(self.total_time + 1)]
-        n = 1 # iteration counter 
-
-        while n <= n_iterations:
-            S_t = self.n_states - 1 # initial state
-            # Step 1, choose a sample path
-            if self.n_demand_periods == 1:
-                sampled_demands = self.sample_const_demands()
-            else:
-                sampled_demands = self.sample_change_demands()
-
-#             print("at n=",n, "sampled requests are:", sampled_demands)
+    def sample_demands_batch(self, n_paths):
+        """helper func: samples n_paths series of index of products, whose request arrives at each period in the 
+        given total time, size n_paths * total_time """
+        rand = np.random.random((n_paths, self.total_time))
+        sample_index = np.empty((n_paths, self.total_time), dtype=int)
+        for t in range(self.total_time):
+            demand_t = self.demands[0] if self.n_demand_periods == 1 else self.demands[t]
+            cumu_prob = self.cumulative_probs(demand_t)
+            sample_index[:, t] = np.searchsorted(cumu_prob, rand[:, t], side='right')
+        return sample_index
+    
+    def calc_value_func(self, n_iterations, batch_size = 1, step_size = 1.0):
+        """Estimate the value functions over n_iterations sample paths, processing batch_size paths at a time. 
+        After each batch, the estimate of every visited state is smoothed towards the average of the values observed 
+        there, using the step size, which is either a constant, or a function of the number of batches processed. 
+        The default step size 1 replaces estimates by the newly observed values. """
+        estimates = np.zeros((self.total_time + 1, self.n_states))
+        
+        states = RM_helper.state_table(self.capacities)
+        offsets = RM_helper.sell_offsets(self.incidence_matrix, self.capacities)
+        prices = np.array([p[1] for p in self.products], dtype=float)
+        # whether each product can be sold, based on the remaining capacities of each state
+        sellable = (states[:, None, :] >= np.array(self.incidence_matrix).T[None, :, :]).all(axis=2)
+        
+        n = 0 # iteration counter, i.e. number of sample paths processed
+        n_batches = 0
+        while n < n_iterations:
+            n_paths = min(batch_size, n_iterations - n)
+            n_batches += 1
+            alpha = step_size(n_batches) if callable(step_size) else step_size
+            
+            S_t = np.full(n_paths, self.n_states - 1) # initial state
+            # Step 1, choose sample paths
+            sampled_demands = self.sample_demands_batch(n_paths)
+            
             # Step 2, iterate over all time points
             for t in range(self.total_time):
-                current_estimation = prev_ests[:]
-                request_product = sampled_demands[t]
-                next_state = None
-
-                if request_product == self.n_products: # sampled demand: no requests arrived
-                    est_t = prev_ests[t+1][S_t]
-                    next_state = S_t
-                else: # sampled demand: a request for a product arrived
-                    u = [0] * self.n_products # control variable
-
-                    # consider between actions: don't sell (u)
-                    value_not_sell = prev_ests[t+1][S_t]
-
-                    # or sell(u_sell)
-                    value_sell = 0
-                    S_after_sell = S_t
-                    cap_vector = RM_helper.remain_cap(self.n_states, self.capacities,S_t)
-                    incidence_vector = [row[request_product] for row in self.incidence_matrix]
-                    diff = [x_i - a_j_i for a_j_i, x_i in zip(incidence_vector, cap_vector)]
-                    if all(diff_i >= 0 for diff_i in diff):
-                        u_sell = [0] * self.n_products
-                        u_sell[request_product] = 1
-
-                        # find the state after selling the product
-                        Au = np.dot(self.incidence_matrix, u_sell).tolist()
-                        x_Au = [x_i - Au_i for x_i, Au_i in zip(cap_vector, Au)] # updated remaining capacity vector
-                        S_after_sell = RM_helper.state_index(self.n_states, self.capacities,x_Au)
-                        # estimated the value function if selling the product
-                        value_sell = products[request_product][1] + prev_ests[t+1][S_after_sell]
-
-                    if value_sell > value_not_sell:
-                        est_t = value_sell
-                        next_state = S_after_sell
-                    else:
-                        est_t = value_not_sell
-                        next_state = S_t
-
-                current_estimation[t][S_t] = est_t 
-                S_t = next_state
-                prev_ests = current_estimation
-
-            n += 1
-        self.value_functions = prev_ests
+                request_product = sampled_demands[:, t]
+                has_request = request_product < self.n_products
+                product = np.where(has_request, request_product, 0)
+                
+                # consider between actions: don't sell, or sell the requested product if there is enough capacity
+                value_not_sell = estimates[t + 1, S_t]
+                can_sell = has_request & sellable[S_t, product]
+                S_after_sell = np.where(can_sell, S_t - offsets[product], S_t)
+                value_sell = np.where(can_sell, prices[product] + estimates[t + 1, S_after_sell], 0)
+                
+                sell = value_sell > value_not_sell
+                est_t = np.where(sell, value_sell, value_not_sell)
+                
+                visited, index = np.unique(S_t, return_inverse=True)
+                observed = np.bincount(index, weights=est_t) / np.bincount(index)
+                estimates[t, visited] = (1 - alpha) * estimates[t, visited] + alpha * observed
+                S_t = np.where(sell, S_after_sell, S_t)
+                
+            n += n_paths
+        self.value_functions = estimates
         return self.value_functions
     
     def bid_prices(self):
         """return the bid prices for resources over all time periods and all remaining capacities situations."""
-        if not self.value_functions:
+        if len(self.value_functions) == 0:
             self.calc_value_func(self.default_iterations)
 
         return RM_helper.network_bid_prices(self.value_functions, self.products, self.resources, self.capacities,                                             self.incidence_matrix, self.n_states)
 
     def total_expected_revenue(self):
-        if not self.value_functions:
+        if len(self.value_functions) == 0:
             self.calc_value_func(self.default_iterations)
             
-        return self.approximations[0][-1]
+        return self.value_functions[0][-1]
 
 
-ps = [['a1', 200, 0.02], ['a2', 503, 0.06], ['ab1', 400, 0.08],['ab2', 704, 0.01], ['ab3', 601, 0.05],       ['ab4', 106, 0.12], ['bc', 920, 0.03],['c1', 832, 0.07]]
-products,demands, _ = RM_helper.sort_product_demands(ps)
-demands = [demands]
-resources = ['a', 'b', 'c']
-capacities = [8] * 3
+# ps = [['a1', 200, 0.02], ['a2', 503, 0.06], ['ab1', 400, 0.08],['ab2', 704, 0.01], ['ab3', 601, 0.05],       ['ab4', 106, 0.12], ['bc', 920, 0.03],['c1', 832, 0.07]]
+# products,demands, _ = RM_helper.sort_product_demands(ps)
+# demands = [demands]
+# resources = ['a', 'b', 'c']
+# capacities = [8] * 3
 
-start_time = time.time()
-problem = One_state_transition(products, resources, demands, capacities, 10)
+# start_time = time.time()
+# problem = One_state_transition(products, resources, demands, capacities, 10)
 # vf = problem.calc_value_func(1000)
 # print(problem.bid_prices())
 # print(vf)
@@ -194,7 +197,9 @@ class DP_w_featureExtraction():
     """ADP algorithm, using DP model with feature-extraction method."""
     incidence_matrix = []
     approximations = []
+    coefficients = [] # contains the coefficients of basis functions at each time period
     default_method = "separable_affine"
+    max_sampling_attempts = 10
     
     def __init__(self, products, resources, capacities, total_time, demand_model):
         
@@ -204,7 +209,6 @@ class DP_w_featureExtraction():
         self.total_time = total_time
         self.n_products = len(products)
         self.n_resources = len(resources)
-        self.n_demand_periods = len(demands)
         self.demand_model = demand_model
         
         self.n_states = 1
@@ -213,52 +217,123 @@ class DP_w_featureExtraction():
             self.n_states *= (c+1)
             
         self.incidence_matrix = RM_helper.calc_incidence_matrix(products, resources)
+        self.prices = np.array([p[1] for p in products], dtype=float)
+        self.consumptions = np.array(self.incidence_matrix, dtype=int).T # resources used by each product
     
+    @RM_instrument.timed('DP_w_featureExtraction.calc_value_func')
     def calc_value_func(self, feature_approx_method = "", m = 0):
         """Calculate the value functions, 
         using the given feature approximation method(default as separable affine, ref: An ADP approach to Network RM),
-        with m states chosen in each time period to get observations. """
+        with m states chosen in each time period to get observations. 
+        The features of all states are extracted once, so that fitting the coefficients of each time period is a 
+        single least square problem over the chosen states, and approximating the other states is a single product 
+        of the feature matrix and the coefficients. """
         
         if not feature_approx_method:
             feature_approx_method = self.default_method
+        self.feature_approx_method = feature_approx_method
             
         if m <= 0:
             m = int(self.n_states / 2)
             
-        self.approximations = [[0] * self.n_states for _ in range(self.total_time)]
-        t = self.total_time - 1
+        states = RM_helper.state_table(self.capacities)
+        strides = RM_helper.state_strides(self.capacities)
+        features = self.feature_matrix(states, feature_approx_method)
+        self.approximations = np.zeros((self.total_time, self.n_states))
+        self.coefficients = [[] for _ in range(self.total_time)]
 
         for t in range(self.total_time -1, -1, -1):
-            while(True):
+            next_approx = self.approximations[t + 1] if t < self.total_time - 1 else None
+            next_values = lambda remain_caps: next_approx[remain_caps.dot(strides)]
+            
+            for attempt in range(self.max_sampling_attempts):
                 # choose m states, and evaluate the value in those states
-                m_states = self.choose_m_states(m)
-                m_vals = self.eval_values(m_states, t)
+                m_states = np.array(self.choose_m_states(m))
+                m_vals = self.eval_values_at(states[m_states], t, next_values)
 
-                # extract feature vectors from these m states, and solve for the optimal coefficients
-                m_features = []
-                for s in m_states:
-                    feature_vector = self.extract_features(s, feature_approx_method)
-                    m_features.append(feature_vector)
-
-                find_coeff = self.solve_LLS_prob(m_features, m_vals)
-                if find_coeff[0]:
+                # solve for the optimal coefficients with the feature vectors of these m states; if the features of 
+                # the selected m states are linearly dependent, repeat the above process
+                r, rank = self.fit_coefficients(features[m_states], m_vals, feature_approx_method)
+                if rank == features.shape[1]:
                     break
-                else:
-                    # if the B matrix of the selected m states is singular, repeat the above process
-                    continue
-
-            r = find_coeff[1]
+            else:
+                self.warn_rank_deficient('calc_value_func', t)
             
             # use the optimal coefficients computed to approximate value of other states
-            for s in range(self.n_states):
-                if s in m_states:
-                    self.approximations[t][s] = round(m_vals[m_states.index(s)],4)
-                else:
-                    feature = self.extract_features(s, feature_approx_method)
-                    approx_val = np.dot(feature, r)
-                    self.approximations[t][s] = max(round(approx_val, 4), 0)
+            self.coefficients[t] = r
+            self.approximations[t] = np.maximum(np.round(features.dot(r), 4), 0)
+            self.approximations[t][m_states] = np.round(m_vals, 4)
         
         return self.approximations
+    
+    @RM_instrument.timed('DP_w_featureExtraction.calc_value_coefficients')
+    def calc_value_coefficients(self, m, feature_approx_method = ""):
+        """Calculate the coefficients of basis functions in each time period, without enumerating all the states,
+        using the given feature approximation method, with a budget of m states sampled in each time period to get
+        observations. Values of states in the next time period are approximated on demand from its coefficients, 
+        so that the time and memory used depend on m and the number of features, rather than the number of states. 
+        """
+        
+        if not feature_approx_method:
+            feature_approx_method = self.default_method
+        self.feature_approx_method = feature_approx_method
+        
+        self.approximations = []
+        self.coefficients = [[] for _ in range(self.total_time)]
+        
+        for t in range(self.total_time -1, -1, -1):
+            next_values = lambda remain_caps: self.approx_values_at(t + 1, remain_caps)
+            
+            for attempt in range(self.max_sampling_attempts):
+                # sample m states, and evaluate the value in those states
+                m_caps = self.sample_remain_caps(m)
+                m_vals = self.eval_values_at(m_caps, t, next_values)
+                
+                r, rank = self.fit_coefficients(self.feature_matrix(m_caps, feature_approx_method), m_vals, 
+                                                feature_approx_method)
+                if rank == len(r):
+                    break
+            else:
+                self.warn_rank_deficient('calc_value_coefficients', t)
+            self.coefficients[t] = r
+            
+        return self.coefficients
+    
+    def warn_rank_deficient(self, func_name, t):
+        """helper func: warns that the features of the states sampled in time period t are still linearly dependent
+        after max_sampling_attempts, so that the coefficients fitted are not unique"""
+        warnings.warn('RM_ADP: DP_w_featureExtraction %s(), features of the sampled states are linearly dependent '
+                      'after %d attempts in time period %d' % (func_name, self.max_sampling_attempts, t))
+    
+    def fit_coefficients(self, features, values, feature_approx_method):
+        """helper func: solve for the coefficients of basis functions in the least square sense, for the given 
+        features and observed values. For the separable concave method, the fitted slopes of each resource are 
+        projected to be non-increasing and non-negative, then the constant term is fitted again. 
+        returns the coefficients, and the rank of the features"""
+        r, _, rank, _ = np.linalg.lstsq(features, values, rcond=None)
+        
+        if feature_approx_method == "separable_concave":
+            offsets = np.cumsum([0] + list(self.capacities))
+            for i in range(self.n_resources):
+                slopes = RM_helper.project_nonincreasing(r[offsets[i]:offsets[i+1]])
+                r[offsets[i]:offsets[i+1]] = np.maximum(slopes, 0)
+            r[-1] = np.mean(values - features[:, :-1].dot(r[:-1]))
+        return r, rank
+    
+    def sample_remain_caps(self, m):
+        """helper func: sample m states uniformly, in the form of remaining capacities of resources, 
+        by sampling the remaining capacity of each resource independently"""
+        return np.column_stack([np.random.randint(0, c + 1, m) for c in self.capacities])
+    
+    def approx_values_at(self, t, remain_caps):
+        """helper func: approximate the values of states with the given remaining capacities at time period t, 
+        using the coefficients of basis functions at that time period"""
+        features = self.feature_matrix(np.atleast_2d(remain_caps), self.feature_approx_method)
+        return np.maximum(features.dot(self.coefficients[t]), 0)
+    
+    def approx_value(self, t, remain_cap):
+        """approximate the value of the state with remaining capacities remain_cap at time period t"""
+        return self.approx_values_at(t, remain_cap)[0]
         
     def choose_m_states(self, m):
         """helper func: choose m states from all states, currently choosing randomly"""
@@ -267,76 +342,84 @@ class DP_w_featureExtraction():
     
     def eval_values(self, m_states, t):
         """helper func: calculate the value of being at the given states, at time period t"""
-        values = []
-        demands_t = self.demand_model.current_arrival_rates(t)
-        for state in m_states:
-            value = 0
-            remain_cap = RM_helper.remain_cap(self.n_states, self.capacities, state)
-            for f in range(self.n_products):
-                incidence_vector = [row[f] for row in self.incidence_matrix]
-                if all(A_f <= x for A_f,x in zip(incidence_vector,remain_cap)):
-                    if t == (self.total_time - 1): 
-                        # in the last time period, evaluate values of these m states exactly
-                        value += demands_t[f] * self.products[f][1]
-                    else:
-                        # in other time periods, consider value in the next state as approximations produced
-                        remain_cap_sell = [x - A_f for x, A_f in zip(remain_cap, incidence_vector)]
-                        next_state_sell = RM_helper.state_index(self.n_states, self.capacities, remain_cap_sell)
-                        value_sell = self.products[f][1] + self.approximations[t+1][next_state_sell]
-                        
-                        value_not_sell = self.approximations[t+1][state]
-                        
-                        value += demands_t[f] * max(value_sell, value_not_sell)
-            
-            if t < (self.total_time - 1):
-                value += (1 - sum(demands_t)) * self.approximations[t+1][state]
-            
-            values.append(value)
+        strides = RM_helper.state_strides(self.capacities)
+        remain_caps = RM_helper.state_table(self.capacities)[m_states]
+        next_values = lambda caps: self.approximations[t+1][caps.dot(strides)]
+        return self.eval_values_at(remain_caps, t, next_values).tolist()
+    
+    def eval_values_at(self, remain_caps, t, next_values):
+        """helper func: calculate the value of being at the states with the given remaining capacities, 
+        at time period t, where next_values gives the approximated values of states at time period t+1"""
+        demands_t = np.array(self.demand_model.current_arrival_rates(t))
+        # products that can be sold in each state, based on remaining capacities
+        sellable = (remain_caps[:, None, :] >= self.consumptions[None, :, :]).all(axis=2)
+        
+        if t == (self.total_time - 1): 
+            # in the last time period, evaluate values of these m states exactly
+            return sellable.dot(demands_t * self.prices)
+        
+        # in other time periods, consider value in the next state as approximations produced
+        value_not_sell = next_values(remain_caps)
+        value_sell = np.zeros(sellable.shape)
+        for f in range(self.n_products):
+            can_sell = sellable[:, f]
+            value_sell[can_sell, f] = self.prices[f] + next_values(remain_caps[can_sell] - self.consumptions[f])
+        
+        values = (sellable * demands_t * np.maximum(value_sell, value_not_sell[:, None])).sum(axis=1)
+        values += (1 - sum(demands_t)) * value_not_sell
         return values
 
-    def extract_features(self, state, feature_approx_method):
-        """helper func: use the given method to extract features of size (n_resource + 1) for the given states."""
-        feature = []
+    def feature_matrix(self, remain_caps, feature_approx_method):
+        """helper func: use the given method to extract features of the states with the given remaining capacities,
+        size n_states * n_features"""
         if feature_approx_method == self.default_method:
-            remain_cap = RM_helper.remain_cap(self.n_states, self.capacities, state)
-            feature = remain_cap[:]
-            feature.append(1)
-        else:
-            """TODO: implement separable_concave"""
+            return np.hstack([remain_caps, np.ones((len(remain_caps), 1))])
+        elif feature_approx_method == "separable_concave":
+            # piecewise-linear in each resource: feature (i, k) indicates that at least k units of resource i remain, 
+            # so that its coefficient is the marginal value of the k-th unit
+            features = [remain_caps[:, [i]] >= np.arange(1, self.capacities[i] + 1) for i in range(self.n_resources)]
+            return np.hstack(features + [np.ones((len(remain_caps), 1))])
+        raise ValueError('RM_ADP: DP_w_featureExtraction feature_matrix(), Unrecognized feature approximation method.')
             
-        return feature
-        
-    def solve_LLS_prob(self, feature_vectors, m_vals):
-        """helper func: solve the linear least square problem, returns whether the B matrix produced by the selected
-        m states is singular, and if not, the optimal coefficients of basis functions. """
-        m = len(m_vals)
-        B = [[0 * (self.n_resources + 1)] for _ in range(self.n_resources + 1)]
-        for feature_v in feature_vectors:
-            B += np.outer(feature_v, feature_v)
-            
-        try:
-            B_inverse = np.linalg.inv(B)
-        except np.linalg.linalg.LinAlgError as err:
-            if 'Singular matrix' in str(err):
-                return(False, [])
-            raise
-
-        C = [0] * (self.n_resources + 1)
-        for i in range(m):
-            prod = [m_vals[i] * f_v for f_v in feature_vectors[i]]
-            C = [C[r] + prod[r] for r in range(self.n_resources + 1)]
-        coeff = B_inverse.dot(C)
-        return (True, coeff)
+    def extract_features(self, state, feature_approx_method):
+        """helper func: use the given method to extract features of size (n_resource + 1) for the given states."""
+        remain_cap = RM_helper.remain_cap(self.n_states, self.capacities, state)
+        return self.feature_matrix(np.array([remain_cap]), feature_approx_method)[0].tolist()
+        
+    def slope_bid_prices(self, t, remain_caps):
+        """helper func: the bid prices for resources at time period t, given by the slopes of the separable concave 
+        approximation at the remaining capacities, i.e. the marginal value of the last unit of each resource;
+        for a resource with no capacity left, the marginal value of its first unit is used.
+        size n_states * n_resources"""
+        remain_caps = np.atleast_2d(remain_caps)
+        offsets = np.cumsum([0] + list(self.capacities))
+        units = np.maximum(remain_caps, 1) - 1 # index of the last unit of each resource
+        return np.asarray(self.coefficients[t])[offsets[:-1] + units]
+    
+    def bid_prices_at(self, t, remain_cap):
+        """return the bid prices for resources at time period t, with remaining capacities remain_cap, 
+        only available for the separable concave approximation."""
+        return self.slope_bid_prices(t, remain_cap)[0].tolist()
         
     def bid_prices(self):
         """return the bid prices for resources over all time periods and all remaining capacities situations."""
-        if not self.approximations:
+        if len(self.approximations) == 0 and len(self.coefficients) == 0:
             self.calc_value_func(self.default_method)
-            
-        return RM_helper.network_bid_prices(self.approximations, self.products, self.resources, self.capacities,                                             self.incidence_matrix, self.n_states)
+        
+        states = RM_helper.state_table(self.capacities)
+        if self.feature_approx_method == "separable_concave":
+            return [np.round(self.slope_bid_prices(t, states), 3).tolist() for t in range(self.total_time)]
+        
+        approximations = self.approximations
+        if len(approximations) == 0:
+            # only the coefficients are calculated, see calc_value_coefficients
+            approximations = [np.round(self.approx_values_at(t, states), 4) for t in range(self.total_time)]
+        return RM_helper.network_bid_prices(approximations, self.products, self.resources, self.capacities,                                             self.incidence_matrix, self.n_states)
     
     def total_expected_revenue(self):
-        if not self.approximations:
+        if len(self.approximations) == 0:
+            if len(self.coefficients) > 0:
+                return self.approx_value(0, self.capacities)
             self.calc_value_func(self.default_method)
             
         return self.approximations[0][-1]
@@ -431,6 +514,7 @@ class ALP():
                 avail_prod.append(j)
         return avail_prod
     
+    @RM_instrument.timed('ALP.sample_states')
     def sample_visited_states(self, K):
         """Step 1: simulate K visited states by obtaining a bid-price control policy, then using it to simulate a 
         control, and gathering all visited states(in the form of remaining capacity of resources)"""
@@ -457,6 +541,77 @@ class ALP():
             i += 1
         return visited_states
     
+    @RM_instrument.timed('ALP.sample_states')
+    def sample_visited_states_batch(self, K, n_paths = 100, policy = 'static', solver = 'highs'):
+        """Step 1, simulating n_paths trajectories at once: sample K visited states by simulating the bid-price 
+        control of DLP over n_paths trajectories in parallel, and gathering all visited states(in the form of 
+        remaining capacity of resources). With policy 'cached', the DLP is solved once for each time period and 
+        state visited, as in sample_visited_states; with policy 'static', it is solved once for each time period, 
+        at the initial capacities. Visited states are deduplicated with sets of their state indices.
+        returns visited states in the same form as sample_visited_states"""
+        strides = RM_helper.state_strides(self.capacities)
+        consumptions = np.array(self.incidence_matrix, dtype=int).T
+        prices = np.array([p[1] for p in self.products], dtype=float)
+        
+        visited_states = [[] for _ in range(self.total_time)]
+        visited_codes = [set() for _ in range(self.total_time)]
+        visited_states[0].append(self.capacities[:])
+        visited_codes[0].add(int(np.dot(self.capacities, strides)))
+        total_num = 1
+        bid_prices_cache = {}
+        while total_num < K:
+            curr_states = np.tile(self.capacities, (n_paths, 1))
+            for t in range(self.total_time - 1):
+                if policy == 'static':
+                    bid_prices = self.DLP_bid_prices(np.array([self.capacities]), t, bid_prices_cache, solver)
+                    bid_prices = np.broadcast_to(bid_prices, curr_states.shape)
+                elif policy == 'cached':
+                    bid_prices = self.DLP_bid_prices(curr_states, t, bid_prices_cache, solver)
+                else:
+                    raise ValueError('RM_ADP: ALP sample_visited_states_batch(), Unrecognized policy.')
+                
+                # sample a single request in each trajectory, and simulate a 1-time-period bid-price control
+                arrival_rates = self.demand_model.current_arrival_rates(t)
+                requests = np.searchsorted(np.cumsum(arrival_rates), np.random.random(n_paths), side='right')
+                requested = requests < self.n_products
+                usage = np.zeros(curr_states.shape, dtype=int)
+                usage[requested] = consumptions[requests[requested]]
+                accept = requested & (curr_states >= usage).all(axis=1)
+                accept[accept] = (usage[accept] * bid_prices[accept]).sum(axis=1) <= prices[requests[accept]]
+                curr_states = curr_states - usage * accept[:, None]
+                
+                for code, state in zip(curr_states.dot(strides).tolist(), curr_states):
+                    if code not in visited_codes[t + 1]:
+                        visited_codes[t + 1].add(code)
+                        visited_states[t + 1].append(state.tolist())
+                        total_num += 1
+                        if total_num >= K:
+                            return visited_states
+                        
+            # resets the demand levels for the new iteration of the whole horizon
+            self.demand_model.set_up_rates_levels()
+            if self.demand_type > 1:
+                bid_prices_cache.clear()
+        return visited_states
+    
+    def DLP_bid_prices(self, remain_caps, t, bid_prices_cache, solver):
+        """helper func: bid prices of DLP at time period t for each of the given remaining capacities, 
+        solving the DLP only once for each state, and keeping the bid prices in the given cache. """
+        strides = RM_helper.state_strides(self.capacities)
+        codes, first, inverse = np.unique(remain_caps.dot(strides), return_index=True, return_inverse=True)
+        bid_prices = np.zeros((len(codes), self.n_resources))
+        n_misses = 0
+        for k in range(len(codes)):
+            key = (t, int(codes[k]))
+            if key not in bid_prices_cache:
+                bid_prices_cache[key] = self.DLP_model.get_bid_prices(remain_caps[first[k]].tolist(), t, solver)
+                n_misses += 1
+            bid_prices[k] = bid_prices_cache[key]
+        RM_instrument.count('ALP.DLP_cache_hits', len(codes) - n_misses)
+        RM_instrument.count('ALP.DLP_cache_misses', n_misses)
+        return bid_prices[inverse.ravel()]
+    
+    @RM_instrument.timed('ALP.solve_RLP')
     def solve_RLP(self, sampled_states):
         """Step 2: use sampled states, to formulate and solve Relaxed LP"""
         """in step 1: solves a DLP model, with the given remaining capacity, and the current time period; returns bid
@@ -587,7 +742,9 @@ class ALP():
                 for y_v in y_values[t]:
                     RLP_model += y[y_names[t]] >= y_v
                 
-        RLP_model.solve()
+        with RM_instrument.timer('ALP.solve_LP'):
+            RLP_model.solve()
+        RM_instrument.count('LP_solves')
 #         print(RLP_model)
         varsdict = {}
         for v in RLP_model.variables():
@@ -595,35 +752,232 @@ class ALP():
             varsdict[v.name] = v.varValue
         return (varsdict, flattened_names)
     
+    def weight_index(self, t, i, m = 0):
+        """helper func: index of the weight for resource i with 0 remaining capacity, at time period t and in demand 
+        mode m, among the weights ordered in the same way as the flattened variable names in solve_RLP."""
+        n_modes = max(self.d_models, 1)
+        period_size = n_modes * (sum(self.capacities) + self.n_resources)
+        return t * period_size + n_modes * (sum(self.capacities[:i]) + i) + m * (self.capacities[i] + 1)
+    
+    def weight_names(self):
+        """helper func: names of the weights, in the same form as the variables collected from the results of LP"""
+        names = []
+        for t in range(self.total_time):
+            for i in range(self.n_resources):
+                for m in range(max(self.d_models, 1)):
+                    for x in range(self.capacities[i] + 1):
+                        if self.demand_type == 1:
+                            names.append('_'.join(['r', self.resources[i], str(t), str(x)]))
+                        else:
+                            names.append('_'.join(['r', self.resources[i], str(t), str(m), str(x)]))
+        return names
+        
+    def basis_func_matrix(self, remain_caps, t):
+        """helper func: sparse matrix of the basis functions of the states with the given remaining capacities at 
+        time period t, in terms of the cumulative weights, i.e. u_t_i_x = sum of the weights r_t_i_0 to r_t_i_x, 
+        so that multiplying it with the cumulative weights gives the approximated values of these states, 
+        with one non-zero for each resource."""
+        m = 0 if self.demand_type == 1 else self.demand_model.current_demand_mode(t) - 1
+        remain_caps = np.asarray(remain_caps, dtype=int).reshape(-1, self.n_resources)
+        starts = np.array([self.weight_index(t, i, m) for i in range(self.n_resources)])
+        rows = np.repeat(np.arange(len(remain_caps)), self.n_resources)
+        cols = (starts + remain_caps).ravel()
+        return scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(remain_caps), self.n_weights))
+    
+    def RLP_terms(self, sampled_states):
+        """helper func: collect the terms of the constraints TJ(s) <= J(s) for all sampled states, as sparse matrices.
+        Each sampled state s at time t gives the row of J_t(s) and of J_t+1(s), and each product f that can be sold 
+        in s gives a row of J_t+1(s - A_f), which is paired with a variable z >= max(0, p_f + J_t+1(s - A_f) - J_t+1(s))
+        in the LP."""
+        consumptions = np.array(self.incidence_matrix, dtype=int).T
+        prices = np.array([p[1] for p in self.products], dtype=float)
+        
+        terms = {'period': [], 'J': [], 'J_next': [], 'J_sell': [], 'owner': [], 'rate': [], 'price': [], 
+                 'const': [], 'rate_next': []}
+        n_states = 0
+        for t in range(self.total_time):
+            if len(sampled_states[t]) == 0:
+                continue
+            caps = np.array(sampled_states[t], dtype=int)
+            n_t = len(caps)
+            arrival_rates_t = np.array(self.demand_model.current_arrival_rates(t), dtype=float)
+            # products that can be sold in each state, based on remaining capacities
+            sellable = (caps[:, None, :] >= consumptions[None, :, :]).all(axis=2)
+            
+            terms['period'].append(np.full(n_t, t))
+            terms['J'].append(self.basis_func_matrix(caps, t))
+            if t < (self.total_time - 1):
+                state_k, product_f = np.nonzero(sellable)
+                terms['J_next'].append(self.basis_func_matrix(caps, t + 1))
+                terms['J_sell'].append(self.basis_func_matrix(caps[state_k] - consumptions[product_f], t + 1))
+                terms['owner'].append(state_k + n_states)
+                terms['rate'].append(arrival_rates_t[product_f])
+                terms['price'].append(prices[product_f])
+                terms['const'].append(np.zeros(n_t))
+                # J_t+1(s) is weighted by the probability of no request, and of requests for products that can be sold
+                terms['rate_next'].append(1 - sum(arrival_rates_t) + sellable.dot(arrival_rates_t))
+            else:
+                # in the last time period, the values of states are the expected revenues from selling products
+                terms['J_next'].append(scipy.sparse.csr_matrix((n_t, self.n_weights)))
+                terms['const'].append(sellable.dot(arrival_rates_t * prices))
+                terms['rate_next'].append(np.zeros(n_t))
+            n_states += n_t
+        
+        for key in ['J', 'J_next', 'J_sell']:
+            terms[key] = scipy.sparse.vstack(terms[key] or [scipy.sparse.csr_matrix((0, self.n_weights))]).tocsr()
+        for key in ['period', 'owner', 'rate', 'price', 'const', 'rate_next']:
+            terms[key] = np.concatenate(terms[key]) if terms[key] else np.zeros(0)
+        terms['owner'] = terms['owner'].astype(int)
+        return terms
+    
+    def RLP_violations(self, terms, weights):
+        """helper func: given the weights, calculate how much TJ(s) exceeds J(s) for each sampled state s."""
+        value_next = terms['J_next'].dot(weights)
+        gain_sell = np.maximum(terms['price'] + terms['J_sell'].dot(weights) - value_next[terms['owner']], 0)
+        TJ = terms['const'] + terms['rate_next'] * value_next
+        TJ += np.bincount(terms['owner'], weights=terms['rate'] * gain_sell, minlength=len(TJ))
+        return TJ - terms['J'].dot(weights)
+    
+    @RM_instrument.timed('ALP.solve_RLP')
+    def solve_RLP_sparse(self, sampled_states, batch_size = 0, tol = 1e-6):
+        """Step 2: use sampled states, to formulate and solve Relaxed LP, with the constraints assembled directly as 
+        sparse matrices and solved with HiGHS. Constraints of sampled states are generated in rounds: starting from
+        one state in each time period, the states whose constraints are violated by the current solution are added, 
+        at most batch_size(default as a quarter of sampled states, or the number of time periods if larger) of the 
+        most violated ones in each round, 
+        until no constraint of the sampled states is violated. 
+        The LP is formulated in the cumulative weights(see basis_func_matrix), where the weights are in decreasing 
+        order as the cumulative weights are concave. The weights are marginal values of resources, so they are 
+        bounded to be non-negative, which also keeps the Relaxed LP bounded when only some of the states are sampled.
+        returns the values of variables and their names, in the same form as solve_RLP"""
+        self.n_weights = self.weight_index(self.total_time, 0)
+        terms = self.RLP_terms(sampled_states)
+        n_states = len(terms['period'])
+        if batch_size <= 0:
+            batch_size = max(self.total_time, int(n_states / 4))
+        
+        # objective function: minimize the value approximation of the initial state
+        objective = self.basis_func_matrix([self.capacities], 0).toarray()[0]
+        
+        # constraints 2, at each time period, for each resource, weights are in decreasing order, 
+        # i.e. u_x+1 - u_x <= u_x - u_x-1
+        starts = np.array([self.weight_index(t, i, m) for t in range(self.total_time) for i in range(self.n_resources) 
+                           for m in range(max(self.d_models, 1))], dtype=int)
+        concave_index = np.array([self.weight_index(t, i, m) + x for t in range(self.total_time) 
+                                  for i in range(self.n_resources) for m in range(max(self.d_models, 1)) 
+                                  for x in range(self.capacities[i])], dtype=int)
+        n_concave = len(concave_index)
+        is_start = np.isin(concave_index, starts) # u_-1 = 0
+        monotone_rows = scipy.sparse.csr_matrix((np.concatenate([np.ones(n_concave), -2 * np.ones(n_concave), 
+                                                                 np.where(is_start, 0, 1)]), 
+                                                 (np.tile(np.arange(n_concave), 3), 
+                                                  np.concatenate([concave_index + 1, concave_index, 
+                                                                  np.maximum(concave_index - 1, 0)]))), 
+                                                shape=(n_concave, self.n_weights))
+        # and the last weight is non-negative, i.e. u_c-1 <= u_c
+        ends = starts + np.tile(np.repeat(self.capacities, max(self.d_models, 1)), self.total_time)
+        ends = ends[ends > starts]
+        nonnegative_rows = scipy.sparse.csr_matrix((np.concatenate([np.ones(len(ends)), -np.ones(len(ends))]), 
+                                                    (np.tile(np.arange(len(ends)), 2), 
+                                                     np.concatenate([ends - 1, ends]))), 
+                                                   shape=(len(ends), self.n_weights))
+        monotone_rows = scipy.sparse.vstack([monotone_rows, nonnegative_rows]).tocsr()
+        
+        active = np.zeros(n_states, dtype=bool)
+        active[np.unique(terms['period'], return_index=True)[1]] = True
+        self.RLP_rounds = 0
+        while True:
+            self.RLP_rounds += 1
+            result = self.solve_RLP_active(terms, active, objective, monotone_rows)
+            if result.status != 0:
+                raise ValueError('RM_ADP: ALP solve_RLP_sparse(), ' + result.message)
+            
+            weights = result.x[:self.n_weights]
+            violations = self.RLP_violations(terms, weights)
+            violated = np.flatnonzero((violations > tol) & ~active)
+            if len(violated) == 0:
+                break
+            active[violated[np.argsort(-violations[violated])[:batch_size]]] = True
+        
+        # weights from the cumulative weights
+        weights = weights - np.concatenate([[0], weights[:-1]])
+        weights[starts] = result.x[starts]
+        self.weights = weights
+        names = self.weight_names()
+        varsdict = dict(zip(names, weights.tolist()))
+        return (varsdict, names)
+    
+    def solve_RLP_active(self, terms, active, objective, monotone_rows):
+        """helper func: solve the Relaxed LP with constraints of the active sampled states only"""
+        states = np.flatnonzero(active)
+        pairs = np.flatnonzero(active[terms['owner']])
+        n_pairs = len(pairs)
+        owners = terms['owner'][pairs]
+        
+        # constraints 1, for each sampled state, TJ <= J, 
+        # i.e. sum of rate * z + rate_next * J_next - J <= const, where the sum is over products that can be sold
+        position = np.full(len(active), -1)
+        position[states] = np.arange(len(states))
+        z_in_states = scipy.sparse.csr_matrix((terms['rate'][pairs], (position[owners], np.arange(n_pairs))), 
+                                              shape=(len(states), n_pairs))
+        rows_TJ = scipy.sparse.hstack([scipy.sparse.diags(terms['rate_next'][states]).dot(terms['J_next'][states]) 
+                                       - terms['J'][states], z_in_states])
+        
+        # constraints 3, define the variables z >= 0 that eliminate the max() operations in constraints 1, 
+        # i.e. max(J_next, p_f + J_sell) = J_next + z
+        rows_z = scipy.sparse.hstack([terms['J_sell'][pairs] - terms['J_next'][owners], -scipy.sparse.eye(n_pairs)])
+        
+        rows_monotone = scipy.sparse.hstack([monotone_rows, scipy.sparse.csr_matrix((monotone_rows.shape[0], 
+                                                                                     n_pairs))])
+        A_ub = scipy.sparse.vstack([rows_TJ, rows_z, rows_monotone]).tocsr()
+        b_ub = np.concatenate([-terms['const'][states], -terms['price'][pairs], np.zeros(monotone_rows.shape[0])])
+        c = np.concatenate([objective, np.zeros(n_pairs)])
+        RM_instrument.count('LP_solves')
+        with RM_instrument.timer('ALP.solve_LP'):
+            return scipy.optimize.linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=(0, None), method='highs')
+    
     def collect_bid_prices(self, varsdict, varnames):
         """helper func: after step 2, collect bid prices for each time period and each state from the results of LP"""
-
-        bid_prices = []
+        return RM_helper.expand_compact_bid_prices(self.compact_bid_prices(varsdict), self.capacities)
+    
+    def compact_bid_prices(self, varsdict = None):
+        """helper func: after step 2, collect bid prices from the results of LP in a compact form, where the bid price
+        of a resource depends only on the time period and the remaining capacity of that resource. 
+        Uses the weights of the last LP solved with solve_RLP_sparse if varsdict is not given.
+        returns an np array of size total_time * n_resources * (max capacity + 1), where entries beyond the capacity
+        of a resource are 0"""
+        if varsdict is None:
+            weights = np.maximum(self.weights, 0)
+        else:
+            weights = np.maximum([varsdict[name] for name in self.weight_names()], 0)
+        
+        bid_prices = np.zeros((self.total_time, self.n_resources, max(self.capacities) + 1))
         for t in range(self.total_time):
-            bid_prices_t = []
-            for s in range(self.n_states):
-                bid_prices_t_s = [0] * self.n_resources
-                remain_cap = RM_helper.remain_cap(self.n_states, self.capacities, s)
-                for i in range(self.n_resources):
-                    if self.demand_type == 1:  
-                        var_name = '_'.join(['r', self.resources[i], str(t), str(remain_cap[i])])
-                    else:
-                        current_d_mode = self.demand_model.current_demand_mode(t)
-                        var_name = '_'.join(['r', self.resources[i],str(t), str(current_d_mode - 1),str(remain_cap[i])])    
-                    bid_prices_t_s[i] = max(varsdict[var_name], 0)
-                bid_prices_t.append(bid_prices_t_s)
-            bid_prices.append(bid_prices_t)
-                    
+            m = 0 if self.demand_type == 1 else self.demand_model.current_demand_mode(t) - 1
+            for i in range(self.n_resources):
+                start = self.weight_index(t, i, m)
+                bid_prices[t, i, :self.capacities[i] + 1] = weights[start: start + self.capacities[i] + 1]
         return bid_prices
-
     
-    def get_bid_prices(self, K):
+    def get_bid_prices(self, K, solver = 'pulp', compact = False):
         """main func: given the number of states to be sampled, first simulate bid-price control policy to sample 
         states, then solve the relaxed LP problem to get the bid-price control for actual sale season. 
-        returns the bid prices generated. """
+        solver can be 'pulp'(building the LP with PuLP), or 'highs'(sparse matrices with constraint generation, 
+        and states sampled over trajectories in parallel, with DLP solved by HiGHS).
+        returns the bid prices generated, in the compact form(see compact_bid_prices) as an 
+        RM_helper.compact_bid_prices_table if compact is True. """
         K = max(self.total_time, K)
-        sampled_states = self.sample_visited_states(K)
-        varsdict, varsnames = self.solve_RLP(sampled_states)
+        if solver == 'highs':
+            sampled_states = self.sample_visited_states_batch(K)
+            varsdict, varsnames = self.solve_RLP_sparse(sampled_states)
+        elif solver == 'pulp':
+            sampled_states = self.sample_visited_states(K)
+            varsdict, varsnames = self.solve_RLP(sampled_states)
+        else:
+            raise ValueError('RM_ADP: ALP get_bid_prices(), Unrecognized solver.')
+        RM_instrument.count('ALP.states_sampled', sum(len(states) for states in sampled_states))
+        if compact:
+            return RM_helper.compact_bid_prices_table(self.compact_bid_prices(varsdict))
         bid_prices_collected = self.collect_bid_prices(varsdict, varsnames)
         return bid_prices_collected
 
@@ -675,6 +1029,7 @@ class DLBFA():
         self.incidence_matrix = RM_helper.calc_incidence_matrix(products, resources)
         
         self.decompose_DL_subnetworks()
+        self.precompute_subnet_features()
         
     def decompose_DL_subnetworks(self):
         """helper func: decompose a network into several double-leg subnetworks.
@@ -732,57 +1087,70 @@ class DLBFA():
         subnet_remain_cap = [remain_cap[i] for i in resources_in_subnet]
         return subnet_resources, subnet_remain_cap
     
+    def precompute_subnet_features(self):
+        """helper func: for each double-leg subnetwork, find the index of resources used by each of its products, 
+        and extract the features of all states of the subnetwork, so that approximating the value of a state only 
+        needs a dot product between the cached features and the weights. """
+        self.dl_product_resources = []
+        self.dl_state_strides = []
+        self.dl_features = []
+        for s in range(self.n_subnets):
+            subnet_resources, subnet_capacities = self.capacity_of_subnetwork(self.capacities, s)
+            subnet_incidence = np.array(RM_helper.calc_incidence_matrix(self.dl_products[s], subnet_resources))
+            self.dl_product_resources.append([np.flatnonzero(subnet_incidence[:, j]) 
+                                              for j in range(len(self.dl_products[s]))])
+            self.dl_state_strides.append(RM_helper.state_strides(subnet_capacities))
+            self.dl_features.append(self.feature_matrix(s, RM_helper.state_table(subnet_capacities)))
+    
+    def feature_matrix(self, subnet_index, subnet_remain_caps):
+        """helper func: given the index of a double-leg subnetwork, and remaining capacities of resources in this 
+        subnetwork at several states, return the features of these states, i.e. the terms in the basis function:
+        a constant, the minimum remaining capacity of resources used by each product, the squared remaining capacity
+        of each resource, and the product of remaining capacities. size n_states * n_features"""
+        subnet_remain_caps = np.atleast_2d(subnet_remain_caps)
+        features = [np.ones(len(subnet_remain_caps))]
+        features += [subnet_remain_caps[:, used].min(axis=1) for used in self.dl_product_resources[subnet_index]]
+        features += list((subnet_remain_caps ** 2).T)
+        features.append(subnet_remain_caps.prod(axis=1))
+        return np.column_stack(features)
+    
     def basis_func_vector(self, subnet_index, subnet_capacities):
         """helper func: given the index of a double-leg subnetwork, and capacities of resources in this subnetwork,
         return a vector of features, i.e. return the terms in the basis function. """
-        subnet_products = self.dl_products[subnet_index]
-        subnet_resources = [self.resources[i] for i in self.dl_resources[subnet_index]]
-        subnet_incidence = RM_helper.calc_incidence_matrix(subnet_products, subnet_resources)
-        feature = [1]
-        
-        for i in range(len(subnet_products)):
-            incidence_vector = [row[i] for row in subnet_incidence]
-            min_resource_cap = min([subnet_capacities[i] for i, x in enumerate(incidence_vector) if x == 1])
-            feature.append(min_resource_cap)
-        
-        product = 1
-        for c in subnet_capacities:
-            feature.append(c ** 2)
-            product *= c
-            
-        feature.append(product)
-        
-#         print("feature=", feature)
-        return feature
+        return self.feature_matrix(subnet_index, subnet_capacities)[0].tolist()
         
     def approx_value_func(self, t, curr_cap):
         """helper func: approximates the value function at time t, with remaining capacity-curr_cap."""
         approxed_vf = 0
         for sub in range(self.n_subnets):
             _, sub_capacities = self.capacity_of_subnetwork(curr_cap, sub)
-            basis_func = self.basis_func_vector(sub, sub_capacities)
-            weights = self.approx_weights[t][sub]
-            approxed_vf += np.dot(basis_func, weights)
+            sub_state = np.dot(sub_capacities, self.dl_state_strides[sub])
+            approxed_vf += self.dl_features[sub][sub_state].dot(self.approx_weights[t][sub])
         return approxed_vf   
     
-    def calc_value_func(self):
-        """calculate value functions, and find the best fitted weights of the approximation functions. """
-        self.approx_weights = [[] for t in range(self.total_time)]
+    @RM_instrument.timed('DLBFA.calc_value_func')
+    def calc_value_func(self, n_workers = 1):
+        """calculate value functions, and find the best fitted weights of the approximation functions. 
+        The subnetworks are independent, so with n_workers > 1 they are solved in that many worker processes. 
+        As the features of states in a subnetwork are the same across time periods, weights of all time periods 
+        are fitted with a single least square problem. """
+        sub_problems = []
         for s in range(self.n_subnets):
-            sub_products, sub_arrival_rates, _ = RM_helper.sort_product_demands(self.dl_products[s])
+            sub_products, sub_arrival_rates, _ = RM_helper.sort_product_demands(self.dl_products[s][:])
             sub_resources, sub_capacities = self.capacity_of_subnetwork(self.capacities, s)
-            sub_problem = RM_exact.Network_RM(sub_products, sub_resources, [sub_arrival_rates], sub_capacities,                                              self.total_time)
-            sub_value_funcs = sub_problem.calc_value_func()
-            
+            sub_problems.append((sub_products, sub_resources, sub_capacities, self.total_time, sub_arrival_rates))
+        
+        if n_workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                sub_value_funcs = list(executor.map(RM_exact.solve_network_RM, *zip(*sub_problems)))
+        else:
+            sub_value_funcs = [RM_exact.solve_network_RM(*sub_problem) for sub_problem in sub_problems]
+        
+        self.approx_weights = [[] for t in range(self.total_time)]
+        for s in range(self.n_subnets):
+            weights = np.linalg.lstsq(self.dl_features[s], np.array(sub_value_funcs[s]).T, rcond=None)[0]
             for t in range(self.total_time):
-                feature_vectors = []
-                sub_value_func_t = sub_value_funcs[t]
-                for state in range(sub_problem.n_states):
-                    state_remain_cap = RM_helper.remain_cap(sub_problem.n_states, sub_capacities, state)
-                    feature_vector = self.basis_func_vector(s, state_remain_cap)
-                    feature_vectors.append(feature_vector)
-                weights = np.linalg.lstsq(feature_vectors, sub_value_func_t)
-                self.approx_weights[t].append(weights[0].tolist())
+                self.approx_weights[t].append(weights[:, t].tolist())
         return self.approx_weights
     
     def accept_request(self, t, curr_cap, product_index):
@@ -790,7 +1158,7 @@ class DLBFA():
         incidence_vector = [row[product_index] for row in self.incidence_matrix]
         if any(c < x for c, x in zip(curr_cap, incidence_vector)):
             # don't sell if not enough resources capacities
-            return false
+            return False
         approx_vf = self.approx_value_func(t, curr_cap)
         after_sell_cap = [c-x for c, x in zip(curr_cap, incidence_vector)]
         after_sell_approx_vf = self.approx_value_func(t, after_sell_cap)
@@ -798,25 +1166,25 @@ class DLBFA():
         # sell if the revenue of the requested product exceeds the approximated opportunity cost
         return self.products[product_index][1] >= opportunity_cost
         
-products = [['A-hub,1', 136, 0.015189303062234503],
-  ['B-hub,1', 64, 0.011254552884196198],
-  ['C-hub,1', 71, 0.05055641395361463],
-  ['hub-A,1', 59, 0.014519949081951273],
-  ['hub-B,1', 114, 0.029522310842602498],
-  ['hub-C,1', 63, 0.013761512528204777],
-  ['A-hub-B,1', 80, 0.012297494696835953],
-  ['A-hub-C,1', 139, 0.004616994228393384],
-  ['B-hub-C,1', 154, 0.006180509636767171],
-  ['B-hub-A,1', 102, 0.00010985010143045068],
-  ['C-hub-A,1', 181, 0.012781348349624438],
-  ['C-hub-B,1', 59, 0.01875903162723695],
-  ['A-hub-A,1', 60, 0.06147251694356827],
-  ['B-hub-B,1', 205, 0.047610643608380306],
-  ['C-hub-C,1', 55, 0.0013675684549591728]]
-
-resources = ['A-hub', 'B-hub', 'C-hub', 'hub-A', 'hub-B', 'hub-C']
-capacities = [3] * 6
-T = 3
+# products = [['A-hub,1', 136, 0.015189303062234503],
+#   ['B-hub,1', 64, 0.011254552884196198],
+#   ['C-hub,1', 71, 0.05055641395361463],
+#   ['hub-A,1', 59, 0.014519949081951273],
+#   ['hub-B,1', 114, 0.029522310842602498],
+#   ['hub-C,1', 63, 0.013761512528204777],
+#   ['A-hub-B,1', 80, 0.012297494696835953],
+#   ['A-hub-C,1', 139, 0.004616994228393384],
+#   ['B-hub-C,1', 154, 0.006180509636767171],
+#   ['B-hub-A,1', 102, 0.00010985010143045068],
+#   ['C-hub-A,1', 181, 0.012781348349624438],
+#   ['C-hub-B,1', 59, 0.01875903162723695],
+#   ['A-hub-A,1', 60, 0.06147251694356827],
+#   ['B-hub-B,1', 205, 0.047610643608380306],
+#   ['C-hub-C,1', 55, 0.0013675684549591728]]
+
+# resources = ['A-hub', 'B-hub', 'C-hub', 'hub-A', 'hub-B', 'hub-C']
+# capacities = [3] * 6
+# T = 3
 # problem = DLBFA(products,resources, capacities, T)
 # problem.calc_value_func()
 # problem.accept_request(2, [1] * 6, 1)
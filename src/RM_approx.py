@@ -6,15 +6,17 @@
 import warnings
 import numpy as np
 from operator import itemgetter
+import scipy.optimize
 import scipy.stats
-import time
+import scipy.special
 import math
 import sys
 sys.path.append('.')
 import RM_helper
 import RM_exact
 import RM_demand_model
-import pulp
+import RM_instrument
+pulp = RM_helper.lazy_import('pulp')
 
 
 # In[5]:
@@ -84,24 +86,115 @@ class Single_EMSR():
         calculate and return the protection levels for fare classes
         ref: section 2.2.4.2 EMSR-b method
         """
-        self.protection_levels = [0] * self.n_products
-        for j in range(self.n_products - 1):
-            weighted_average_rev = self.weighted_average_revenue(j)
-            # aggregate the future demand for classes j, j - 1, ... 1
-            mean = sum(self.demands[k][0] for k in range(j+1))
-            std = math.sqrt(sum(self.demands[k][1] ** 2 for k in range(j+1)))
-            
-            prob = self.products[j + 1][1] / weighted_average_rev
-            distribution = scipy.stats.norm(mean, std)
-            yj = round(distribution.isf(prob), 2)
-            self.protection_levels[j] = yj
+        fares = [[p[1] for p in self.products]]
+        means = [[d[0] for d in self.demands]]
+        stds = [[d[1] for d in self.demands]]
+        batch = Batch_EMSR(fares, means, stds, [self.capacity])
+        self.protection_levels = batch.get_protection_levels('b')[0].tolist()
         self.protection_levels[-1] = self.capacity
         return self.protection_levels
 
-start_time = time.time()
-p = [[1, 1050], [2,567], [3, 534], [4,520]]
+class Batch_EMSR():
+    """Solve the single resource revenue management problems (static model) of many legs at once, using EMSR-a or
+        EMSR-b heuristic, with the following attributes:
+    
+        Given:
+        ----------
+        fares: 2D np array
+            contains the revenue of each fare class on each leg, ordered in descending order of revenue on every leg
+            size n_legs * n_products
+        means: 2D np array
+            contains the mean of the demand distribution for each fare class on each leg
+            size n_legs * n_products
+        stds: 2D np array
+            contains the std of the demand distribution for each fare class on each leg
+            size n_legs * n_products
+        capacities: np array
+            contains the total capacity C of each leg
+            size n_legs
+        
+        To be calculated:
+        ----------
+        protection_levels: 2D np array
+            contains the protection level for each class on each leg, the last class on a leg is protected with
+            the whole capacity of that leg
+            size n_legs * n_products
+    """
+    
+    def __init__(self, fares, means, stds, capacities):
+        """Return a framework for a batch of single-resource RM problems."""
+        self.fares = np.asarray(fares, dtype=float)
+        self.means = np.asarray(means, dtype=float)
+        self.stds = np.asarray(stds, dtype=float)
+        self.capacities = np.asarray(capacities, dtype=float)
+        
+        self.protection_levels = []
+        
+        if self.fares.ndim != 2:
+            raise ValueError('RM_approx: Batch_EMSR init(), Fares should be given as a 2D array.')
+        self.n_legs, self.n_products = self.fares.shape
+        
+        # Check that the data of demands and capacities is specified for each fare class on each leg
+        if self.means.shape != self.fares.shape or self.stds.shape != self.fares.shape:
+            raise ValueError('RM_approx: Batch_EMSR init(), Size of demands is not as expected.')
+        if self.capacities.shape != (self.n_legs,):
+            raise ValueError('RM_approx: Batch_EMSR init(), Number of capacities for legs is not correct.')
+        
+        # Make sure the fare classes are sorted in descending order based on their revenues
+        if np.any(self.fares[:, :-1] < self.fares[:, 1:]):
+            raise ValueError('RM_approx: Batch_EMSR init(), The fares are not in the descending order of revenues.')
+            
+    def weighted_average_revenues(self):
+        """helper func: returns the weighted average revenue from classes 1, ... j, for every j on every leg"""
+        sum_rev_demand = np.cumsum(self.fares * self.means, axis=1)
+        sum_demand = np.cumsum(self.means, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(sum_demand > 0, sum_rev_demand / sum_demand, 0)
+    
+    def EMSR_b_levels(self):
+        """helper func: protection levels of classes 1, ... n-1, ref: section 2.2.4.2 EMSR-b method"""
+        weighted_average_revs = self.weighted_average_revenues()[:, :-1]
+        # aggregate the future demand for classes j, j - 1, ... 1
+        means = np.cumsum(self.means, axis=1)[:, :-1]
+        stds = np.sqrt(np.cumsum(self.stds ** 2, axis=1))[:, :-1]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probs = self.fares[:, 1:] / weighted_average_revs
+        return means - stds * scipy.special.ndtri(probs)
+    
+    def EMSR_a_levels(self):
+        """helper func: protection levels of classes 1, ... n-1, ref: section 2.2.4.1 EMSR-a method"""
+        # probs[l, k, j] is the ratio between the fare of class j+1 and the fare of a higher class k, on leg l
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probs = self.fares[:, None, 1:] / self.fares[:, :, None]
+        higher = np.triu(np.ones((self.n_products, self.n_products - 1), dtype=bool))
+        probs = np.where(higher, probs, 0.5)
+        
+        # protect each higher class k from class j+1 separately, then sum up the protections
+        levels_k = self.means[:, :, None] - self.stds[:, :, None] * scipy.special.ndtri(probs)
+        return np.where(higher, levels_k, 0).sum(axis=1)
+        
+    def get_protection_levels(self, method='b'):
+        """ 
+        calculate and return the protection levels for fare classes on all the legs, 
+        using EMSR-a method if method is 'a', or EMSR-b method if method is 'b'
+        """
+        if method == 'a':
+            levels = self.EMSR_a_levels()
+        elif method == 'b':
+            levels = self.EMSR_b_levels()
+        else:
+            raise ValueError('RM_approx: Batch_EMSR get_protection_levels(), Unrecognized EMSR method.')
+        
+        self.protection_levels = np.empty((self.n_legs, self.n_products))
+        self.protection_levels[:, :-1] = np.round(levels, 2)
+        self.protection_levels[:, -1] = self.capacities
+        return self.protection_levels
+
+# start_time = time.time()
+# p = [[1, 1050], [2,567], [3, 534], [4,520]]
 # p = [[1, 1050], [2,950], [3, 699], [4,520]]
-d = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
+# d = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
 # problem = Single_EMSR(p, d, 80)
 # print(problem.get_protection_levels())
 
@@ -129,9 +222,15 @@ class Network_DLP():
 
         self.incidence_matrix = RM_helper.calc_incidence_matrix(products, resources)
 
-    def get_bid_prices(self, remain_cap, curr_time):
+    @RM_instrument.timed('Network_DLP.get_bid_prices')
+    def get_bid_prices(self, remain_cap, curr_time, solver = 'pulp'):
         """Solves a Network_DLP model, with the given remaining capacity, and the current time period; returns bid
-        prices for resources. """
+        prices for resources. solver can be 'pulp', or 'highs'(solved in-process, without building PuLP models). """
+        if solver == 'highs':
+            return self.get_bid_prices_highs(remain_cap, curr_time)
+        elif solver != 'pulp':
+            raise ValueError('RM_approx: Network_DLP get_bid_prices(), Unrecognized solver.')
+        
         DLP_model = pulp.LpProblem('Network_DLP model', pulp.LpMaximize)
         y = pulp.LpVariable.dict('y_%s', self.product_names, lowBound= 0)
         
@@ -155,13 +254,29 @@ class Network_DLP():
         for j in self.product_names:
             DLP_model += y[j] <= means_vector[j]
                   
-        DLP_model.solve()
+        with RM_instrument.timer('Network_DLP.solve_LP'):
+            DLP_model.solve()
+        RM_instrument.count('LP_solves')
 #         print(DLP_model)
         
         self.bid_prices = [c.pi for c in constraints]
         self.objective_value = pulp.value(DLP_model.objective)
         return self.bid_prices
     
+    def get_bid_prices_highs(self, remain_cap, curr_time):
+        """helper func: solves the Network_DLP model with HiGHS, where booking limits are bounded by the mean demands, 
+        bid prices are the dual values of the capacity constraints. """
+        prices = [self.prices[j] for j in self.product_names]
+        means = self.demand_model.current_mean_demands(curr_time)
+        with RM_instrument.timer('Network_DLP.solve_LP'):
+            result = scipy.optimize.linprog(-np.array(prices), A_ub=self.incidence_matrix, b_ub=remain_cap, 
+                                            bounds=list(zip([0] * self.n_products, means)), method='highs')
+        RM_instrument.count('LP_solves')
+        
+        self.bid_prices = (-result.ineqlin.marginals).tolist()
+        self.objective_value = -result.fun
+        return self.bid_prices
+    
     def get_obj_value(self, remain_cap, curr_time):
         self.get_bid_prices(remain_cap, curr_time)
         return self.objective_value
@@ -342,6 +457,7 @@ class Network_DAVN():
 
         return sqrd_deriv_revenue
 
+    @RM_instrument.timed('Network_DAVN.clustering')
     def clustering(self):
         """
         Partition products using each resource into a group of virtual classes.
@@ -490,6 +606,7 @@ class Network_DAVN():
             self.aggregated_demands[i] = [[d[0], round(math.sqrt(d[1]), 3)] for d in demands_for_classes][:]
         return self.aggregated_demands
     
+    @RM_instrument.timed('Network_DAVN.calc_value_function')
     def calc_value_function(self, static_price, remain_cap, curr_time):
         """
         Main Function:
@@ -570,6 +687,7 @@ class DLP_DAVN():
         self.Network_DLP_model = Network_DLP(products, resources, capacities, demand_model)
         self.DAVN_model = Network_DAVN(products, resources, capacities, n_virtual_class, demand_model)
         
+    @RM_instrument.timed('DLP_DAVN.optimize')
     def optimize(self, remain_cap, t):
         # use DLP model to get initial static prices for resources, then use DAVN to get booking limits
         initial_static_price = self.Network_DLP_model.get_bid_prices(remain_cap, t)
@@ -577,6 +695,7 @@ class DLP_DAVN():
         self.booking_limits = davn_result[1]
         self.indexing_scheme = davn_result[3]
         
+    @RM_instrument.timed('DLP_DAVN.performance')
     def performance(self, requests=[], frequency = 1):        
         # initialize the control policy
         remain_cap = self.capacities[:]
@@ -659,6 +778,7 @@ class DLPVD():
         self.incidence_matrix = RM_helper.calc_incidence_matrix(products, resources)
         self.Network_DLP_model = Network_DLP(products, resources, capacities, demand_model)
         
+    @RM_instrument.timed('DLPVD.performance')
     def performance(self, requests=[]):
         if not requests:
             requests = self.demand_model.sample_network_arrival_rates()
@@ -0,0 +1,213 @@
+# coding: utf-8
+
+# In[1]:
+
+import json
+import os
+import platform
+import random
+import time
+import numpy as np
+
+import sys
+sys.path.append('.')
+import RM_helper
+import RM_exact
+import RM_approx
+import RM_ADP
+import RM_compare
+import RM_demand_model
+import RM_evaluator
+
+
+# In[2]:
+
+######################################
+###### Benchmarks of RM methods ######
+######################################
+
+# sizes of problems benchmarked by default, each in the form of {'n_spokes', 'cap', 'total_time'}
+DEFAULT_SIZES = [{'n_spokes': 2, 'cap': 2, 'total_time': 20},
+                 {'n_spokes': 2, 'cap': 4, 'total_time': 40},
+                 {'n_spokes': 3, 'cap': 2, 'total_time': 40}]
+MAX_EXACT_STATES = 5000 # exact DP is only benchmarked on problems with at most this number of states
+DEFAULT_K = 50 # number of states sampled by ALP
+DEFAULT_N_VIRTUAL_CLASS = 2 # number of virtual classes used by DAVN
+
+def generate_problem(n_spokes, cap, total_time, seed = 0, demand_type = 1):
+    """generates a hub-and-spoke network problem with generate_network, seeded so that the same problem is generated
+    in every run.
+    returns a problem in the form of [products, resources, capacities, total_time, demand_model]"""
+    random.seed(seed)
+    np.random.seed(seed)
+    resources, itineraries, arrival_rates = RM_evaluator.generate_network(n_spokes, demand_type)
+    products = RM_evaluator.extract_legs_info(itineraries, resources)
+    capacities = [cap] * len(resources)
+    demand_model = RM_demand_model.model(arrival_rates, total_time, demand_type)
+    return [products, resources, capacities, total_time, demand_model]
+
+def n_states(problem):
+    """helper func: number of states of the exact DP of the problem"""
+    return int(np.prod([c + 1 for c in problem[2]]))
+
+def sample_requests(problem, seed = 0):
+    """helper func: samples a seeded stream of requests for the problem"""
+    random.seed(seed)
+    np.random.seed(seed)
+    return problem[4].sample_network_arrival_rates()
+
+
+# In[3]:
+
+# Each benchmark case takes a problem, prepares everything not to be timed, and returns the function to be timed, or
+# None if the problem is too large for the method.
+
+def case_network_RM_value_func(problem):
+    if n_states(problem) > MAX_EXACT_STATES:
+        return None
+    model = RM_exact.Network_RM(*problem)
+    return model.calc_value_func
+
+def case_network_bid_prices(problem):
+    if n_states(problem) > MAX_EXACT_STATES:
+        return None
+    model = RM_exact.Network_RM(*problem)
+    model.calc_value_func()
+    return lambda: RM_helper.network_bid_prices(model.value_functions, model.products, model.resources,
+                                                model.capacities, model.incidence_matrix, model.n_states)
+
+def case_network_DLP_bid_prices(problem):
+    products, resources, capacities, total_time, demand_model = problem
+    model = RM_approx.Network_DLP(products, resources, capacities, demand_model)
+    return lambda: model.get_bid_prices(capacities, 0)
+
+def case_network_DAVN_value_function(problem):
+    products, resources, capacities, total_time, demand_model = problem
+    model = RM_approx.Network_DAVN(products, resources, capacities, DEFAULT_N_VIRTUAL_CLASS, demand_model)
+    static_prices = RM_approx.Network_DLP(products, resources, capacities, demand_model).get_bid_prices(capacities, 0)
+    return lambda: model.calc_value_function(static_prices, capacities, 0)
+
+def case_ALP_bid_prices(problem):
+    model = RM_ADP.ALP(*problem)
+    random.seed(0)
+    np.random.seed(0)
+    return lambda: model.get_bid_prices(DEFAULT_K)
+
+def case_DLPVD_performance(problem):
+    model = RM_approx.DLPVD(*problem)
+    requests = sample_requests(problem)
+    return lambda: model.performance(requests)
+
+def case_DLP_DAVN_performance(problem):
+    products, resources, capacities, total_time, demand_model = problem
+    model = RM_approx.DLP_DAVN(products, resources, capacities, total_time, DEFAULT_N_VIRTUAL_CLASS, demand_model)
+    requests = sample_requests(problem)
+    return lambda: model.performance(requests)
+
+def case_simulate_network_bidprices(problem):
+    products, resources, capacities, total_time, demand_model = problem
+    # bid prices from the DLP, at the initial capacities, used for all time periods and states
+    bid_prices = RM_approx.Network_DLP(products, resources, capacities, demand_model).get_bid_prices(capacities, 0)
+    bid_prices = [[bid_prices] * n_states(problem)] * total_time
+    requests = sample_requests(problem)
+    return lambda: RM_compare.simulate_network_bidprices_control([bid_prices], products, resources, capacities,
+                                                                 total_time, requests)
+
+BENCHMARKS = {'Network_RM.calc_value_func': case_network_RM_value_func,
+              'network_bid_prices': case_network_bid_prices,
+              'Network_DLP.get_bid_prices': case_network_DLP_bid_prices,
+              'Network_DAVN.calc_value_function': case_network_DAVN_value_function,
+              'ALP.get_bid_prices': case_ALP_bid_prices,
+              'DLPVD.performance': case_DLPVD_performance,
+              'DLP_DAVN.performance': case_DLP_DAVN_performance,
+              'simulate_network_bidprices_control': case_simulate_network_bidprices}
+
+
+# In[4]:
+
+def time_case(case, problem, repeat = 3):
+    """times the function prepared by the case on the problem, for repeat times, each prepared separately.
+    returns the timings in seconds, or None if the case skips the problem"""
+    timings = []
+    for _ in range(repeat):
+        func = case(problem)
+        if func is None:
+            return None
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def run_benchmarks(sizes = None, names = None, repeat = 3, seed = 0, file_name = None):
+    """runs the benchmarks with the given names(default as all in BENCHMARKS), on seeded problems of the given sizes.
+    returns the results as a dict of {'machine', 'repeat', 'seed', 'results'}, and writes them to the JSON file if
+    file_name is given. Each result is in the form of {'name', 'size', 'n_states', 'min', 'median', 'mean', 'std'}"""
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+    if names is None:
+        names = list(BENCHMARKS.keys())
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError('RM_benchmark: run_benchmarks(), Unrecognized benchmarks: ' + ', '.join(unknown))
+
+    results = []
+    for size in sizes:
+        problem = generate_problem(size['n_spokes'], size['cap'], size['total_time'], seed)
+        for name in names:
+            timings = time_case(BENCHMARKS[name], problem, repeat)
+            if timings is None:
+                continue
+            results.append({'name': name, 'size': dict(size), 'n_states': n_states(problem),
+                            'min': min(timings), 'median': float(np.median(timings)), 'mean': float(np.mean(timings)),
+                            'std': float(np.std(timings))})
+
+    report = {'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                          'platform': platform.platform(), 'processor': platform.processor()},
+              'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'repeat': repeat, 'seed': seed, 'results': results}
+    if file_name:
+        directory = os.path.dirname(file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(file_name, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+def load_benchmarks(file_name):
+    """loads the results written by run_benchmarks"""
+    with open(file_name) as f:
+        return json.load(f)
+
+def compare_benchmarks(baseline, current, tolerance = 0.2, key = 'min'):
+    """compares two benchmark reports(dicts or JSON file names), matching results by name and size.
+    returns a list of [name, size, baseline_time, current_time, ratio] for the results that are slower than the
+    baseline by more than the tolerance, e.g. 0.2 for 20% slower"""
+    if isinstance(baseline, str):
+        baseline = load_benchmarks(baseline)
+    if isinstance(current, str):
+        current = load_benchmarks(current)
+
+    def result_key(result):
+        return result['name'], json.dumps(result['size'], sort_keys=True)
+    baseline_times = {result_key(r): r[key] for r in baseline['results']}
+
+    regressions = []
+    for r in current['results']:
+        base_time = baseline_times.get(result_key(r))
+        if base_time is None or base_time <= 0:
+            continue
+        ratio = r[key] / base_time
+        if ratio > 1 + tolerance:
+            regressions.append([r['name'], r['size'], base_time, r[key], round(ratio, 3)])
+    return regressions
+
+# report = run_benchmarks(file_name='benchmark-files/benchmarks.json')
+# for r in report['results']:
+#     print(r['name'], r['size'], round(r['min'], 4))
+# print(compare_benchmarks('benchmark-files/baseline.json', report))
+
+
+# In[ ]:
+
+
+
+
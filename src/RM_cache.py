@@ -0,0 +1,230 @@
+# coding: utf-8
+
+# In[1]:
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import sys
+sys.path.append('.')
+import RM_helper
+
+
+# In[2]:
+
+##############################################
+###### Cache of solved value functions #######
+##############################################
+
+# Planning results(value functions, bid prices) are stored on disk, keyed by a hash of the problem instance and the
+# method parameters, so that solving an identical problem again, e.g. when re-running a comparison after changing only
+# the simulator, loads the results instead.
+
+DEFAULT_CACHE_DIRECTORY = 'cache-files'
+DEFAULT_MAX_BYTES = 2 ** 30 # 1GB
+CACHE_VERSION = 1 # part of every key, to be increased when the stored results change
+
+def problem_key(products, resources, capacities, total_time, demand_model, method, params = None):
+    """returns a sha256 hex digest identifying the problem instance, solved by the method with the given parameters.
+    The demand model is identified by its arrival rates at every level, and the level in every time period"""
+    demand = {'model_type': demand_model.model_type,
+              'arrival_rates': {level: [float(r) for r in rates] for level, rates in demand_model.arrival_rates.items()},
+              'rates_levels': list(demand_model.rates_levels)}
+    content = {'version': CACHE_VERSION, 'method': method, 'params': params or {},
+               'products': [[str(p[0]), float(p[1])] for p in products],
+               'resources': [str(r) for r in resources],
+               'capacities': [int(c) for c in capacities], 'total_time': int(total_time), 'demand': demand}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# In[3]:
+
+class Cache():
+    """On-disk cache of planning results, each entry is a dict of np arrays and JSON-serializable values.
+    Entries are stored as compressed .npz files in the directory, or if mmap is True, as directories of .npy files which
+    are loaded as read-only memory-mapped arrays. When the entries exceed max_bytes in total, the least recently used
+    ones are evicted."""
+
+    info_name = '__info__' # name of the array storing the values that are not np arrays
+
+    def __init__(self, directory = DEFAULT_CACHE_DIRECTORY, max_bytes = DEFAULT_MAX_BYTES, mmap = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key if self.mmap else key + '.npz')
+
+    def load(self, key):
+        """returns the entry stored under the key, or None if there isn't one"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        if self.mmap:
+            arrays = {name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode='r')
+                      for name in os.listdir(path) if name.endswith('.npy')}
+        else:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        # marks the entry as recently used
+        os.utime(path)
+        self.hits += 1
+
+        entry = json.loads(str(arrays.pop(self.info_name)))
+        entry.update(arrays)
+        return entry
+
+    def save(self, key, entry):
+        """stores the entry under the key, replacing the existing one, then evicts entries if necessary"""
+        arrays = {name: value for name, value in entry.items() if isinstance(value, np.ndarray)}
+        info = {name: value for name, value in entry.items() if not isinstance(value, np.ndarray)}
+        arrays[self.info_name] = np.array(json.dumps(info))
+
+        # writes to a temporary path first, so that an entry is never read half-written
+        path = self.path(key)
+        temp_path = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        if self.mmap:
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, name + '.npy'), array)
+            self.remove(key)
+            os.rename(temp_path, path)
+        else:
+            temp_file = os.path.join(temp_path, key + '.npz')
+            np.savez_compressed(temp_file, **arrays)
+            os.replace(temp_file, path)
+            os.rmdir(temp_path)
+        self.evict()
+
+    def get_or_compute(self, key, compute):
+        """returns the entry stored under the key, or computes it by compute() and stores it"""
+        entry = self.load(key)
+        if entry is None:
+            entry = compute()
+            self.save(key, entry)
+        return entry
+
+    def remove(self, key):
+        path = self.path(key)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def entries(self):
+        """returns a list of [key, size in bytes, last used time] of the entries, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.tmp-') or os.path.isdir(path) != self.mmap:
+                continue
+            if self.mmap:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            else:
+                size = os.path.getsize(path)
+            entries.append([name if self.mmap else name[:-len('.npz')], size, os.path.getmtime(path)])
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        """total size of the entries, in bytes"""
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self):
+        """removes the least recently used entries until the total size is within max_bytes"""
+        entries = self.entries()
+        total_size = sum(entry[1] for entry in entries)
+        for key, size, _ in entries:
+            if total_size <= self.max_bytes:
+                break
+            self.remove(key)
+            total_size -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            self.remove(key)
+
+
+# In[4]:
+
+# Cached versions of the planning steps used in the evaluators. Each returns the same as the method itself, and simply
+# calls the method if cache is None. Note that a cache hit doesn't draw random numbers or reset the demand levels as
+# solving would, e.g. ALP sampling states, so what is simulated afterwards may differ from an uncached run.
+
+def network_RM_bid_prices(model, cache = None):
+    """bid prices of an RM_exact.Network_RM model, also sets its value functions. Models with their own storage of
+    value functions are not cached, see Network_RM.load_value_func"""
+    if cache is None or model.storage is not None:
+        return model.get_bid_prices()
+    key = problem_key(model.products, model.resources, model.capacities, model.total_time, model.demand_model,
+                      'Network_RM')
+
+    def compute():
+        bid_prices = model.get_bid_prices()
+        return {'value_functions': np.array(model.value_functions), 'bid_prices': np.array(bid_prices)}
+    entry = cache.get_or_compute(key, compute)
+    model.value_functions = entry['value_functions'].tolist()
+    return entry['bid_prices'].tolist()
+
+def ALP_bid_prices(model, K, cache = None, solver = 'pulp', compact = False, sample = None):
+    """bid prices of an RM_ADP.ALP model, sampling K states, see ALP.get_bid_prices. 
+    The solution depends on the states sampled, so a model solved repeatedly, e.g. in every iteration of an evaluator,
+    should give a different sample(e.g. the iteration) for each, which is part of the key; otherwise the solution of
+    the first sample is loaded for all of them"""
+    if cache is None:
+        return model.get_bid_prices(K, solver, compact)
+    params = {'K': K, 'solver': solver}
+    if sample is not None:
+        params['sample'] = sample
+    key = problem_key(model.products, model.resources, model.capacities, model.total_time, model.demand_model,
+                      'ALP', params)
+    def compute():
+        return {'bid_prices': np.asarray(model.get_bid_prices(K, solver, compact=True))}
+    entry = cache.get_or_compute(key, compute)
+    if compact:
+        return RM_helper.compact_bid_prices_table(entry['bid_prices'])
+    return RM_helper.expand_compact_bid_prices(entry['bid_prices'], model.capacities)
+
+def DAVN_value_function(model, static_price, remain_cap, curr_time, cache = None):
+    """value functions, booking limits, bid prices, index scheme and virtual classes of an RM_approx.Network_DAVN
+    model, see Network_DAVN.calc_value_function. The virtual classes found by the model so far are part of the key,
+    as the model only clusters products in its first call"""
+    if cache is None:
+        return model.calc_value_function(static_price, remain_cap, curr_time)
+    params = {'n_class': model.n_class, 'static_price': static_price, 'remain_cap': remain_cap,
+              'curr_time': curr_time, 'virtual_classes': model.virtual_classes}
+    key = problem_key(model.products, model.resources, model.capacities, model.demand_model.total_time,
+                      model.demand_model, 'Network_DAVN', json.loads(json.dumps(params, default=_to_builtin)))
+
+    def compute():
+        result = model.calc_value_function(static_price, remain_cap, curr_time)
+        # the results are ragged over resources, so they are stored as JSON
+        return {'result': json.loads(json.dumps(result, default=_to_builtin))}
+    result = cache.get_or_compute(key, compute)['result']
+    model.value_functions, model.booking_limits, model.bid_prices, model.index_scheme, model.virtual_classes = result
+    return tuple(result)
+
+def _to_builtin(value):
+    """helper func: converts np scalars and arrays for json.dumps"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value.item()
+
+# cache = Cache('cache-files/network')
+# model = RM_exact.Network_RM(products, resources, capacities, T, demand_model)
+# bid_prices = network_RM_bid_prices(model, cache) # solved, then loaded in later runs
+# print(cache.hits, cache.misses, cache.size())
+
+
+# In[ ]:
+
+
+
+
@@ -3,7 +3,6 @@
 
 # In[26]:
 
-import pandas
 import time
 import sys
 sys.path.append('.')
@@ -13,8 +12,8 @@ import RM_helper
 import RM_ADP
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.legend_handler import HandlerLine2D
+pandas = RM_helper.lazy_import('pandas')
+plt = RM_helper.lazy_import('matplotlib.pyplot')
 
 
 # In[27]:
@@ -70,8 +69,8 @@ def compare_iDAVN_singleDPstatic(products, resources, n_class, cap_lb, cap_ub, c
 
 
 # Compare
-products = [['1a', (17.3, 5.8), 1050], ['2a', (45.1, 15.0),950], ['3a', (39.6, 13.2), 699], ['4a', (34.0, 11.3),520],            ['1b', (20, 3.5), 501], ['2b', (63.1, 2.5), 352], ['3b', (22.5, 6.1), 722], ['1ab', (11.5, 2.1), 760],            ['2ab', (24.3, 6.4), 1400]]
-resources = ['a', 'b']
+# products = [['1a', (17.3, 5.8), 1050], ['2a', (45.1, 15.0),950], ['3a', (39.6, 13.2), 699], ['4a', (34.0, 11.3),520],            ['1b', (20, 3.5), 501], ['2b', (63.1, 2.5), 352], ['3b', (22.5, 6.1), 722], ['1ab', (11.5, 2.1), 760],            ['2ab', (24.3, 6.4), 1400]]
+# resources = ['a', 'b']
 # compare_iDAVN_singleDPstatic(products,resources, 6, 80, 120, 10)
 # lb = 60
 # # ub = 160
@@ -163,7 +162,7 @@ def evaluate_network_control(products, resources, demands, capacities, approxed_
 def decide_to_sell(incidence_vector, remained_cap, resource_bid_prices, profit, t, s):
     """deicide at time t, state s, whether to sell the product according to its profit"""
     if t < len(resource_bid_prices) - 1:
-        bid_prices = resource_bid_prices[t+1][s]
+        bid_prices = RM_helper.bid_prices_at(resource_bid_prices, t+1, s, remained_cap)
         opportunity_cost = np.dot(incidence_vector, bid_prices)
     else:
         opportunity_cost = 0
@@ -312,10 +311,93 @@ def simulate_single_static_protectionlevel_control(protection_levels, products,
     result = [(revs[m], round((capacity - curr_cap[m]) / capacity * 100,3)) for m in range(n_methods)]
     return result
 
-pros = [[1, 1050,(17.3, 5.8)], [2, 950, (45.1, 15.0)], [3, 699, (39.6, 13.2)], [4,520,(34.0, 11.3)]]
-cap = 80
-products, demands, _ = RM_helper.sort_product_demands(pros)
-exact = RM_exact.Single_RM_static(products, demands, cap)
+def simulate_single_static_bidprices_control_batch(bid_prices, products, capacity, requests):
+    """Simulates bid-price control, on a single-static problem, with initial capacity given, for a batch of sampled
+    demands and all the methods at once.
+    ----------------------------
+    Inputs:
+        bid_prices: bid prices of methods to be simulated
+        products: i.e. itineraries, assumed to be sorted in descending order of revenus, in the form of 
+                (name, revenue)
+        capacity: initial capacity of the resource
+        requests: sampled demands for each product, size n_samples * n_products
+    Returns: total revenue and load factor of each method in each sample, both of size n_methods * n_samples. """
+    
+    requests = np.asarray(requests, dtype=int)
+    n_methods = len(bid_prices)
+    n_samples = len(requests)
+    n_products = len(products)
+    prices = np.array([p[1] for p in products], dtype=float)
+    
+    revs = np.zeros((n_methods, n_samples))
+    curr_cap = np.full((n_methods, n_samples), capacity, dtype=int)
+    methods = np.arange(n_methods)[:, None]
+    
+    # acceptable[m, j, x] indicates whether product j + 1 is worth selling with x remaining capacity under method m,
+    # lowest_acceptable[m, j, y] records the lowest acceptable remaining capacity that is not less than y, so that 
+    # the back-off search for how many seats to sell becomes a single lookup
+    bp = np.array([[bid_prices[m][j][:capacity + 1] for j in range(n_products - 1)] for m in range(n_methods)], 
+                  dtype=float).reshape(n_methods, n_products - 1, capacity + 1)
+    acceptable = prices[1:, None] >= bp
+    lowest_acceptable = np.where(acceptable, np.arange(capacity + 1), capacity + 1)
+    lowest_acceptable = np.minimum.accumulate(lowest_acceptable[:, :, ::-1], axis=2)[:, :, ::-1]
+    
+    for fare_class in range(n_products - 1, 0, -1):
+        price = prices[fare_class]
+        willing_to_sell = acceptable[methods, fare_class - 1, curr_cap]
+        request = np.clip(requests[:, fare_class], 0, curr_cap)
+        remain_cap = lowest_acceptable[methods, fare_class - 1, curr_cap - request]
+        # only sell product of current fare class if its profit exceeds the bid price of current class
+        z = np.where(willing_to_sell, curr_cap - remain_cap, 0)
+        curr_cap -= z
+        revs += price * z
+    # for the highest fare class, accept all requests
+    z = np.minimum(requests[:, 0], curr_cap)
+    curr_cap -= z
+    revs += prices[0] * z
+    
+    load_factors = np.round((capacity - curr_cap) / capacity * 100, 3)
+    return revs, load_factors
+
+def simulate_single_static_protectionlevel_control_batch(protection_levels, products, capacity, requests):
+    """Simulates protection-level control, on a single-static problem, with initial capacity given, for a batch of 
+    sampled demands and all the methods at once.
+    ----------------------------
+    Inputs:
+        protection_levels: protection levels of methods to be simulated
+        products: i.e. itineraries, assumed to be sorted in descending order of revenus, in the form of 
+                (name, revenue)
+        capacity: initial capacity of the resource
+        requests: sampled demands for each product, size n_samples * n_products
+    Returns: total revenue and load factor of each method in each sample, both of size n_methods * n_samples. """
+    
+    requests = np.asarray(requests, dtype=int)
+    n_methods = len(protection_levels)
+    n_samples = len(requests)
+    n_products = len(products)
+    prices = np.array([p[1] for p in products], dtype=float)
+    pl = np.array([protection_levels[m][:n_products - 1] for m in range(n_methods)], dtype=float)
+    
+    revs = np.zeros((n_methods, n_samples))
+    curr_cap = np.full((n_methods, n_samples), capacity, dtype=int)
+    
+    for fare_class in range(n_products - 1, 0, -1):
+        pl_j = pl[:, fare_class - 1, None]
+        decision = np.minimum(np.maximum(0, curr_cap - pl_j), requests[:, fare_class]).astype(int)
+        curr_cap -= decision
+        revs += prices[fare_class] * decision
+    # for the highest fare class, accept all requests
+    decision = np.minimum(requests[:, 0], curr_cap)
+    curr_cap -= decision
+    revs += prices[0] * decision
+    
+    load_factors = np.round((capacity - curr_cap) / capacity * 100, 3)
+    return revs, load_factors
+
+# pros = [[1, 1050,(17.3, 5.8)], [2, 950, (45.1, 15.0)], [3, 699, (39.6, 13.2)], [4,520,(34.0, 11.3)]]
+# cap = 80
+# products, demands, _ = RM_helper.sort_product_demands(pros)
+# exact = RM_exact.Single_RM_static(products, demands, cap)
 # exact_bid_prices = exact.get_bid_prices()
 # print(simulate_single_static_bidprices_control([exact_bid_prices], products, demands, cap))
 
@@ -331,7 +413,8 @@ def simulate_network_bidprices_control(bid_prices, products, resources,  capacit
     """Simulates bid-price control over the horizon T, on a network problems, with initial capacity given. 
     ----------------------------
     Inputs:
-        bid_prices: bid prices of methods to be simulated
+        bid_prices: bid prices of methods to be simulated, for every state in every time period, 
+            or in the compact form, i.e. an RM_helper.compact_bid_prices_table
         products: i.e. itineraries, assumed to be sorted in descending order of revenus, in the form of (name, revenue)
         resources: i.e. flight legs
         capacities: initial capacities of resources
@@ -358,7 +441,7 @@ def simulate_network_bidprices_control(bid_prices, products, resources,  capacit
             profit = products[prod_requested][1]
             for i in range(n_methods):
                 if t < (T - 1): 
-                    bp_t = bid_prices[i][t+1][state_index[i]]
+                    bp_t = RM_helper.bid_prices_at(bid_prices[i], t+1, state_index[i], curr_caps[i])
                     opportunity_cost = np.dot(incidence_vector, bp_t)
                 else:
                     opportunity_cost = 0
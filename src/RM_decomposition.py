@@ -0,0 +1,226 @@
+# coding: utf-8
+
+# In[1]:
+
+import concurrent.futures
+import numpy as np
+
+import sys
+sys.path.append('.')
+import RM_helper
+import RM_exact
+
+
+# In[2]:
+
+###########################################
+###### Network decomposition ##############
+###########################################
+
+def connected_components(incidence_matrix):
+    """finds the groups of resources that are connected through products, i.e. two resources are in the same group if
+    a product uses both of them, directly or through other resources.
+    returns a list of lists of resource indices, in the order of the first resource of each group"""
+    incidence_matrix = np.asarray(incidence_matrix)
+    n_resources = incidence_matrix.shape[0]
+    parents = list(range(n_resources))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for j in range(incidence_matrix.shape[1]):
+        used = np.flatnonzero(incidence_matrix[:, j])
+        for i in used[1:]:
+            parents[find(i)] = find(used[0])
+
+    groups = {}
+    for i in range(n_resources):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+def resource_link_weights(incidence_matrix, product_weights = None):
+    """calculates the weight of the link between each pair of resources, as the sum of the weights of products using
+    both of them(default as 1 for each product, e.g. arrival rate times fare can be given instead).
+    returns a 2D np array, size n_resources * n_resources"""
+    incidence_matrix = np.asarray(incidence_matrix, dtype=float)
+    if product_weights is None:
+        product_weights = np.ones(incidence_matrix.shape[1])
+    links = (incidence_matrix * product_weights).dot(incidence_matrix.T)
+    np.fill_diagonal(links, 0)
+    return links
+
+def partition_resources(incidence_matrix, max_resources = 2, product_weights = None):
+    """partitions the resources into groups of at most max_resources resources, which are solved as subnetworks.
+    Resources in different connected components are never grouped together. A component with more resources is
+    split with a greedy min-cut: each group starts from the remaining resource with the heaviest links, then grows by
+    adding the resource with the heaviest links to the group, so that the weights of products cut across groups are
+    kept small.
+    returns a list of lists of resource indices"""
+    if max_resources < 1:
+        raise ValueError('RM_decomposition: partition_resources(), Max number of resources should be positive.')
+    links = resource_link_weights(incidence_matrix, product_weights)
+
+    groups = []
+    for component in connected_components(incidence_matrix):
+        remaining = component[:]
+        while remaining:
+            seed = max(remaining, key=lambda i: links[i, remaining].sum())
+            group = [seed]
+            remaining.remove(seed)
+            while remaining and len(group) < max_resources:
+                link_to_group = links[np.ix_(remaining, group)].sum(axis=1)
+                if link_to_group.max() <= 0:
+                    break
+                group.append(remaining.pop(int(np.argmax(link_to_group))))
+            groups.append(sorted(group))
+    return groups
+
+def prorate_fares(products, incidence_matrix, groups, resource_weights = None):
+    """prorates the fare of each product among the groups of resources it uses, in proportion to the weights of the
+    resources it uses in each group(default as 1 for each resource, e.g. static bid prices or leg distances can be
+    given instead).
+    returns a 2D np array of prorated fares, size n_groups * n_products, where products not using any resource of
+    a group get 0 in that group"""
+    incidence_matrix = np.asarray(incidence_matrix, dtype=float)
+    if resource_weights is None:
+        resource_weights = np.ones(incidence_matrix.shape[0])
+    resource_weights = np.asarray(resource_weights, dtype=float)
+    fares = np.array([p[1] for p in products], dtype=float)
+
+    group_weights = np.array([resource_weights[group].dot(incidence_matrix[group]) for group in groups])
+    total_weights = group_weights.sum(axis=0)
+    # products whose resources all have zero weights are prorated by the number of resources used in each group
+    n_used = np.array([incidence_matrix[group].sum(axis=0) for group in groups])
+    no_weights = total_weights <= 0
+    group_weights[:, no_weights] = n_used[:, no_weights]
+    total_weights[no_weights] = n_used[:, no_weights].sum(axis=0)
+
+    return group_weights / np.maximum(total_weights, 1e-12) * fares
+
+
+# In[3]:
+
+class Network_decomposition():
+    """Decomposes a network revenue management problem into subnetworks, each solved exactly with Network_RM, and
+    approximates the value function of the network by the sum of the value functions of the subnetworks,
+        with the following attributes:
+
+        Given:
+        ----------
+        products: 2D np array
+            contains products, each represented in the form of [product_name, expected_revenue, arrival_rate],
+            the arrival rate is the probability that a request for the product arrives in each time period
+        resources: np array
+            contains names of resources, size n_resources
+        capacities: np array
+            contains the capacity for each resource
+            size n_resources
+        total_time: integer
+            the max time period T, time period t ranges from 1 to T
+        max_resources: integer
+            the max number of resources in each subnetwork
+        resource_weights: np array
+            weights of resources used to prorate fares of products across subnetworks, default as equal weights
+
+        To be calculated:
+        ----------
+        groups: 2D list
+            contains the indices of resources in each subnetwork
+        subproblems: list
+            contains the arguments of RM_exact.solve_network_RM for each subnetwork, i.e.
+            (sub_products, sub_resources, sub_capacities, total_time, sub_arrival_rates)
+        value_functions: list
+            contains the value functions of each subnetwork, size n_subnets * total_time * n_sub_states
+    """
+
+    def __init__(self, products, resources, capacities, total_time, max_resources = 2, resource_weights = None):
+        self.products = products
+        self.resources = resources
+        self.capacities = capacities
+        self.total_time = total_time
+        self.n_products = len(products)
+        self.n_resources = len(resources)
+
+        if len(capacities) != self.n_resources:
+            raise ValueError('RM_decomposition: Network_decomposition init(), Number of capacities for resources is '
+                             'not correct.')
+
+        self.incidence_matrix = RM_helper.calc_incidence_matrix(products, resources)
+        self.value_functions = []
+        self.decompose_network(max_resources, resource_weights)
+
+    def decompose_network(self, max_resources, resource_weights):
+        """helper func: partitions resources into subnetworks, weighting products by their expected revenues in each
+        time period, and collects the products of each subnetwork, with their fares prorated."""
+        product_weights = [p[1] * p[2] for p in self.products]
+        self.groups = partition_resources(self.incidence_matrix, max_resources, product_weights)
+        prorated_fares = prorate_fares(self.products, self.incidence_matrix, self.groups, resource_weights)
+
+        incidence = np.array(self.incidence_matrix)
+        self.subproblems = []
+        self.sub_strides = []
+        for g in range(len(self.groups)):
+            group = self.groups[g]
+            sub_resources = [self.resources[i] for i in group]
+            sub_capacities = [self.capacities[i] for i in group]
+            # products using any resource of this subnetwork
+            sub_products = [[self.products[j][0], float(prorated_fares[g][j]), self.products[j][2]]
+                            for j in np.flatnonzero(incidence[group].any(axis=0))]
+            sub_products, sub_arrival_rates, _ = RM_helper.sort_product_demands(sub_products)
+            self.subproblems.append((sub_products, sub_resources, sub_capacities, self.total_time,
+                                     sub_arrival_rates))
+            self.sub_strides.append(RM_helper.state_strides(sub_capacities))
+
+    def calc_value_func(self, n_workers = 1):
+        """calculate the value functions of all subnetworks, in n_workers worker processes if n_workers > 1."""
+        if n_workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                self.value_functions = list(executor.map(RM_exact.solve_network_RM, *zip(*self.subproblems)))
+        else:
+            self.value_functions = [RM_exact.solve_network_RM(*subproblem) for subproblem in self.subproblems]
+        return self.value_functions
+
+    def approx_value_func(self, t, curr_cap):
+        """approximates the value function at time t, with remaining capacity-curr_cap, by the sum of the values of
+        subnetworks."""
+        if not self.value_functions:
+            self.calc_value_func()
+        approxed_vf = 0
+        for g in range(len(self.groups)):
+            sub_state = int(np.dot([curr_cap[i] for i in self.groups[g]], self.sub_strides[g]))
+            approxed_vf += self.value_functions[g][t][sub_state]
+        return approxed_vf
+
+    def accept_request(self, t, curr_cap, product_index):
+        """decides whether to accept a request for the given product, at time t, with remaining capacity-curr_cap."""
+        incidence_vector = [row[product_index] for row in self.incidence_matrix]
+        if any(c < x for c, x in zip(curr_cap, incidence_vector)):
+            # don't sell if not enough resources capacities
+            return False
+        if t == self.total_time - 1:
+            return True
+        after_sell_cap = [c-x for c, x in zip(curr_cap, incidence_vector)]
+        opportunity_cost = self.approx_value_func(t + 1, curr_cap) - self.approx_value_func(t + 1, after_sell_cap)
+        # sell if the revenue of the requested product exceeds the approximated opportunity cost
+        return self.products[product_index][1] >= opportunity_cost
+
+    def total_expected_revenue(self):
+        """returns the approximated expected revenue, with the initial capacities"""
+        return self.approx_value_func(0, self.capacities)
+
+# products = [['A-hub,1', 136, 0.015], ['B-hub,1', 64, 0.011], ['hub-A,1', 59, 0.015], ['hub-B,1', 114, 0.03],
+#             ['A-hub-B,1', 80, 0.012], ['B-hub-A,1', 102, 0.01], ['A-hub-A,1', 60, 0.06], ['B-hub-B,1', 205, 0.048]]
+# resources = ['A-hub', 'B-hub', 'hub-A', 'hub-B']
+# problem = Network_decomposition(products, resources, [3] * 4, 10)
+# print(problem.groups)
+# print(problem.total_expected_revenue())
+
+
+# In[ ]:
+
+
+
+
@@ -5,12 +5,8 @@
 
 import itertools
 import random
-import pandas
 import time
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.legend_handler import HandlerLine2D
-import networkx as nx
 import math
 
 import sys
@@ -20,7 +16,14 @@ import RM_compare
 import RM_exact
 import RM_approx
 import RM_ADP
+import RM_cache
 import RM_demand_model
+import RM_instrument
+import RM_results
+
+pandas = RM_helper.lazy_import('pandas')
+plt = RM_helper.lazy_import('matplotlib.pyplot')
+nx = RM_helper.lazy_import('networkx')
 
 
 # In[13]:
@@ -162,14 +165,15 @@ def extract_legs_info(products, resources):
 
 # In[4]:
 
-def compare_EMSR_b_with_exact_single_static(pros, cap, iterations):
-    """Compare the EMSR-b method, with single-static DP model."""
+def compare_EMSR_b_with_exact_single_static(pros, cap, iterations, distribution = 'normal', rounding = 'trunc'):
+    """Compare the EMSR-b method, with single-static DP model. 
+    The exact model uses the same discretised demand distribution as the sampled demands in simulations."""
     products, demands,_ = RM_helper.sort_product_demands(pros)
     
     diff_percents = []
     
     exact_time = time.time()
-    exact = RM_exact.Single_RM_static(products, demands, cap)
+    exact = RM_exact.Single_RM_static(products, demands, cap, distribution, rounding)
     exact_bid_prices = exact.get_bid_prices()
     exact_protection_levels = exact.get_protection_levels()
     exact_time = time.time() - exact_time
@@ -182,29 +186,22 @@ def compare_EMSR_b_with_exact_single_static(pros, cap, iterations):
     bid_prices = [exact_bid_prices]
     protection_levels = [exact_protection_levels, heuri_protection_levels]
     
+    requests = RM_helper.sample_single_static_demands_batch(demands, iterations, distribution, rounding)
+    bp_revs, bp_LF = RM_compare.simulate_single_static_bidprices_control_batch(bid_prices, products, cap, requests)
+    pl_revs, pl_LF = RM_compare.simulate_single_static_protectionlevel_control_batch(protection_levels, products,
+                                                                                     cap, requests)
+    exact_pl_rev = pl_revs[0]
+    exact_pl_LF = pl_LF[0]
+    
     # comparison result of exact method using bid-price control and protection-level control
-    exact_revs_diff = []
-    exact_LF_diff = []
+    exact_revs_diff = np.round((exact_pl_rev - bp_revs[0]) / exact_pl_rev, 5)
+    exact_LF_diff = np.round((exact_pl_LF - bp_LF[0]) / exact_pl_LF, 5)
     # comparison result of exact method vs EMSR-b method, both using protection-level control
-    exact_heuri_revs_diff = []
-    exact_heuri_LF_diff = []
-    exact_revs = []
+    exact_heuri_revs_diff = np.round((exact_pl_rev - pl_revs[1]) / exact_pl_rev, 5)
+    exact_heuri_LF_diff = np.round((exact_pl_LF - pl_LF[1]) / exact_pl_LF, 5)
+    exact_revs = exact_pl_rev
 
     results = [exact_protection_levels]
-    for i in range(iterations):
-        requests = RM_helper.sample_single_static_demands(demands)
-        bp_result = RM_compare.simulate_single_static_bidprices_control(bid_prices, products, demands, cap, requests)
-        pl_result = RM_compare.simulate_single_static_protectionlevel_control(protection_levels, products, demands,                                                                                cap, requests)
-        
-        exact_pl_rev = pl_result[0][0]
-        exact_pl_LF = pl_result[0][1]
-    
-        exact_revs_diff.append(round((exact_pl_rev - bp_result[0][0])/ exact_pl_rev, 5))
-        exact_LF_diff.append(round((exact_pl_LF - bp_result[0][1])/ exact_pl_LF, 5))
-        exact_heuri_revs_diff.append(round((exact_pl_rev - pl_result[1][0])/exact_pl_rev, 5))
-        exact_heuri_LF_diff.append(round((exact_pl_LF - pl_result[1][1]) / exact_pl_LF, 5))
-        exact_revs.append(exact_pl_rev)
-
     results+= [np.mean(exact_revs_diff) * 100, np.mean(exact_LF_diff) * 100, heuri_protection_levels, 
                np.mean(exact_heuri_revs_diff) * 100, np.std(exact_heuri_revs_diff),
                np.mean(exact_heuri_LF_diff) * 100, np.std(exact_heuri_revs_diff), exact_time, heuri_time,
@@ -297,20 +294,53 @@ def generate_samples(total_num, n_spoke, cap, demand_type, n_fare_class):
         
     return problem_sets
 
+def method_metrics(result, revenue_gap = None, load_factor_gap = None, run_time = None):
+    """helper func: the metrics of a method in an iteration, given its result as (revenue, load factor), to be written
+    to a RM_results.Result_stream or Stats_table"""
+    metrics = {'revenue': result[0], 'load_factor': result[1]}
+    if revenue_gap is not None:
+        metrics['revenue_gap %'] = revenue_gap
+        metrics['load_factor_gap %'] = load_factor_gap
+    if run_time is not None:
+        metrics['time'] = run_time
+    return metrics
+
+def result_gaps(result, baseline, below = False):
+    """helper func: the gaps in % of revenue and load factor of a method's result over the baseline's, or below the
+    baseline's if below is True"""
+    sign = -1 if below else 1
+    return (sign * (result[0] - baseline[0]) / baseline[0] * 100, sign * (result[1] - baseline[1]) / baseline[1] * 100)
+
 
 # In[27]:
 
-def compare_with_DP(total_num, n_spoke, cap, iterations, demand_type, n_virtual_class, K):
-    """ small network problems, solved by DP, DLPDAVN, and ADP respectively """
+def compare_with_DP(total_num, n_spoke, cap, iterations, demand_type, n_virtual_class, K, profile = None,
+                    cache = None, stream = None, stats = None, ci_target = None, min_iterations = 10):
+    """ small network problems, solved by DP, DLPDAVN, and ADP respectively.
+    If profile is given, as a directory or True, the planning and simulation phases of each method are profiled, see
+    RM_instrument.Method_profiler. If cache(an RM_cache.Cache) is given, the bid prices of DP and ADP are loaded from
+    it for problems solved before. If stream(an RM_results.Result_stream) is given, the results of each iteration are
+    written to it, iterations already written are skipped, and the table is computed from it. The results are
+    accumulated in stats(an RM_results.Stats_table, new if not given), after the rows already in stream if any, e.g.
+    for their confidence intervals.
+    If ci_target is given, iterations becomes the maximum budget on each problem: simulation stops once at least
+    min_iterations are done, and the 95% confidence interval half-width of the revenue gap of every method is within
+    ci_target(in %). All methods are simulated on the same requests in each iteration, so the gaps have less variance
+    than the revenues themselves """
     col_titles = ["rev_DLPDAVN_mean %", "loadF_DLPDAVN_mean %", "rev_LPADP_mean %", "loadF_LPADP_mean %", 
                   "rev_DLPVD_mean %", "loadF_DLPVD_mean","exact_rev", "exact_LF"]
-    table_data = []
     exact_DP_time = 0
     DLPVD_time = 0
+    profiler = RM_instrument.Method_profiler(profile)
+    if stats is None:
+        stats = RM_results.Stats_table()
+    if stream is not None:
+        stats.add_dataframe(stream.read())
+    table_columns = [('DLPDAVN', 'revenue_gap %'), ('DLPDAVN', 'load_factor_gap %'), ('LPADP', 'revenue_gap %'),
+                     ('LPADP', 'load_factor_gap %'), ('DLPVD', 'revenue_gap %'), ('DLPVD', 'load_factor_gap %'),
+                     ('exact_DP', 'revenue'), ('exact_DP', 'load_factor')]
     problems = generate_samples(total_num, n_spoke, cap, demand_type, 1)
-    for prob in problems:
-        compare_results = [[] for _ in range(len(col_titles))]
-        
+    for prob_index, prob in enumerate(problems):
         products = prob[0]
         resources = prob[1]
         capacities = prob[2]
@@ -323,40 +353,49 @@ def compare_with_DP(total_num, n_spoke, cap, iterations, demand_type, n_virtual_
         DLPVD_model = RM_approx.DLPVD(products, resources, capacities, total_time, demand_model)
         
         t = time.time()
-        exactDP_bid_prices = exactDP_model.get_bid_prices()
+        with profiler.phase('exact_DP', 'planning'):
+            exactDP_bid_prices = RM_cache.network_RM_bid_prices(exactDP_model, cache)
         exact_DP_time += time.time() - t
-        LPADP_bid_prices = LPADP_model.get_bid_prices(K)
+        with profiler.phase('LPADP', 'planning'):
+            LPADP_bid_prices = RM_cache.ALP_bid_prices(LPADP_model, K, cache)
         
         bid_prices = [exactDP_bid_prices, LPADP_bid_prices]
-        bid_prices = [exactDP_bid_prices]
         
         for i in range(iterations):
+            if ci_target is not None and stats.converged(prob_index, 'revenue_gap %', ci_target, min_iterations):
+                break
             requests = demand_model.sample_network_arrival_rates()
+            if stream is not None and stream.done(prob_index, i):
+                continue
             
-            eval_results = RM_compare.simulate_network_bidprices_control(bid_prices, products, resources, capacities,                                                                         total_time, requests)
-            exactDP_rev = eval_results[0][0]
-            exactDP_LF = eval_results[0][1]
+            with profiler.phase('exact_DP, LPADP', 'simulation'):
+                eval_results = RM_compare.simulate_network_bidprices_control(bid_prices, products, resources,
+                                                                             capacities, total_time, requests)
+            exactDP_result = eval_results[0]
             
-            DLPDAVN_result = DLPDAVN_model.performance(requests)
-            compare_results[0].append((exactDP_rev - DLPDAVN_result[0])/exactDP_rev * 100)
-            compare_results[1].append((exactDP_LF - DLPDAVN_result[1]) / exactDP_LF * 100)
+            with profiler.phase('DLPDAVN', 'simulation'):
+                DLPDAVN_result = DLPDAVN_model.performance(requests)
             
-            LPADP_results = eval_results[1]
-            compare_results[2].append((exactDP_rev - LPADP_results[0])/exactDP_rev * 100)
-            compare_results[3].append((exactDP_LF - LPADP_results[1]) / exactDP_LF * 100)
+            LPADP_result = eval_results[1]
             
             t = time.time()
-            DLPVD_result = DLPVD_model.performance(requests)
+            with profiler.phase('DLPVD', 'simulation'):
+                DLPVD_result = DLPVD_model.performance(requests)
             DLPVD_time += time.time() - t
-            compare_results[0].append((exactDP_rev - DLPVD_result[0])/exactDP_rev * 100)
-            compare_results[1].append((exactDP_LF - DLPVD_result[1]) / exactDP_LF * 100)
-            
-            compare_results[2].append(exactDP_rev)
-            compare_results[3].append(exactDP_LF)
             
-        table_data.append([np.mean(result) for result in compare_results])
+            # gaps of the approximations below the exact DP
+            rows = {'exact_DP': method_metrics(exactDP_result), 
+                    'DLPDAVN': method_metrics(DLPDAVN_result, *result_gaps(DLPDAVN_result, exactDP_result, True)),
+                    'LPADP': method_metrics(LPADP_result, *result_gaps(LPADP_result, exactDP_result, True)),
+                    'DLPVD': method_metrics(DLPVD_result, *result_gaps(DLPVD_result, exactDP_result, True))}
+            stats.add(prob_index, rows)
+            if stream is not None:
+                stream.write(prob_index, i, rows)
             
+    table_data = (stream if stream is not None else stats).table(len(problems), table_columns)
     print(pandas.DataFrame(table_data,  columns = col_titles))
+    if profile:
+        print(profiler.dump())
     return table_data, exact_DP_time, DLPVD_time
     
 # result = compare_with_DP(15, 4, 3, 1, 1, 3, 100)
@@ -502,15 +541,22 @@ def eval_networkDP_runningTime(products, resources, cap_lb, cap_ub, total_time):
 # In[26]:
 
 # compare different numbers of virtual classes that DAVN decomposes into, in terms of revenue performance
-def DAVN_compare_n_vc(total_num, n_spoke, cap, iterations, demand_type, n_virtual_classes):
+def DAVN_compare_n_vc(total_num, n_spoke, cap, iterations, demand_type, n_virtual_classes, profile = None,
+                      stream = None, stats = None, ci_target = None, min_iterations = 10):
     col_titles = ["rev_DLPVD", "LF_DLPVD","rev_DLPDAVN_mean %", "loadF_DLPDAVN_mean %", "DLPDAVN_time"]
-    table_data = []
+    profiler = RM_instrument.Method_profiler(profile)
+    if stats is None:
+        stats = RM_results.Stats_table()
+    if stream is not None:
+        stats.add_dataframe(stream.read())
     problems = generate_samples(total_num, n_spoke, cap, demand_type, 1)
     n_vc = len(n_virtual_classes)
-    for prob in problems:
-        compare_results = [[] for _ in range(len(col_titles))]
-        for index in [2, 3, 4]:
-            compare_results[index] = [[] for _ in range(n_vc)]
+    DLPDAVN_names = ['DLPDAVN_vc=' + str(n) for n in n_virtual_classes]
+    table_columns = [('DLPVD', 'revenue'), ('DLPVD', 'load_factor'), 
+                     [(name, 'revenue_gap %') for name in DLPDAVN_names],
+                     [(name, 'load_factor_gap %') for name in DLPDAVN_names],
+                     [(name, 'time') for name in DLPDAVN_names]]
+    for prob_index, prob in enumerate(problems):
 #         print(prob)
         products = prob[0]
         resources = prob[1]
@@ -524,31 +570,31 @@ def DAVN_compare_n_vc(total_num, n_spoke, cap, iterations, demand_type, n_virtua
             DLPDAVN_models.append(RM_approx.DLP_DAVN(products, resources, capacities, total_time,                                                     n_virtual_classes[index], demand_model))
             
         for i in range(iterations):
+            if ci_target is not None and stats.converged(prob_index, 'revenue_gap %', ci_target, min_iterations):
+                break
             requests = demand_model.sample_network_arrival_rates()
-            DLPVD_result = DLPVD_model.performance(requests)
-            
-            DLPVD_rev = DLPVD_result[0]
-            DLPVD_LF = DLPVD_result[1]
-            compare_results[0].append(DLPVD_rev)
-            compare_results[1].append(DLPVD_LF)
+            if stream is not None and stream.done(prob_index, i):
+                continue
+            with profiler.phase('DLPVD', 'simulation'):
+                DLPVD_result = DLPVD_model.performance(requests)
+            rows = {'DLPVD': method_metrics(DLPVD_result)}
             
             for index in range(n_vc):
                 DLPDAVN_time = time.time()
-                DLPDAVN_result = DLPDAVN_models[index].performance(requests)
+                with profiler.phase(DLPDAVN_names[index], 'simulation'):
+                    DLPDAVN_result = DLPDAVN_models[index].performance(requests)
                 DLPDAVN_time = time.time() - DLPDAVN_time
-                compare_results[-1][index].append(DLPDAVN_time)
-                compare_results[2][index].append((DLPDAVN_result[0] - DLPVD_rev)/DLPVD_rev * 100)
-                compare_results[3][index].append((DLPDAVN_result[1] - DLPVD_LF)/DLPVD_LF * 100)
-                
-        results = [np.mean(compare_results[0]), np.mean(compare_results[1])]
-        results += [np.mean(compare_results[2], 1)]
-        results += [np.mean(compare_results[3], 1)]
-        results.append(np.mean(compare_results[-1], 1))
-        
-        table_data.append(results)
+                rows[DLPDAVN_names[index]] = method_metrics(DLPDAVN_result, *result_gaps(DLPDAVN_result, DLPVD_result),
+                                                            run_time=DLPDAVN_time)
+            stats.add(prob_index, rows)
+            if stream is not None:
+                stream.write(prob_index, i, rows)
         
+    table_data = (stream if stream is not None else stats).table(len(problems), table_columns)
     df = pandas.DataFrame(table_data,  columns = col_titles)
     print(df)
+    if profile:
+        print(profiler.dump())
     return table_data, df
     
 # VCs = [1,2,3,4]
@@ -600,14 +646,30 @@ def DAVN_compare_n_vc(total_num, n_spoke, cap, iterations, demand_type, n_virtua
 # In[25]:
 
 # compare performances of DLPDAVN and LPADP against DLPVD
-def compare_with_DLPVD(total_num, n_spoke, cap, iterations, demand_type, n_virtual_classes, Ks):
+def compare_with_DLPVD(total_num, n_spoke, cap, iterations, demand_type, n_virtual_classes, Ks, profile = None,
+                       cache = None, stream = None, stats = None, ci_target = None, min_iterations = 10):
+    """ profile, cache, stream, stats, ci_target and min_iterations are as in compare_with_DP. 
+    LPADP is solved in every iteration, which draws random numbers, so when resuming from a stream without a cache,
+    the LPADP of each iteration skipped is solved again, so that the requests sampled afterwards are the same as in an
+    uninterrupted run with the same seed. With a cache, the solutions are loaded instead, drawing no random numbers
+    (see RM_cache), so the requests are the same only if the cache holds the solutions of every iteration in both
+    runs """
     col_titles = ["rev_DLPVD", "LF_DLPVD","rev_DLPDAVN_mean %", "loadF_DLPDAVN_mean %", "rev_LPADP_mean %", 
                   "loadF_LPADP_mean %"]
-    table_data = []
+    profiler = RM_instrument.Method_profiler(profile)
+    if stats is None:
+        stats = RM_results.Stats_table()
+    if stream is not None:
+        stats.add_dataframe(stream.read())
+    DLPDAVN_names = ['DLPDAVN_vc=' + str(n) for n in n_virtual_classes]
+    LPADP_names = ['LPADP_K=' + str(K) for K in Ks]
+    table_columns = [('DLPVD', 'revenue'), ('DLPVD', 'load_factor'), 
+                     [(name, 'revenue_gap %') for name in DLPDAVN_names],
+                     [(name, 'load_factor_gap %') for name in DLPDAVN_names],
+                     [(name, 'revenue_gap %') for name in LPADP_names],
+                     [(name, 'load_factor_gap %') for name in LPADP_names]]
     problems = generate_samples(total_num, n_spoke, cap, demand_type, 1)
-    for prob in problems:
-        compare_results = [[] for _ in range(len(col_titles))]
-        
+    for prob_index, prob in enumerate(problems):
         products = prob[0]
         resources = prob[1]
         capacities = prob[2]
@@ -618,42 +680,44 @@ def compare_with_DLPVD(total_num, n_spoke, cap, iterations, demand_type, n_virtu
         DLPDAVN_models = [RM_approx.DLP_DAVN(products, resources, capacities, total_time, n_vc, demand_model)
                           for n_vc in n_virtual_classes]
         LPADP_model = RM_ADP.ALP(products, resources, capacities, total_time, demand_model)
-        compare_results[2] = [[] for _ in range(len(n_virtual_classes))]
-        compare_results[3] = [[] for _ in range(len(n_virtual_classes))]
-        compare_results[4] = [[] for _ in range(len(Ks))]
-        compare_results[5] = [[] for _ in range(len(Ks))]
         
         for i in range(iterations):
+            if ci_target is not None and stats.converged(prob_index, 'revenue_gap %', ci_target, min_iterations):
+                break
             requests = demand_model.sample_network_arrival_rates()
+            if stream is not None and stream.done(prob_index, i):
+                for q in range(len(Ks)):
+                    RM_cache.ALP_bid_prices(LPADP_model, Ks[q], cache, sample=i)
+                continue
             
-            DLPVD_result = DLPVD_model.performance(requests)
-            DLPVD_rev = DLPVD_result[0]
-            DLPVD_LF = DLPVD_result[1]
-            
-            compare_results[0].append(DLPVD_rev)
-            compare_results[1].append(DLPVD_LF)
-            
+            with profiler.phase('DLPVD', 'simulation'):
+                DLPVD_result = DLPVD_model.performance(requests)
+            rows = {'DLPVD': method_metrics(DLPVD_result)}
             
             for p in range(len(n_virtual_classes)):
-                DLPDAVN_result = DLPDAVN_models[p].performance(requests)
-                compare_results[2][p].append((DLPDAVN_result[0] - DLPVD_rev)/DLPVD_rev * 100)
-                compare_results[3][p].append((DLPDAVN_result[1] - DLPVD_LF) / DLPVD_LF * 100)
+                with profiler.phase(DLPDAVN_names[p], 'simulation'):
+                    DLPDAVN_result = DLPDAVN_models[p].performance(requests)
+                rows[DLPDAVN_names[p]] = method_metrics(DLPDAVN_result, *result_gaps(DLPDAVN_result, DLPVD_result))
             
             for q in range(len(Ks)):
-                LPADP_bid_prices = LPADP_model.get_bid_prices(Ks[q])
-                eval_results = RM_compare.simulate_network_bidprices_control([LPADP_bid_prices], products, resources,                                                                              capacities, total_time, requests)
-
-                LPADP_results = eval_results[0]
-                compare_results[4][q].append((LPADP_results[0] - DLPVD_rev)/DLPVD_rev * 100)
-                compare_results[5][q].append((LPADP_results[1] - DLPVD_LF) / DLPVD_LF * 100)
-            
-        problem_result = [np.mean(result) for result in compare_results[:2]]
-        problem_result += [np.mean(result, 1) for result in compare_results[2:4]]
-        problem_result += [np.mean(result, 1) for result in compare_results[4:6]]
-        table_data.append(problem_result)
+                with profiler.phase(LPADP_names[q], 'planning'):
+                    LPADP_bid_prices = RM_cache.ALP_bid_prices(LPADP_model, Ks[q], cache, sample=i)
+                with profiler.phase(LPADP_names[q], 'simulation'):
+                    eval_results = RM_compare.simulate_network_bidprices_control([LPADP_bid_prices], products,
+                                                                                 resources, capacities, total_time,
+                                                                                 requests)
+
+                LPADP_result = eval_results[0]
+                rows[LPADP_names[q]] = method_metrics(LPADP_result, *result_gaps(LPADP_result, DLPVD_result))
+            stats.add(prob_index, rows)
+            if stream is not None:
+                stream.write(prob_index, i, rows)
             
+    table_data = (stream if stream is not None else stats).table(len(problems), table_columns)
     df = pandas.DataFrame(table_data,  columns = col_titles)
     print(df)
+    if profile:
+        print(profiler.dump())
     return table_data, df
     
 # VCs = [2, 4]
@@ -694,16 +758,21 @@ def compare_with_DLPVD(total_num, n_spoke, cap, iterations, demand_type, n_virtu
 # In[19]:
 
 # compare different numbers of states that LPADP samples to obtain conditions, in terms of revenue performance
-def LPADP_compare_K(total_num, n_spoke, cap, iterations, demand_type, Ks):
+def LPADP_compare_K(total_num, n_spoke, cap, iterations, demand_type, Ks, profile = None, cache = None,
+                    stream = None, stats = None, ci_target = None, min_iterations = 10):
     col_titles = ["rev_DLPVD", "LF_DLPVD","rev_LPADP_mean %", "loadF_LPADP_mean %", "LPADP_time"]
-    table_data = []
+    profiler = RM_instrument.Method_profiler(profile)
+    if stats is None:
+        stats = RM_results.Stats_table()
+    if stream is not None:
+        stats.add_dataframe(stream.read())
     problems = generate_samples(total_num, n_spoke, cap, demand_type, 1)
     n_Ks = len(Ks)
-    for prob in problems:
-        compare_results = [[] for _ in range(len(col_titles))]
-        for index in [2, 3, 4]:
-            compare_results[index] = [[] for _ in range(n_Ks)]
-        
+    LPADP_names = ['LPADP_K=' + str(K) for K in Ks]
+    table_columns = [('DLPVD', 'revenue'), ('DLPVD', 'load_factor'), 
+                     [(name, 'revenue_gap %') for name in LPADP_names],
+                     [(name, 'load_factor_gap %') for name in LPADP_names], [(name, 'time') for name in LPADP_names]]
+    for prob_index, prob in enumerate(problems):
         products = prob[0]
         resources = prob[1]
         capacities = prob[2]
@@ -712,37 +781,42 @@ def LPADP_compare_K(total_num, n_spoke, cap, iterations, demand_type, Ks):
         
         LPADP_model = RM_ADP.ALP(products, resources, capacities, total_time, demand_model)
         LPADP_bid_prices = []
+        LPADP_times = []
         DLPVD_model = RM_approx.DLPVD(products, resources, capacities, total_time, demand_model)
         
         for index in range(n_Ks):
             LPADP_time = time.time()
-            LPADP_bid_prices.append(LPADP_model.get_bid_prices(Ks[index]))
-            LPADP_time = time.time() - LPADP_time
-            
-            compare_results[-1][index].append(LPADP_time)
+            with profiler.phase(LPADP_names[index], 'planning'):
+                LPADP_bid_prices.append(RM_cache.ALP_bid_prices(LPADP_model, Ks[index], cache))
+            LPADP_times.append(time.time() - LPADP_time)
             
         for i in range(iterations):
+            if ci_target is not None and stats.converged(prob_index, 'revenue_gap %', ci_target, min_iterations):
+                break
             requests = demand_model.sample_network_arrival_rates()
-            DLPVD_result = DLPVD_model.performance(requests)
-            DLPVD_rev = DLPVD_result[0]
-            DLPVD_LF = DLPVD_result[1]
-            compare_results[0].append(DLPVD_rev)
-            compare_results[1].append(DLPVD_LF)
+            if stream is not None and stream.done(prob_index, i):
+                continue
+            with profiler.phase('DLPVD', 'simulation'):
+                DLPVD_result = DLPVD_model.performance(requests)
             
-            eval_results = RM_compare.simulate_network_bidprices_control(LPADP_bid_prices, products, resources,                                                                          capacities, total_time, requests)
+            with profiler.phase('LPADP', 'simulation'):
+                eval_results = RM_compare.simulate_network_bidprices_control(LPADP_bid_prices, products, resources,
+                                                                             capacities, total_time, requests)
+            rows = {'DLPVD': method_metrics(DLPVD_result)}
             for index in range(n_Ks):
-                compare_results[2][index].append((eval_results[index][0] - DLPVD_rev)/ DLPVD_rev * 100)
-                compare_results[3][index].append((eval_results[index][1] - DLPVD_LF)/ DLPVD_LF * 100)
-                
-        results = [np.mean(compare_results[0]), np.mean(compare_results[1])]
-        results += [np.mean(compare_results[2], 1)]
-        results += [np.mean(compare_results[3], 1)]
-        results.append(np.mean(compare_results[-1], 1))
-        
-        table_data.append(results)
+                # the planning time of LPADP, the same in every iteration
+                rows[LPADP_names[index]] = method_metrics(eval_results[index],
+                                                          *result_gaps(eval_results[index], DLPVD_result),
+                                                          run_time=LPADP_times[index])
+            stats.add(prob_index, rows)
+            if stream is not None:
+                stream.write(prob_index, i, rows)
             
+    table_data = (stream if stream is not None else stats).table(len(problems), table_columns)
     df = pandas.DataFrame(table_data,  columns = col_titles)
     print(df)
+    if profile:
+        print(profiler.dump())
     return table_data, df
     
 # Ks = [100, 200, 300, 400]
@@ -821,9 +895,11 @@ def generate_samples_vary_time(total_num, n_spoke, demand_type, n_fare_class):
     print(len(problem_sets))
     return problem_sets
     
-# compare performances of DLPDAVN and LPADP against DLPVD
-def compare_with_DLPVD(total_num, n_spoke, iterations, demand_type, n_vc, K):
+# compare performances of DLPDAVN and LPADP against DLPVD, on problems with different lengths of horizon
+def compare_with_DLPVD_vary_time(total_num, n_spoke, iterations, demand_type, n_vc, K, profile = None,
+                                  cache = None):
     problems = generate_samples_vary_time(total_num, n_spoke, demand_type, 1)
+    profiler = RM_instrument.Method_profiler(profile)
     DLPVD_perf = [[] for _ in range(3)] # rev, load factor, time
     DLPDAVN_perf = [[] for _ in range(3)] # rev, load factor, time, compare with DLPVD
     LPADP_perf = [[] for _ in range(3)] # rev, load factor, time, compare with DLPVD
@@ -843,7 +919,8 @@ def compare_with_DLPVD(total_num, n_spoke, iterations, demand_type, n_vc, K):
             requests = demand_model.sample_network_arrival_rates()
             
             t = time.time()
-            DLPVD_result = DLPVD_model.performance(requests)
+            with profiler.phase('DLPVD', 'simulation'):
+                DLPVD_result = DLPVD_model.performance(requests)
             t = time.time() - t
             DLPVD_LF = DLPVD_result[1]
 #             print("DLPVD_LF = ", DLPVD_LF)
@@ -853,7 +930,8 @@ def compare_with_DLPVD(total_num, n_spoke, iterations, demand_type, n_vc, K):
             DLPVD_perf[2].append(t)
 
             t = time.time()
-            DLPDAVN_result = DLPDAVN_model.performance(requests)
+            with profiler.phase('DLPDAVN', 'simulation'):
+                DLPDAVN_result = DLPDAVN_model.performance(requests)
             t = time.time() - t
             DLPDAVN_perf[2].append(t)
             DLPDAVN_rev = (DLPDAVN_result[0] - DLPVD_rev)/DLPVD_rev * 100
@@ -863,9 +941,12 @@ def compare_with_DLPVD(total_num, n_spoke, iterations, demand_type, n_vc, K):
 #             print("DLPDAVN perf: ", )
 
             t = time.time()
-            LPADP_bid_price = LPADP_model.get_bid_prices(K)
+            with profiler.phase('LPADP', 'planning'):
+                LPADP_bid_price = RM_cache.ALP_bid_prices(LPADP_model, K, cache, sample=i)
 #             print("LPADP bp size ", np.array(LPADP_bid_price).shape, 'with c= ', caps, ' T = ', total_t)
-            eval_results = RM_compare.simulate_network_bidprices_control([LPADP_bid_price], products, resources,                                                                              caps, total_t, requests)
+            with profiler.phase('LPADP', 'simulation'):
+                eval_results = RM_compare.simulate_network_bidprices_control([LPADP_bid_price], products, resources,
+                                                                             caps, total_t, requests)
             t = time.time() - t
             LPADP_perf[2].append(t)
             LPADP_result = eval_results[0]
@@ -880,6 +961,8 @@ def compare_with_DLPVD(total_num, n_spoke, iterations, demand_type, n_vc, K):
     print("DLPVD average performance: rev, LF, time:", np.mean(DLPVD_perf, 1))
     print("DLPDAVN average performance: rev, LF, time:", np.mean(DLPDAVN_perf, 1))
     print("LPADP average performance: rev, LF, time:", np.mean(LPADP_perf, 1))
+    if profile:
+        print(profiler.dump())
     
     pic_name = ['pictures/rev_perf_vs_DLPVD_', 'demand1, spoke3']
     x = DLPVD_perf[1][:]
@@ -924,7 +1007,7 @@ def plot_graph(x, y,m, l, x_name, g_name):
 # markers = ['^', 'o', 'x']
 # pic_name = ['pictures/rev_perf_vs_DLPVD_', '_demand1, spoke3']
 # t = time.time()
-# compare_with_DLPVD(30, 3, 10, 2, VCs, Ks)
+# compare_with_DLPVD_vary_time(30, 3, 10, 2, VCs, Ks)
 # print("time: ", time.time() - t)
 
 
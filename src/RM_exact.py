@@ -3,17 +3,18 @@
 
 # In[17]:
 
+import os
 import warnings
 import numpy as np
 from operator import itemgetter
 import scipy.stats
-import time
 import itertools
 
 import sys
 sys.path.append('.')
 import RM_helper
 import RM_demand_model
+import RM_instrument
 
 
 # In[13]:
@@ -37,6 +38,12 @@ class Single_RM_static():
             size total_time * n_products
         capacity: integer
             the total capacity C, remaining capacity x ranges from 0 to C
+        demand_distribution: string, optional
+            the distribution of demands, one of 'normal', 'poisson', 'negative_binomial' and 'gamma', whose 
+            discretised probabilities are consistent with RM_helper.sample_single_static_demands_batch();
+            if not given, the density of the normal distribution at integer demands is used as the probabilities
+        rounding: string, optional
+            the rounding mode of continuous demands, used together with demand_distribution
         
         To be calculated:
         ----------
@@ -53,12 +60,14 @@ class Single_RM_static():
     """
     
     
-    def __init__(self, products, demands, capacity):
+    def __init__(self, products, demands, capacity, demand_distribution = None, rounding = 'trunc'):
         """Return a framework for a single-resource RM problem."""
         self.products = products
         self.demands = demands
         self.capacity = capacity
         self.n_products = len(products)
+        self.demand_distribution = demand_distribution
+        self.rounding = rounding
         
         self.value_functions = []
         self.protection_levels = []
@@ -72,22 +81,23 @@ class Single_RM_static():
             if products[j][1] < products[j+1][1]:
                 raise ValueError('RM_exact: Single_RM_static init(), The products are not in the descending order of                 their revenues.')
         
+    @RM_instrument.timed('Single_RM_static.calc_value_func')
     def calc_value_func(self):
         """Calculate the value functions of this problem and the protection levels for the products."""
         
         self.value_functions = [[0] * (self.capacity + 1) for _ in range(self.n_products)]
         self.protection_levels = [0] * self.n_products
+        RM_instrument.count('DP_cells', self.n_products * (self.capacity + 1))
         
         for j in range(self.n_products):
             
             price = self.products[j][1]
-            normal_distr = scipy.stats.norm(self.demands[j][0], self.demands[j][1])
+            demand_probs = self.demand_probabilities(j)
             
             for x in range(self.capacity + 1):    
                 val = 0
-                dj = 0
-                while (normal_distr.pdf(dj) > 1e-5) or (dj < self.demands[j][0]):
-                    prob_dj = normal_distr.pdf(dj)
+                for dj in range(len(demand_probs)):
+                    prob_dj = demand_probs[dj]
                     if j > 0:
                         u = min(dj, max(x-self.protection_levels[j-1], 0))
                         max_val = price * u + self.value_functions[j-1][x-u]
@@ -96,7 +106,6 @@ class Single_RM_static():
                         max_val = price * u
                         
                     val += prob_dj * max_val
-                    dj += 1
                 
                 self.value_functions[j][x] = val
                 
@@ -110,6 +119,20 @@ class Single_RM_static():
             
         return self.value_functions
 
+    def demand_probabilities(self, j):
+        """helper func: returns the probabilities of demands 0, 1, 2, ... for the product j"""
+        mean, std = self.demands[j][0], self.demands[j][1]
+        if self.demand_distribution:
+            return RM_helper.discretised_demand_pmf(mean, std, self.demand_distribution, self.rounding).tolist()
+        
+        normal_distr = scipy.stats.norm(mean, std)
+        probs = []
+        dj = 0
+        while (normal_distr.pdf(dj) > 1e-5) or (dj < mean):
+            probs.append(normal_distr.pdf(dj))
+            dj += 1
+        return probs
+
     def get_bid_prices(self):
         if not self.value_functions:
             self.calc_value_func()
@@ -137,12 +160,12 @@ class Single_RM_static():
         
         return booking_limits
 
-start_time = time.time()
+# start_time = time.time()
 # Examples, ref: example 2.3, 2.4 in "The Theory and Practice of Revenue Management"
-products = [[1, 1050], [2,567], [3, 534], [4,520]]
+# products = [[1, 1050], [2,567], [3, 534], [4,520]]
 # products = [[1, 1050], [2,950], [3, 699], [4,520]]
-demands = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
-cap = 80
+# demands = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
+# cap = 80
 # problem = Single_RM_static(products, demands, cap)
 # problem.calc_value_func()
 # print(problem.get_protection_levels())
@@ -217,11 +240,13 @@ class Single_RM_dynamic():
             if products[j][1] < products[j+1][1]:
                 raise ValueError('RM_exact: Single_RM_dynamic init(), The products are not in the descending order of                 their revenues.')
         
+    @RM_instrument.timed('Single_RM_dynamic.calc_value_func')
     def calc_value_func(self):
         """Calculate the value functions of this problem backwards from the last time period to the beginning."""
         
         self.value_functions = [[0]*(self.capacity+1) for _ in range(self.total_time)] 
         self.bid_prices = [[0] * (self.capacity + 1) for _ in range(self.total_time)]
+        RM_instrument.count('DP_cells', self.total_time * (self.capacity + 1))
         
         for t in range(self.total_time - 1, -1, -1):
             if self.n_arrival_rates_periods > 1:
@@ -312,9 +337,18 @@ class Network_RM():
         value_functions: 2D np array
             contains value function, ranged over time periods(from t=1, to t = T), and remaining capacity
             size total_time * n_states
+            
+        Optional:
+        ----------
+        storage: string
+            name of a file to store the value functions in, as a np.memmap of the given dtype(np.float64 or 
+            np.float32), for problems whose value functions don't fit in memory. The value functions are then 
+            calculated by backward induction over all states at once in each time period, and the bid prices are 
+            calculated on demand, see RM_helper.network_bid_prices_view
     """
     
-    def __init__(self, products, resources, capacities, total_time, demand_model):
+    def __init__(self, products, resources, capacities, total_time, demand_model, storage = None, 
+                 dtype = np.float64):
         """Return a framework for a single-resource RM problem."""
         
         self.products = products
@@ -324,6 +358,8 @@ class Network_RM():
         self.n_products = len(products)
         self.n_resources = len(resources)
         self.demand_model = demand_model
+        self.storage = storage
+        self.dtype = dtype
         
         self.value_functions = []
         self.protection_levels = []
@@ -387,8 +423,12 @@ class Network_RM():
             value += self.value_functions[t+1][state_x_Au]
         return value
    
+    @RM_instrument.timed('Network_RM.calc_value_func')
     def calc_value_func(self):
         """Return the value functions of this problem, calculate it if necessary. """
+        RM_instrument.count('DP_cells', self.total_time * self.n_states)
+        if self.storage is not None:
+            return self.calc_stored_value_func()
         self.value_functions = [[0] * self.n_states for _ in range(self.total_time)] 
         for t in range(self.total_time - 1, -1, -1):
             arrival_rates_t = self.demand_model.current_arrival_rates(t)
@@ -413,19 +453,73 @@ class Network_RM():
                 
         return self.value_functions
     
+    def calc_stored_value_func(self):
+        """helper func: calculates the value functions into a np.memmap in the file storage, one time period at a 
+        time, as in calc_value_func but for all states at once, so that only two periods are held in memory"""
+        self.value_functions = np.memmap(self.storage, dtype=self.dtype, mode='w+', 
+                                         shape=(self.total_time, self.n_states))
+        states = np.arange(self.n_states)
+        offsets = RM_helper.sell_offsets(self.incidence_matrix, self.capacities)
+        # whether each product can be sold, based on the remaining capacities of each state
+        remain_caps = RM_helper.state_table(self.capacities)
+        sellable = [(remain_caps >= [row[j] for row in self.incidence_matrix]).all(axis=1) 
+                    for j in range(self.n_products)]
+        
+        next_values = np.zeros(self.n_states) # values after the last time period
+        for t in range(self.total_time - 1, -1, -1):
+            arrival_rates_t = self.demand_model.current_arrival_rates(t)
+            values = np.zeros(self.n_states)
+            for j in range(self.n_products):
+                if arrival_rates_t[j] > 0:
+                    revenue = self.products[j][1]
+                    reduced_values = next_values[np.where(sellable[j], states - offsets[j], states)]
+                    # sell iff there is enough capacity, and the revenue exceeds the opportunity cost
+                    sell = sellable[j] & (revenue >= next_values - reduced_values)
+                    values += np.where(sell, revenue + reduced_values, next_values) * arrival_rates_t[j]
+            values += next_values * (1 - sum(arrival_rates_t))
+            next_values = RM_helper.round_values(values, 3)
+            self.value_functions[t] = next_values
+        self.value_functions.flush()
+        return self.value_functions
+    
+    def load_value_func(self):
+        """maps the value functions calculated into the file storage before, read-only, instead of calculating them 
+        again. returns the value functions"""
+        shape = (self.total_time, self.n_states)
+        if self.storage is None or not os.path.exists(self.storage):
+            raise ValueError('RM_exact: Network_RM load_value_func(), No stored value functions found.')
+        if os.path.getsize(self.storage) != np.dtype(self.dtype).itemsize * shape[0] * shape[1]:
+            raise ValueError('RM_exact: Network_RM load_value_func(), Size of the stored value functions is not as '
+                             'expected for this problem.')
+        self.value_functions = np.memmap(self.storage, dtype=self.dtype, mode='r', shape=shape)
+        return self.value_functions
+    
     def get_bid_prices(self):
-        """return the bid prices for resources over all time periods and all remaining capacities situations."""
-        if not self.value_functions:
+        """return the bid prices for resources over all time periods and all remaining capacities situations. 
+        With storage, returns a RM_helper.network_bid_prices_view reading the stored value functions. """
+        if len(self.value_functions) == 0:
             self.calc_value_func()
-        return RM_helper.network_bid_prices(self.value_functions, self.products, self.resources, self.capacities,                                             self.incidence_matrix, self.n_states)
+        if self.storage is not None:
+            return RM_helper.network_bid_prices_view(self.value_functions, self.products, self.resources, 
+                                                     self.capacities, self.incidence_matrix, self.n_states)
+        with RM_instrument.timer('Network_RM.bid_prices'):
+            return RM_helper.network_bid_prices(self.value_functions, self.products, self.resources, self.capacities,
+                                                self.incidence_matrix, self.n_states)
         
     def total_expected_revenue(self):
         """returns the expected revenues """
-        if not self.value_functions:
+        if len(self.value_functions) == 0:
             self.calc_value_func()
         
         return self.value_functions[0][-1]
 
+def solve_network_RM(products, resources, capacities, total_time, arrival_rates):
+    """solves a network RM problem with Network_RM, where products arrive with the given arrival rates in every time 
+    period; defined at module level so that independent problems can be solved in worker processes.
+    returns the value functions, size total_time * n_states"""
+    demand_model = RM_demand_model.model([arrival_rates], total_time, 1)
+    return Network_RM(products, resources, capacities, total_time, demand_model).calc_value_func()
+
 # start_time = time.time()
 # p = [['1a', 1050], ['2a',590], ['1b', 801], ['2b', 752], ['1ab', 760,], ['2ab', 1400]]
 # r = ['a', 'b']
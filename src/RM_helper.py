@@ -3,6 +3,7 @@
 
 # In[93]:
 
+import importlib
 import numpy as np
 import time
 import random
@@ -47,6 +48,27 @@ def marginal_value_check(value_func):
             if any(delta_V[i] > delta_V_next[i] for i in range(len(delta_V))):
                 print("error type 2")
 
+def project_nonincreasing(values):
+    """projects the given values onto non-increasing sequences in the least square sense, 
+    using the pool adjacent violators algorithm"""
+    blocks = [] # each block is [sum of values, number of values] pooled together
+    for v in values:
+        blocks.append([v, 1])
+        while len(blocks) > 1 and blocks[-2][0] * blocks[-1][1] < blocks[-1][0] * blocks[-2][1]:
+            total, count = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+    return np.repeat([total / count for total, count in blocks], [count for _, count in blocks])
+
+def round_values(values, decimals):
+    """rounds an np array as the built-in round does for each value, i.e. by the exact binary value, where np.round can
+    round differently when a value is close to halfway"""
+    rounded = np.round(values, decimals)
+    scaled = np.asarray(values) * 10.0 ** decimals
+    near_halfway = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    rounded.flat[near_halfway] = [round(float(v), decimals) for v in np.asarray(values).flat[near_halfway]]
+    return rounded
+
 def calc_incidence_matrix(products, resources):
     """constructs the incidence matrix, indicating which product uses which resources, 
         e.g. incidence_matrix[i][j] = 1 if product j uses resource i
@@ -108,6 +130,59 @@ def remain_cap(n_states, capacities, state_number):
     return remain_cap
 
 
+def state_strides(capacities):
+    """returns the amount by which the state number changes, when the remaining capacity of each resource 
+    decreases by 1, e.g. given total capacities [1,2,1], should return [6, 2, 1]"""
+    strides = [1] * len(capacities)
+    for i in range(len(capacities) - 2, -1, -1):
+        strides[i] = strides[i + 1] * (capacities[i + 1] + 1)
+    return np.array(strides, dtype=np.int64)
+
+def state_table(capacities):
+    """returns the remaining capacities of all the states, i.e. row s is the same as remain_cap(s), 
+    size n_states * n_resources"""
+    dims = [c + 1 for c in capacities]
+    n_states = int(np.prod(dims))
+    return np.stack(np.unravel_index(np.arange(n_states), dims), axis=1)
+
+def sell_offsets(incidence_matrix, capacities):
+    """returns the decrease of the state number after selling each product, 
+    i.e. state_index(x - A_j) = state_index(x) - offsets[j], size n_products"""
+    return np.asarray(incidence_matrix, dtype=np.int64).T.dot(state_strides(capacities))
+
+
+def expand_compact_bid_prices(compact_bid_prices, capacities):
+    """expands bid prices in the compact form, i.e. an np array of size total_time * n_resources * (max capacity + 1),
+    into bid prices for resources at every state in every time period, size total_time * n_states * n_resources"""
+    states = state_table(capacities)
+    compact_bid_prices = np.asarray(compact_bid_prices)
+    return compact_bid_prices[:, np.arange(len(capacities)), states].tolist()
+
+class compact_bid_prices_table():
+    """bid prices in the compact form, where the bid price of a resource depends only on the time period and the 
+    remaining capacity of that resource, given as an np array of size total_time * n_resources * (max capacity + 1).
+    Wraps the array, so that the simulators tell it apart from the bid prices for every state in every time period"""
+    def __init__(self, values):
+        self.values = np.asarray(values)
+        
+    def __len__(self):
+        return len(self.values)
+    
+    def __array__(self, dtype = None, copy = None):
+        return self.values if dtype is None else self.values.astype(dtype)
+    
+    def at(self, t, remain_cap):
+        """returns the bid prices for resources at time t, with remaining capacities remain_cap"""
+        return self.values[t, np.arange(len(remain_cap)), remain_cap]
+
+def bid_prices_at(bid_prices, t, state, remain_cap):
+    """returns the bid prices for resources at time t, in the given state with remaining capacities remain_cap, 
+    from bid prices either in the compact form(a compact_bid_prices_table), or for every state in every time period"""
+    if isinstance(bid_prices, compact_bid_prices_table):
+        return bid_prices.at(t, remain_cap)
+    return bid_prices[t][state]
+
+
 # In[90]:
 
 def sample_network_demands(demands, total_time):
@@ -138,6 +213,98 @@ def sample_single_static_demands(demands):
     return sampled_demands
 
 
+def demand_distribution(mean, std, distribution = 'normal'):
+    """helper func: returns the scipy distribution of the demand for a product, with the given mean and std, 
+    distribution can be one of 'normal', 'poisson', 'negative_binomial' and 'gamma'. """
+    if distribution == 'normal':
+        return scipy_stats.norm(mean, std)
+    elif distribution == 'poisson':
+        return scipy_stats.poisson(mean)
+    elif distribution == 'negative_binomial':
+        n, p = negative_binomial_params(mean, std)
+        return scipy_stats.nbinom(n, p)
+    elif distribution == 'gamma':
+        return scipy_stats.gamma(mean ** 2 / std ** 2, scale = std ** 2 / mean)
+    raise ValueError('RM_helper: demand_distribution(), Unrecognized demand distribution.')
+
+def negative_binomial_params(mean, std):
+    """helper func: converts the mean and std of demands into parameters (n, p) of a negative binomial distribution"""
+    variance = np.asarray(std, dtype=float) ** 2
+    if np.any(variance <= mean):
+        raise ValueError('RM_helper: negative_binomial_params(), Variance of demands should exceed the mean.')
+    return mean ** 2 / (variance - mean), mean / variance
+
+def round_demands(samples, rounding):
+    """helper func: rounds continuous demand samples into integers, rounding can be 'trunc'(towards zero, as int()), 
+    'floor', 'ceil' or 'round'(to the nearest integer). """
+    if rounding == 'trunc':
+        return np.trunc(samples)
+    elif rounding == 'floor':
+        return np.floor(samples)
+    elif rounding == 'ceil':
+        return np.ceil(samples)
+    elif rounding == 'round':
+        return np.rint(samples)
+    raise ValueError('RM_helper: round_demands(), Unrecognized rounding mode.')
+
+def sample_single_static_demands_batch(demands, n_samples, distribution = 'normal', rounding = 'trunc', clip = True, 
+                                       rng = None):
+    """given demands(mean and std) for products, samples the demands for each product in n_samples draws at once.
+    returns an integer array of size n_samples * n_products, in the same order as the products are given. 
+    Samples of continuous distributions('normal' and 'gamma') are rounded with the given rounding mode, and negative 
+    demands are clipped at zero if clip is set. """
+    if rng is None:
+        rng = np.random
+    means = np.array([d[0] for d in demands], dtype=float)
+    stds = np.array([d[1] for d in demands], dtype=float)
+    size = (n_samples, len(demands))
+    
+    if distribution == 'normal':
+        samples = round_demands(rng.normal(means, stds, size), rounding)
+    elif distribution == 'gamma':
+        samples = round_demands(rng.gamma(means ** 2 / stds ** 2, stds ** 2 / means, size), rounding)
+    elif distribution == 'poisson':
+        samples = rng.poisson(means, size)
+    elif distribution == 'negative_binomial':
+        n, p = negative_binomial_params(means, stds)
+        samples = rng.negative_binomial(n, p, size)
+    else:
+        raise ValueError('RM_helper: sample_single_static_demands_batch(), Unrecognized demand distribution.')
+    
+    if clip:
+        samples = np.maximum(samples, 0)
+    return samples.astype(int)
+
+def discretised_demand_pmf(mean, std, distribution = 'normal', rounding = 'trunc', clip = True, tol = 1e-5):
+    """returns the probabilities of the integer demands 0, 1, 2, ... for a product, consistent with the samples drawn
+    by sample_single_static_demands_batch() with the same settings; the tail with probability below tol is dropped.
+    If clip is set, the probability of negative demands is added to demand 0, otherwise it is dropped. """
+    distr = demand_distribution(mean, std, distribution)
+    max_demand = int(np.ceil(distr.isf(tol))) + 1
+    d = np.arange(max_demand + 1)
+    
+    if distribution in ['poisson', 'negative_binomial']:
+        return distr.pmf(d)
+    
+    # the interval [lower, upper) of continuous demands which are rounded into each integer demand
+    if rounding == 'trunc':
+        lower, upper = np.where(d > 0, d, -1), d + 1
+    elif rounding == 'floor':
+        lower, upper = d, d + 1
+    elif rounding == 'ceil':
+        lower, upper = d - 1, d
+    elif rounding == 'round':
+        lower, upper = d - 0.5, d + 0.5
+    else:
+        raise ValueError('RM_helper: discretised_demand_pmf(), Unrecognized rounding mode.')
+        
+    if clip:
+        lower = lower.astype(float)
+        lower[0] = -np.inf
+    pmf = distr.cdf(upper) - distr.cdf(lower)
+    return pmf
+
+
 # In[91]:
 
 def network_bid_prices(value_func, products, resources, capacities, incidence_matrix, n_states):
@@ -145,35 +312,96 @@ def network_bid_prices(value_func, products, resources, capacities, incidence_ma
     """Time index convention: starts from t=1, terminates at t=T, where len(value_func) = T """
     bid_prices = []
 
-    n_resources = len(resources)
     if not incidence_matrix:
         incidence_matrix = calc_incidence_matrix(products, resources)
         
     for t in range(len(value_func)):
         bid_price_t = []
         for s in range(n_states):
-            A = []
-            b = []
-            bp_t_s = [None] * n_resources
-            for j in range(len(products)):
-                incidence_vector = [row[j] for row in incidence_matrix]
-                V_diff = value_func[t][s]
-                remained_cap = remain_cap(n_states, capacities, s)
-                reduced_cap = [a_i - b_i for a_i, b_i in zip(remained_cap, incidence_vector)]
-                if all(c >= 0 for c in reduced_cap):
-                    V_diff -= value_func[t][state_index(n_states, capacities, reduced_cap)]
-                    if sum(incidence_vector) == 1:
-                        bp_t_s[incidence_vector.index(1)] = V_diff
-                A.append(incidence_vector)
-                b.append(V_diff)
-                
-            bp, _,_,_ = np.linalg.lstsq(A, b)
-            bp_t_s = [0 if x < 0 else x for x in bp]
-            
-            bid_price_t.append([round(bp_r, 3) for bp_r in bp_t_s])
+            bid_price_t.append(network_bid_prices_at(value_func, t, s, products, capacities, incidence_matrix, 
+                                                     n_states))
         bid_prices.append(bid_price_t)
     return bid_prices
 
+def network_bid_prices_at(value_func, t, s, products, capacities, incidence_matrix, n_states):
+    """Calculate the bid prices for resources at state s in time period t, reading only the value functions of 
+    period t."""
+    A = []
+    b = []
+    remained_cap = remain_cap(n_states, capacities, s)
+    for j in range(len(products)):
+        incidence_vector = [row[j] for row in incidence_matrix]
+        V_diff = value_func[t][s]
+        reduced_cap = [a_i - b_i for a_i, b_i in zip(remained_cap, incidence_vector)]
+        if all(c >= 0 for c in reduced_cap):
+            V_diff -= value_func[t][state_index(n_states, capacities, reduced_cap)]
+        A.append(incidence_vector)
+        b.append(V_diff)
+        
+    bp, _,_,_ = np.linalg.lstsq(A, b)
+    return [round(bp_r, 3) for bp_r in [0 if x < 0 else x for x in bp]]
+
+class network_bid_prices_view():
+    """bid prices for resources at every state in every time period, indexed as bid_prices[t][s] like the result of 
+    network_bid_prices, but calculated on demand from the value functions, e.g. a np.memmap too large for the bid 
+    prices of all states to be calculated, or held in memory. """
+    def __init__(self, value_func, products, resources, capacities, incidence_matrix, n_states):
+        if not incidence_matrix:
+            incidence_matrix = calc_incidence_matrix(products, resources)
+        self.value_func = value_func
+        self.args = (products, capacities, incidence_matrix, n_states)
+        self.n_states = n_states
+        
+    def __len__(self):
+        return len(self.value_func)
+    
+    def __getitem__(self, t):
+        if not 0 <= t < len(self.value_func):
+            raise IndexError('RM_helper: network_bid_prices_view, time period out of range')
+        return _network_bid_prices_period(self, t)
+
+class _network_bid_prices_period():
+    """bid prices in one time period of a network_bid_prices_view, indexed by the state"""
+    def __init__(self, view, t):
+        self.view = view
+        self.t = t
+        
+    def __len__(self):
+        return self.view.n_states
+    
+    def __getitem__(self, s):
+        if not 0 <= s < self.view.n_states:
+            raise IndexError('RM_helper: network_bid_prices_view, state out of range')
+        return network_bid_prices_at(self.view.value_func, self.t, s, *self.view.args)
+
+
+# In[92]:
+
+class lazy_import():
+    """a module that is only imported on first use of its attributes, so that optional heavy dependencies, e.g.
+    pulp, matplotlib.pyplot, pandas, networkx, don't slow down importing the modules using them."""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        """imports the module if it's not imported yet, and returns it. Private, so that it doesn't hide an attribute
+        of the module with the same name, e.g. json.load"""
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return "<lazy module '%s'>" % self._name
+
+scipy_stats = lazy_import('scipy.stats')
+
 
 # In[ ]:
 
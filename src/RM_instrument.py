@@ -0,0 +1,213 @@
+# coding: utf-8
+
+# In[1]:
+
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import time
+
+import sys
+sys.path.append('.')
+import RM_helper
+
+pandas = RM_helper.lazy_import('pandas')
+
+
+# In[2]:
+
+##################################
+###### Instrumentation ###########
+##################################
+
+# Named timers and counters, emitted by the methods in RM_exact, RM_approx and RM_ADP, e.g.
+#     @RM_instrument.timed('Network_RM.calc_value_func')
+#     def calc_value_func(self): ...
+#     with RM_instrument.timer('Network_DLP.solve_LP'):
+#         ...
+#     RM_instrument.count('LP_solves')
+# Nothing is recorded unless enabled. When disabled, timer() returns a shared no-op context, timed functions call
+# through directly, and count() returns immediately, so the methods run as fast as without instrumentation.
+
+enabled = False
+counters = {} # name -> count
+timers = {} # name -> [total seconds, number of calls]
+
+class _no_timer():
+    """the timer used when instrumentation is disabled, does nothing"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_TIMER = _no_timer()
+
+class _timer():
+    """adds the time spent within the context to the timer with the given name"""
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        record = timers.get(self.name)
+        if record is None:
+            timers[self.name] = [elapsed, 1]
+        else:
+            record[0] += elapsed
+            record[1] += 1
+        return False
+
+def timer(name):
+    """returns a context that times its body under the given name, if instrumentation is enabled"""
+    if not enabled:
+        return _NO_TIMER
+    return _timer(name)
+
+def timed(name):
+    """decorator that times every call of the function under the given name, if instrumentation is enabled"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n = 1):
+    """adds n to the counter with the given name, if instrumentation is enabled"""
+    if enabled:
+        counters[name] = counters.get(name, 0) + n
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    """clears all timers and counters"""
+    counters.clear()
+    timers.clear()
+
+@contextlib.contextmanager
+def recording():
+    """enables instrumentation with cleared timers and counters within the context, and yields the dict that
+    report() returns at the end of the context"""
+    global enabled
+    was_enabled = enabled
+    reset()
+    enabled = True
+    result = {}
+    try:
+        yield result
+    finally:
+        enabled = was_enabled
+        result.update(report())
+
+
+# In[3]:
+
+def report():
+    """returns the timers and counters as a dict of {'timers': {name: {'total', 'calls', 'mean'}}, 'counters': {name:
+    count}}"""
+    return {'timers': {name: {'total': total, 'calls': calls, 'mean': total / calls}
+                       for name, (total, calls) in timers.items()},
+            'counters': dict(counters)}
+
+def summary(result = None):
+    """flattens a report(default as the current one) into a single dict, with total seconds of timers as
+    'time: name', and counters as they are, to be used as a row in the evaluator tables"""
+    if result is None:
+        result = report()
+    row = {'time: ' + name: timer_result['total'] for name, timer_result in sorted(result['timers'].items())}
+    row.update(sorted(result['counters'].items()))
+    return row
+
+def to_dataframe(results, index = None):
+    """builds a pandas DataFrame of the summaries of the given reports, e.g. one for each method or problem"""
+    return pandas.DataFrame([summary(result) for result in results], index=index)
+
+
+# with RM_instrument.recording() as result:
+#     RM_approx.DLP_DAVN(products, resources, capacities, T, 2, demand_model).performance()
+# print(to_dataframe([result], ['DLP_DAVN']))
+
+
+# In[4]:
+
+DEFAULT_PROFILE_DIRECTORY = 'profile-files'
+
+class Method_profiler():
+    """Profiles the phases(e.g. planning, simulation) of each method in an evaluator run with cProfile, accumulating
+    over all problems and iterations of the run. Does nothing if profile is None or False; profiles are written to
+    the directory profile, or to DEFAULT_PROFILE_DIRECTORY if profile is True."""
+
+    def __init__(self, profile = None, top = 10):
+        if profile is True:
+            profile = DEFAULT_PROFILE_DIRECTORY
+        self.directory = profile or None
+        self.top = top
+        self.profiles = {} # (method, phase) -> cProfile.Profile
+
+    @contextlib.contextmanager
+    def _profiling(self, profiler):
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+
+    def phase(self, method, phase):
+        """returns a context that profiles its body as the given phase of the method"""
+        if not self.directory:
+            return _NO_TIMER
+        key = (method, phase)
+        if key not in self.profiles:
+            self.profiles[key] = cProfile.Profile()
+        return self._profiling(self.profiles[key])
+
+    def summary(self):
+        """returns a list of the top functions by cumulative time in each phase of each method, each in the form of
+        {'method', 'phase', 'function', 'ncalls', 'tottime', 'cumtime'}"""
+        rows = []
+        for (method, phase), profiler in self.profiles.items():
+            stats = pstats.Stats(profiler).stats
+            top_functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+            for (file_name, line, function), (_, n_calls, total_time, cumulative_time, _) in top_functions:
+                rows.append({'method': method, 'phase': phase,
+                             'function': '%s:%d(%s)' % (os.path.basename(file_name), line, function),
+                             'ncalls': n_calls, 'tottime': total_time, 'cumtime': cumulative_time})
+        return rows
+
+    def dump(self):
+        """writes the profile of each phase of each method as '<method>_<phase>.prof' in the directory, which can be
+        read by pstats or snakeviz, and the summary table as 'profile_summary.csv'.
+        returns the summary table as a pandas DataFrame, or None if profiling is disabled"""
+        if not self.directory:
+            return None
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        for (method, phase), profiler in self.profiles.items():
+            profiler.dump_stats(os.path.join(self.directory, '%s_%s.prof' % (method, phase)))
+        table = pandas.DataFrame(self.summary(), columns=['method', 'phase', 'function', 'ncalls', 'tottime',
+                                                          'cumtime'])
+        table.to_csv(os.path.join(self.directory, 'profile_summary.csv'), sep='\t')
+        return table
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,316 @@
+# coding: utf-8
+
+# In[1]:
+
+import collections
+import csv
+import os
+import time
+import numpy as np
+
+import sys
+sys.path.append('.')
+import RM_helper
+
+pandas = RM_helper.lazy_import('pandas')
+pyarrow = RM_helper.lazy_import('pyarrow')
+parquet = RM_helper.lazy_import('pyarrow.parquet')
+scipy_stats = RM_helper.lazy_import('scipy.stats')
+
+
+# In[2]:
+
+###########################################
+###### Streaming evaluator results ########
+###########################################
+
+# The evaluators write a row for each method in each iteration on each problem, as soon as the iteration completes,
+# and compute their final tables by reading the rows back. So an interrupted run keeps its results, and can be resumed
+# from them, skipping the iterations completed, given the same problems, e.g. generated with the same seed.
+
+KEY_COLUMNS = ['problem', 'method', 'iteration']
+DEFAULT_METRICS = ['revenue', 'load_factor', 'revenue_gap %', 'load_factor_gap %', 'time']
+
+class Result_stream():
+    """Appends rows of results, in the form of {'problem', 'method', 'iteration', metric: value}, to a tab-separated
+    CSV file, or if file_name ends with '.parquet', to a directory of parquet files(requires pyarrow).
+    Rows are buffered, and written when flush_every rows are buffered, or flush_seconds have passed since the last
+    write, or on flush(). If resume is True, the rows already in the file are kept, otherwise the file is replaced."""
+
+    def __init__(self, file_name, metrics = None, flush_every = 100, flush_seconds = 60, resume = True):
+        self.file_name = file_name
+        self.metrics = list(metrics) if metrics is not None else DEFAULT_METRICS
+        self.columns = KEY_COLUMNS + self.metrics
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.is_parquet = file_name.endswith('.parquet')
+        self.buffer = []
+        self.completed = set() # (problem, iteration) of the iterations written
+        self.last_flush = time.time()
+
+        directory = file_name if self.is_parquet else os.path.dirname(file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        if not resume:
+            self.clear()
+        for problem, iteration in self.read()[['problem', 'iteration']].itertuples(index=False):
+            self.completed.add((problem, iteration))
+
+    def write(self, problem, iteration, rows):
+        """buffers the rows of all methods in an iteration on a problem, given as {method: {metric: value}}"""
+        for method, metrics in rows.items():
+            unknown = [m for m in metrics if m not in self.metrics]
+            if unknown:
+                raise ValueError('RM_results: Result_stream write(), Unrecognized metrics: ' + ', '.join(unknown))
+            row = {'problem': problem, 'method': method, 'iteration': iteration}
+            row.update(metrics)
+            self.buffer.append(row)
+        self.completed.add((problem, iteration))
+        if len(self.buffer) >= self.flush_every or time.time() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def done(self, problem, iteration):
+        """whether the iteration on the problem has been written, e.g. before resuming"""
+        return (problem, iteration) in self.completed
+
+    def flush(self):
+        """writes the buffered rows"""
+        self.last_flush = time.time()
+        if not self.buffer:
+            return
+        if self.is_parquet:
+            part = os.path.join(self.file_name, 'part-%05d.parquet' % len(os.listdir(self.file_name)))
+            table = pyarrow.Table.from_pandas(pandas.DataFrame(self.buffer, columns=self.columns), preserve_index=False)
+            parquet.write_table(table, part)
+        else:
+            new_file = not os.path.exists(self.file_name)
+            with open(self.file_name, 'a', newline='') as f:
+                writer = csv.DictWriter(f, self.columns, delimiter='\t')
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(self.buffer)
+        self.buffer = []
+
+    def clear(self):
+        """removes all rows written"""
+        self.buffer = []
+        self.completed = set()
+        if self.is_parquet:
+            for part in os.listdir(self.file_name):
+                os.remove(os.path.join(self.file_name, part))
+        elif os.path.exists(self.file_name):
+            os.remove(self.file_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+        return False
+
+    def read(self):
+        """returns all rows written, as a pandas DataFrame"""
+        self.flush()
+        if self.is_parquet:
+            if os.listdir(self.file_name):
+                return pandas.read_parquet(self.file_name)
+        elif os.path.exists(self.file_name):
+            return pandas.read_csv(self.file_name, sep='\t', float_precision='round_trip')
+        return pandas.DataFrame(columns=self.columns)
+
+    def table(self, n_problems, columns):
+        """computes a table from the rows written, with a row for each problem in range(n_problems), and the mean over
+        iterations of (method, metric) for each of the columns. A column given as a list of (method, metric) has an
+        np array of their means, e.g. for each number of virtual classes. returns the table as a list of rows"""
+        means = self.read().groupby(['problem', 'method']).mean(numeric_only=True)
+
+        def mean(problem, method, metric):
+            if (problem, method) not in means.index:
+                return np.nan
+            return means.loc[(problem, method), metric]
+        return build_table(n_problems, columns, mean)
+
+def build_table(n_problems, columns, mean):
+    """helper func: builds a table with a row for each problem, and mean(problem, method, metric) for each column"""
+    table_data = []
+    for problem in range(n_problems):
+        row = []
+        for column in columns:
+            if isinstance(column, list):
+                row.append(np.array([mean(problem, method, metric) for method, metric in column]))
+            else:
+                row.append(mean(problem, *column))
+        table_data.append(row)
+    return table_data
+
+# with Result_stream('csv-files/compare_with_DLPVD_rows.csv') as stream:
+#     result, dataframe = RM_evaluator.compare_with_DLPVD(30, 3, 3, 10, 1, [2, 4], [50, 100], stream=stream)
+
+
+# In[3]:
+
+##########################################
+###### Online statistics of results ######
+##########################################
+
+DEFAULT_SKETCH_SIZE = 200 # number of values kept in each level of the quantile sketch
+
+class Online_stats():
+    """Accumulates the statistics of a stream of values in constant memory: the count, mean and variance by Welford's
+    algorithm, min and max, and a quantile sketch, which keeps at most sketch_size values in each of O(log(n)) levels,
+    and is exact until sketch_size values are added. Stats accumulated separately, e.g. in worker processes, can be
+    merged."""
+
+    def __init__(self, sketch_size = DEFAULT_SKETCH_SIZE):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared differences from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch_size = sketch_size
+        self.levels = [[]] # values in level h, each standing for 2^h values added
+        self.n_compactions = 0
+
+    def add(self, value):
+        value = float(value)
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.levels[0].append(value)
+        self.compact()
+        return self
+
+    def merge(self, other):
+        """adds the values accumulated by the other stats to this one, ref: Chan et al., parallel variance"""
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for h, values in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append([])
+            self.levels[h] += values
+        self.compact()
+        return self
+
+    def compact(self):
+        """helper func: halves each level holding more than sketch_size values, by sorting it and promoting every
+        other value to the next level, starting from the first or the second value in turn. With an odd number of
+        values, the largest one stays at its level, so that the total weight is the number of values added. Levels
+        are compacted from the lowest, including the ones appended, until none holds more than sketch_size"""
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) > self.sketch_size:
+                values = sorted(self.levels[h])
+                leftover = [values.pop()] if len(values) % 2 else []
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                self.levels[h + 1] += values[self.n_compactions % 2::2]
+                self.levels[h] = leftover
+                self.n_compactions += 1
+            h += 1
+
+    def variance(self):
+        """sample variance, nan if less than 2 values are added"""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def std(self):
+        return np.sqrt(self.variance())
+
+    def ci_half_width(self, confidence = 0.95):
+        """half width of the confidence interval of the mean, by the t-distribution, nan if less than 2 values"""
+        if self.n < 2:
+            return np.nan
+        return scipy_stats.t.ppf((1 + confidence) / 2, self.n - 1) * self.std() / np.sqrt(self.n)
+
+    def quantile(self, q):
+        """estimate of the q-quantile(0 <= q <= 1) of the values added, from the sketch"""
+        if self.n == 0:
+            return np.nan
+        weighted = sorted((value, 2 ** h) for h, values in enumerate(self.levels) for value in values)
+        values = np.array([value for value, _ in weighted])
+        cumulative_weights = np.cumsum([weight for _, weight in weighted])
+        return float(values[min(np.searchsorted(cumulative_weights, q * cumulative_weights[-1]), len(values) - 1)])
+
+    def summary(self, confidence = 0.95):
+        """returns the statistics as a dict of {'n', 'mean', 'std', 'ci', 'min', 'median', 'max'}"""
+        return {'n': self.n, 'mean': self.mean if self.n else np.nan, 'std': self.std(), 
+                'ci': self.ci_half_width(confidence), 'min': self.min, 'median': self.quantile(0.5), 'max': self.max}
+
+class Stats_table():
+    """Online_stats for each (problem, method, metric), accumulating the rows written by the evaluators, as an
+    alternative to keeping the results of all iterations. Tables from different workers can be merged."""
+
+    def __init__(self, sketch_size = DEFAULT_SKETCH_SIZE):
+        self.sketch_size = sketch_size
+        self.stats = collections.OrderedDict() # (problem, method, metric) -> Online_stats
+
+    def get(self, problem, method, metric):
+        """returns the stats of (problem, method, metric), empty if nothing is added"""
+        key = (problem, method, metric)
+        if key not in self.stats:
+            self.stats[key] = Online_stats(self.sketch_size)
+        return self.stats[key]
+
+    def add(self, problem, rows):
+        """adds the rows of all methods in an iteration on a problem, given as {method: {metric: value}}"""
+        for method, metrics in rows.items():
+            for metric, value in metrics.items():
+                self.get(problem, method, metric).add(value)
+
+    def add_dataframe(self, rows):
+        """adds rows in the form of {'problem', 'method', 'iteration', metric: value}, e.g. read from a Result_stream,
+        ignoring missing values"""
+        metrics = [column for column in rows.columns if column not in KEY_COLUMNS]
+        for row in rows.to_dict('records'):
+            self.add(row['problem'], {row['method']: {metric: row[metric] for metric in metrics
+                                                      if not pandas.isna(row[metric])}})
+
+    def merge(self, other):
+        for (problem, method, metric), stats in other.stats.items():
+            self.get(problem, method, metric).merge(stats)
+        return self
+
+    def converged(self, problem, metric, ci_target, min_n = 2, confidence = 0.95):
+        """whether the metric of every method on the problem has at least min_n(and 2) values, and the half width of
+        the confidence interval of its mean within ci_target. False if no method has the metric"""
+        metric_stats = [stats for (p, _, m), stats in self.stats.items() if p == problem and m == metric]
+        if not metric_stats:
+            return False
+        return all(stats.n >= max(min_n, 2) and stats.ci_half_width(confidence) <= ci_target for stats in metric_stats)
+
+    def table(self, n_problems, columns):
+        """computes a table of the means, in the same form as Result_stream.table"""
+        def mean(problem, method, metric):
+            stats = self.stats.get((problem, method, metric))
+            return stats.mean if stats is not None and stats.n > 0 else np.nan
+        return build_table(n_problems, columns, mean)
+
+    def to_dataframe(self, confidence = 0.95):
+        """returns the summaries of all stats as a pandas DataFrame, indexed by (problem, method, metric)"""
+        index = pandas.MultiIndex.from_tuples(list(self.stats.keys()), names=['problem', 'method', 'metric'])
+        return pandas.DataFrame([stats.summary(confidence) for stats in self.stats.values()], index=index)
+
+# stats = Stats_table()
+# RM_evaluator.LPADP_compare_K(10, 3, 3, 1000, 1, [50, 100], stats=stats, ci_target=0.5) # stops early on each problem
+# print(stats.to_dataframe())
+
+# stats = Online_stats()
+# for value in np.random.normal(size=10000):
+#     stats.add(value)
+# print(stats.summary(), stats.quantile(0.9))
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,220 @@
+# coding: utf-8
+
+# In[1]:
+
+import concurrent.futures
+import contextlib
+import importlib
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import sys
+sys.path.append('.')
+import RM_helper
+import RM_exact
+import RM_approx
+import RM_ADP
+import RM_benchmark
+
+pandas = RM_helper.lazy_import('pandas')
+plt = RM_helper.lazy_import('matplotlib.pyplot')
+
+
+# In[2]:
+
+#########################################
+###### Scaling of RM methods ############
+#########################################
+
+# Sweeps one size parameter at a time, and measures how the running time, peak memory and number of LP/DP solves of
+# each method grow with it. Generalises LPADP_compare_time_cap and eval_networkDP_runningTime in RM_evaluator.
+
+# values of size parameters not being swept
+DEFAULT_PARAMS = {'n_spokes': 2, 'cap': 2, 'total_time': 20, 'n_virtual_class': 2, 'K': 50}
+
+# functions counted while running a method, each in the form of (module, class or None, function)
+COUNTED_CALLS = {'LP_solves': [('pulp', 'LpProblem', 'solve'), ('scipy.optimize', None, 'linprog')],
+                 'DP_solves': [('RM_exact', 'Network_RM', 'calc_value_func'),
+                               ('RM_exact', 'Single_RM_static', 'calc_value_func')]}
+
+def run_exact_DP(problem, params, requests):
+    return RM_exact.Network_RM(*problem).get_bid_prices()
+
+def run_DAVN(problem, params, requests):
+    products, resources, capacities, total_time, demand_model = problem
+    static_prices = RM_approx.Network_DLP(products, resources, capacities, demand_model).get_bid_prices(capacities, 0)
+    model = RM_approx.Network_DAVN(products, resources, capacities, params['n_virtual_class'], demand_model)
+    return model.calc_value_function(static_prices, capacities, 0)
+
+def run_DLP_DAVN(problem, params, requests):
+    products, resources, capacities, total_time, demand_model = problem
+    return RM_approx.DLP_DAVN(products, resources, capacities, total_time, params['n_virtual_class'],
+                              demand_model).performance(requests)
+
+def run_DLPVD(problem, params, requests):
+    return RM_approx.DLPVD(*problem).performance(requests)
+
+def run_ALP(problem, params, requests):
+    return RM_ADP.ALP(*problem).get_bid_prices(params['K'])
+
+METHODS = {'exact_DP': run_exact_DP, 'DAVN': run_DAVN, 'DLP_DAVN': run_DLP_DAVN, 'DLPVD': run_DLPVD, 'ALP': run_ALP}
+
+
+# In[3]:
+
+@contextlib.contextmanager
+def count_calls(counted_calls = None):
+    """counts the calls of the functions in counted_calls(default as COUNTED_CALLS) within the context, by wrapping
+    them temporarily. yields a dict of the counts, by the names in counted_calls"""
+    if counted_calls is None:
+        counted_calls = COUNTED_CALLS
+    counts = dict.fromkeys(counted_calls, 0)
+    patched = []
+
+    def counting(name, func):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    try:
+        for name, targets in counted_calls.items():
+            for module_name, class_name, func_name in targets:
+                try:
+                    owner = importlib.import_module(module_name)
+                except ImportError:
+                    continue
+                if class_name is not None:
+                    owner = getattr(owner, class_name)
+                func = owner.__dict__[func_name] if class_name is not None else getattr(owner, func_name)
+                patched.append((owner, func_name, func))
+                setattr(owner, func_name, counting(name, func))
+        yield counts
+    finally:
+        for owner, func_name, func in reversed(patched):
+            setattr(owner, func_name, func)
+
+def peak_rss_mb():
+    """peak resident set size of this process so far, in MB, or nan if not available on this platform.
+    On Linux it is read as the peak resident set size of the process(VmHWM), which starts afresh in a spawned process, 
+    unlike ru_maxrss of getrusage, which is kept across exec"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    # in kilobytes
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS, in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+def measure(method, params, seed = 0):
+    """runs the method once on a seeded problem of the given size parameters.
+    returns a dict of the wall time, peak RSS of the process, and the counts of LP/DP solves"""
+    problem = RM_benchmark.generate_problem(params['n_spokes'], params['cap'], params['total_time'], seed)
+    requests = RM_benchmark.sample_requests(problem, seed)
+    with count_calls() as counts:
+        start = time.perf_counter()
+        METHODS[method](problem, params, requests)
+        wall_time = time.perf_counter() - start
+    result = {'wall_time': wall_time, 'peak_rss_mb': peak_rss_mb(), 'n_states': RM_benchmark.n_states(problem)}
+    result.update(counts)
+    return result
+
+def fit_exponent(sizes, values):
+    """fits values ~ a * sizes^b by least squares on the log-log scale, and returns the empirical exponent b, or nan if
+    there are less than two positive points"""
+    sizes = np.asarray(sizes, dtype=float)
+    values = np.asarray(values, dtype=float)
+    positive = (sizes > 0) & (values > 0)
+    if np.unique(sizes[positive]).size < 2:
+        return float('nan')
+    return float(np.polyfit(np.log(sizes[positive]), np.log(values[positive]), 1)[0])
+
+
+# In[4]:
+
+def sweep(param, values, methods = None, base_params = None, seed = 0, isolate = True):
+    """sweeps the size parameter param(one of 'cap', 'n_spokes', 'total_time', 'n_virtual_class', 'K') over values,
+    keeping others as in base_params(default as DEFAULT_PARAMS), and measures each method(default as all in METHODS).
+    Each measurement runs in a new worker process if isolate is True, started by spawn rather than fork, so that the 
+    peak RSS is its own rather than inherited from this process. Scripts calling it need the __main__ guard then.
+    returns a list of rows, each in the form of {'method', 'param', 'value', 'wall_time', 'peak_rss_mb', 'n_states',
+    'LP_solves', 'DP_solves', 'time_exponent', 'rss_exponent'}, where the exponents are fitted for each method"""
+    if methods is None:
+        methods = list(METHODS.keys())
+    params = dict(DEFAULT_PARAMS)
+    if base_params:
+        params.update(base_params)
+    if param not in params:
+        raise ValueError('RM_scaling: sweep(), Unrecognized size parameter ' + str(param) + '.')
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        raise ValueError('RM_scaling: sweep(), Unrecognized methods: ' + ', '.join(unknown))
+
+    rows = []
+    for method in methods:
+        method_rows = []
+        for value in values:
+            point_params = dict(params)
+            point_params[param] = value
+            if isolate:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1, 
+                                                            mp_context=multiprocessing.get_context('spawn')) as executor:
+                    result = executor.submit(measure, method, point_params, seed).result()
+            else:
+                result = measure(method, point_params, seed)
+            row = {'method': method, 'param': param, 'value': value}
+            row.update(result)
+            method_rows.append(row)
+
+        time_exponent = fit_exponent(values, [r['wall_time'] for r in method_rows])
+        rss_exponent = fit_exponent(values, [r['peak_rss_mb'] for r in method_rows])
+        for row in method_rows:
+            row['time_exponent'] = time_exponent
+            row['rss_exponent'] = rss_exponent
+        rows += method_rows
+    return rows
+
+def save_scaling(rows, file_name):
+    """writes the rows from sweep to a tab-separated CSV file, as the other files in csv-files"""
+    directory = os.path.dirname(file_name)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    dataframe = pandas.DataFrame(rows)
+    dataframe.to_csv(file_name, sep='\t')
+    return dataframe
+
+def plot_scaling(rows, file_name, metric = 'wall_time'):
+    """plots the metric of each method against the swept parameter on log-log scale, and saves it to file_name"""
+    plt.clf()
+    for method in sorted(set(r['method'] for r in rows), key=[r['method'] for r in rows].index):
+        method_rows = [r for r in rows if r['method'] == method]
+        label = '%s (exponent %.2f)' % (method, method_rows[0]['time_exponent' if metric == 'wall_time'
+                                                                 else 'rss_exponent'])
+        plt.loglog([r['value'] for r in method_rows], [r[metric] for r in method_rows], marker='o', label=label)
+    plt.legend()
+    plt.xlabel(rows[0]['param'])
+    plt.ylabel(metric)
+    plt.savefig(file_name)
+
+# rows = sweep('cap', [1, 2, 3, 4], ['exact_DP', 'DLPVD', 'ALP'])
+# save_scaling(rows, 'csv-files/scaling_cap.csv')
+# plot_scaling(rows, 'pictures/scaling_cap_time.png')
+# rows = sweep('K', [50, 100, 200, 400], ['ALP'], {'n_spokes': 3})
+# save_scaling(rows, 'csv-files/scaling_ALP_K.csv')
+
+
+# In[ ]:
+
+
+
+
@@ -7,8 +7,8 @@ import warnings
 import numpy as np
 
 import sys
-sys.path.append('/Users/jshan/Desktop/RevenueManagement')
-from src import network_DAVN
+sys.path.append('.')
+import network_DAVN
 
 # Implement the iterative displacement-adjusted virtual nesting(DAVN) method for network RM problem
 # The result is static bid prices estimated, either converged, or after a large number of computation rounds.
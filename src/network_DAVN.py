@@ -7,8 +7,8 @@ import warnings
 import numpy as np
 
 import sys
-sys.path.append('/Users/jshan/Desktop/RevenueManagement')
-from src import singleResource_DCM
+sys.path.append('.')
+import singleResource_DCM
 
 # Calculate the displacement-adjusted revenues,
 # which is to approximate the net benefit of accepting product j on resource i
@@ -395,14 +395,14 @@ def noob(s):
 
 
 
-products = [['AB', 0.5, 100], ['CD', 0.5, 100],['ABC', 0.5, 1000], ['BCD',0.5, 1000]]
-resources =  ['AB', 'BC', 'CD']
-demand = 50
+# products = [['AB', 0.5, 100], ['CD', 0.5, 100],['ABC', 0.5, 1000], ['BCD',0.5, 1000]]
+# resources =  ['AB', 'BC', 'CD']
+# demand = 50
 # mean_demands = [['AB', 10.1], ['CD', 5.3], ['ABC',8], ['BCD', 9.2], ['CDA', 3]]
-mean_demands = [['AB', demand], ['CD',demand], ['ABC',demand], ['BCD', demand]]
-n_virtual_class = 2
-static_price = [0, 0, 0]
-calculate_value_function(products, resources, static_price, n_virtual_class, mean_demands, 1, 2, 5)
+# mean_demands = [['AB', demand], ['CD',demand], ['ABC',demand], ['BCD', demand]]
+# n_virtual_class = 2
+# static_price = [0, 0, 0]
+# calculate_value_function(products, resources, static_price, n_virtual_class, mean_demands, 1, 2, 5)
 
 
 # In[123]:
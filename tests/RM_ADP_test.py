@@ -0,0 +1,342 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_ADP
+import RM_compare
+import RM_demand_model
+import RM_exact
+import RM_helper
+
+
+class One_state_transition_tests(unittest.TestCase):
+
+    test_products = [['a1', 200, 0.02], ['a2', 503, 0.06], ['ab1', 400, 0.08],['ab2', 704, 0.01], 
+                     ['ab3', 601, 0.05], ['ab4', 106, 0.12], ['bc', 920, 0.03],['c1', 832, 0.07]]
+    test_resources = ['a', 'b', 'c']
+    test_capacities = [2, 3, 1]
+    test_total_time = 8
+
+    def setUp(self):
+        products, demands, _ = RM_helper.sort_product_demands(self.test_products)
+        self.problem = RM_ADP.One_state_transition(products, self.test_resources, [demands], self.test_capacities, 
+                                                   self.test_total_time)
+
+    def calc_value_func_per_state(self, n_iterations):
+        """the forward pass state by state, deciding each request by the estimates of the next time period"""
+        problem = self.problem
+        estimates = [[0] * problem.n_states for _ in range(self.test_total_time + 1)]
+        for _ in range(n_iterations):
+            sampled_demands = problem.sample_demands_batch(1)[0]
+            S_t = problem.n_states - 1
+            for t in range(self.test_total_time):
+                product = sampled_demands[t]
+                value_not_sell = estimates[t + 1][S_t]
+                est_t, next_state = value_not_sell, S_t
+                if product < problem.n_products:
+                    cap = RM_helper.remain_cap(problem.n_states, self.test_capacities, S_t)
+                    reduced_cap = [x - row[product] for x, row in zip(cap, problem.incidence_matrix)]
+                    if min(reduced_cap) >= 0:
+                        S_after_sell = RM_helper.state_index(problem.n_states, self.test_capacities, reduced_cap)
+                        value_sell = problem.products[product][1] + estimates[t + 1][S_after_sell]
+                        if value_sell > value_not_sell:
+                            est_t, next_state = value_sell, S_after_sell
+                estimates[t][S_t] = est_t
+                S_t = next_state
+        return estimates
+
+    def test_calc_value_func(self):
+        np.random.seed(3)
+        expected = self.calc_value_func_per_state(50)
+        np.random.seed(3)
+        np.testing.assert_almost_equal(self.problem.calc_value_func(50), expected)
+        self.assertEqual(self.problem.total_expected_revenue(), expected[0][-1])
+
+    def test_calc_value_func_batch(self):
+        np.random.seed(0)
+        value_functions = self.problem.calc_value_func(400, batch_size=20, step_size=lambda n: 1 / n)
+        self.assertEqual(value_functions.shape, (self.test_total_time + 1, self.problem.n_states))
+        # every path starts from the initial state, so it always has an estimate
+        self.assertGreater(value_functions[0][-1], 0)
+        self.assertTrue((value_functions[-1] == 0).all())
+        # the value of a state never exceeds what can be sold from it
+        max_revenue = sum(p[1] for p in self.problem.products) * self.test_total_time
+        self.assertLessEqual(value_functions.max(), max_revenue)
+
+class DP_w_featureExtraction_tests(unittest.TestCase):
+
+    test_products = [['a1', 200, 0.02], ['a2', 503, 0.06], ['ab1', 400, 0.08],['ab2', 704, 0.01], 
+                     ['ab3', 601, 0.05], ['ab4', 106, 0.12], ['bc', 920, 0.03],['c1', 832, 0.07]]
+    test_resources = ['a', 'b', 'c']
+    test_capacities = [3, 4, 2]
+    test_total_time = 6
+
+    def setUp(self):
+        np.random.seed(0)
+        products, arrival_rates, _ = RM_helper.sort_product_demands(self.test_products)
+        demand_model = RM_demand_model.model([arrival_rates], self.test_total_time, 1)
+        self.problem = RM_ADP.DP_w_featureExtraction(products, self.test_resources, self.test_capacities, 
+                                                     self.test_total_time, demand_model)
+
+    def test_calc_value_func(self):
+        # with all states chosen in every time period, the approximations are the values evaluated in every state, 
+        # which are exact in the last time period
+        n_states = self.problem.n_states
+        approximations = self.problem.calc_value_func(m=n_states)
+        self.assertEqual(approximations.shape, (self.test_total_time, n_states))
+        exact = RM_exact.Network_RM(self.problem.products, self.test_resources, self.test_capacities, 
+                                    self.test_total_time, self.problem.demand_model)
+        np.testing.assert_almost_equal(approximations[-1], exact.calc_value_func()[-1], decimal=4)
+        for t in range(self.test_total_time - 1):
+            np.testing.assert_almost_equal(approximations[t], self.problem.eval_values(range(n_states), t), decimal=4)
+        
+        # the coefficients are fitted to the values of all states in the least square sense
+        features = np.hstack([RM_helper.state_table(self.test_capacities), np.ones((n_states, 1))])
+        for t in range(self.test_total_time):
+            expected = np.linalg.lstsq(features, approximations[t], rcond=None)[0]
+            np.testing.assert_almost_equal(self.problem.coefficients[t], expected, decimal=3)
+
+    def test_rank_deficient_samples(self):
+        # fewer states than features can't determine the coefficients, however many times they're sampled
+        with self.assertWarns(UserWarning):
+            self.problem.calc_value_func(m=2)
+        with self.assertWarns(UserWarning):
+            self.problem.calc_value_coefficients(2)
+
+    def test_value_coefficients(self):
+        coefficients = self.problem.calc_value_coefficients(50)
+        self.assertEqual(len(coefficients), self.test_total_time)
+        # separable affine features: one coefficient per resource, and a constant term
+        for r in coefficients:
+            self.assertEqual(len(r), len(self.test_resources) + 1)
+        # nothing is enumerated over the full state space
+        self.assertEqual(len(self.problem.approximations), 0)
+
+        remain_caps = [[1, 2, 0], [3, 4, 2]]
+        expected = np.maximum(np.dot(np.hstack((remain_caps, np.ones((2, 1)))), coefficients[2]), 0)
+        np.testing.assert_almost_equal(self.problem.approx_values_at(2, remain_caps), expected)
+        self.assertAlmostEqual(self.problem.total_expected_revenue(), 
+                               self.problem.approx_value(0, self.test_capacities))
+        self.assertGreater(self.problem.total_expected_revenue(), 0)
+
+    def test_separable_concave(self):
+        self.problem.calc_value_func("separable_concave")
+        offsets = np.cumsum([0] + self.test_capacities)
+        for t in range(self.test_total_time):
+            r = self.problem.coefficients[t]
+            self.assertEqual(len(r), sum(self.test_capacities) + 1)
+            # marginal values of each resource are non-negative and non-increasing
+            for i in range(len(self.test_resources)):
+                slopes = r[offsets[i]:offsets[i+1]]
+                self.assertTrue((slopes >= 0).all())
+                self.assertTrue((np.diff(slopes) <= 1e-9).all())
+
+        # bid prices are the slopes at the remaining capacities
+        bid_prices = self.problem.bid_prices()
+        r = self.problem.coefficients[1]
+        remain_cap = [2, 0, 1]
+        state = RM_helper.state_index(self.problem.n_states, self.test_capacities, remain_cap)
+        expected = [r[offsets[0] + 1], r[offsets[1]], r[offsets[2]]]
+        np.testing.assert_almost_equal(self.problem.bid_prices_at(1, remain_cap), expected)
+        np.testing.assert_almost_equal(bid_prices[1][state], expected, decimal=3)
+
+    def test_bid_prices_from_coefficients(self):
+        n_resources = len(self.test_resources)
+        full_state = self.problem.n_states - 1
+        for method in ["separable_affine", "separable_concave"]:
+            coefficients = self.problem.calc_value_coefficients(50, method)
+            bid_prices = self.problem.bid_prices()
+            self.assertEqual(np.array(bid_prices).shape, (self.test_total_time, self.problem.n_states, n_resources))
+            if method == "separable_affine":
+                # the values are affine in the remaining capacities, so the bid prices are the coefficients
+                expected = np.maximum(coefficients[1][:n_resources], 0)
+            else:
+                expected = self.problem.bid_prices_at(1, self.test_capacities)
+            np.testing.assert_almost_equal(bid_prices[1][full_state], expected, decimal=3)
+
+    def test_sample_remain_caps(self):
+        remain_caps = self.problem.sample_remain_caps(200)
+        self.assertEqual(remain_caps.shape, (200, len(self.test_resources)))
+        self.assertTrue((remain_caps >= 0).all())
+        self.assertTrue((remain_caps <= self.test_capacities).all())
+
+class ALP_tests(unittest.TestCase):
+
+    test_products = [['a1', 40],['a2', 30], ['b1', 20], ['ab', 55]]
+    test_resources = ['a', 'b']
+    test_capacities = [3, 2]
+    test_total_time = 4
+    test_arrival_rates = [[0.1, 0.2, 0.1, 0.15]]
+
+    def setUp(self):
+        self.demand_model = RM_demand_model.model(self.test_arrival_rates, self.test_total_time, 1)
+        self.problem = RM_ADP.ALP(self.test_products, self.test_resources, self.test_capacities, 
+                                  self.test_total_time, self.demand_model)
+        # sample all the states in every time period
+        states = RM_helper.state_table(self.test_capacities).tolist()
+        self.sampled_states = [states for t in range(self.test_total_time)]
+        
+    def initial_value(self, varsdict):
+        return sum(varsdict['_'.join(['r', self.test_resources[i], '0', str(x)])] 
+                   for i in range(len(self.test_resources)) for x in range(self.test_capacities[i] + 1))
+
+    def test_sample_visited_states_batch(self):
+        np.random.seed(0)
+        for policy in ['static', 'cached']:
+            visited_states = self.problem.sample_visited_states_batch(15, n_paths=10, policy=policy)
+            self.assertEqual(len(visited_states), self.test_total_time)
+            self.assertEqual(visited_states[0], [self.test_capacities])
+            self.assertEqual(sum(len(states) for states in visited_states), 15)
+            for states in visited_states:
+                # states visited in each time period are distinct, and within the capacities
+                self.assertEqual(len(set(tuple(s) for s in states)), len(states))
+                self.assertTrue(all(0 <= x <= c for s in states for x, c in zip(s, self.test_capacities)))
+
+    def test_solve_RLP_sparse(self):
+        varsdict, varnames = self.problem.solve_RLP_sparse(self.sampled_states, batch_size=1)
+        self.assertEqual(len(varnames), self.test_total_time * sum(c + 1 for c in self.test_capacities))
+        self.assertGreater(self.problem.RLP_rounds, 1)
+        
+        # constraints generated in rounds give the same solution as adding all constraints at once
+        all_varsdict, _ = self.problem.solve_RLP_sparse(self.sampled_states, batch_size=10000)
+        self.assertAlmostEqual(self.initial_value(varsdict), self.initial_value(all_varsdict), places=4)
+        
+        # with all states sampled, the approximated value is an upper bound of the optimal expected revenue
+        products = [p + [r] for p, r in zip(self.test_products, self.test_arrival_rates[0])]
+        products, arrival_rates, _ = RM_helper.sort_product_demands(products)
+        exact = RM_exact.Network_RM(products, self.test_resources, self.test_capacities, self.test_total_time, 
+                                    RM_demand_model.model([arrival_rates], self.test_total_time, 1))
+        self.assertGreaterEqual(self.initial_value(varsdict) + 1e-4, exact.total_expected_revenue())
+        
+        weights = self.problem.weights.reshape(self.test_total_time, -1)
+        np.testing.assert_array_less(-1e-6, weights)
+        
+        bid_prices = self.problem.collect_bid_prices(varsdict, varnames)
+        self.assertEqual(np.array(bid_prices).shape, (self.test_total_time, self.problem.n_states, 
+                                                      len(self.test_resources)))
+
+    def test_solve_RLP_sparse_matches_pulp(self):
+        # the PuLP model shares one y over the sampled states and products in each time period, and leaves the
+        # weights unbounded, so the two LPs are the same with one product and one sampled state in each period
+        products = [['a1', 40]]
+        resources = ['a']
+        capacities = [5]
+        total_time = 6
+        problem = RM_ADP.ALP(products, resources, capacities, total_time,
+                             RM_demand_model.model([[0.7]], total_time, 1))
+        sampled_states = [[capacities] for t in range(total_time)]
+
+        varsdict, varnames = problem.solve_RLP_sparse(sampled_states)
+        pulp_varsdict, _ = problem.solve_RLP(sampled_states)
+        initial_value = lambda v: sum(v['_'.join(['r', 'a', '0', str(x)])] for x in range(capacities[0] + 1))
+        self.assertAlmostEqual(initial_value(varsdict), initial_value(pulp_varsdict), places=4)
+        np.testing.assert_allclose([varsdict[name] for name in varnames],
+                                   [pulp_varsdict[name] for name in varnames], atol=1e-4)
+
+    def test_compact_bid_prices(self):
+        varsdict, varnames = self.problem.solve_RLP_sparse(self.sampled_states)
+        compact_bid_prices = self.problem.compact_bid_prices()
+        self.assertEqual(compact_bid_prices.shape, (self.test_total_time, len(self.test_resources), 
+                                                    max(self.test_capacities) + 1))
+        np.testing.assert_almost_equal(self.problem.compact_bid_prices(varsdict), compact_bid_prices)
+        
+        bid_prices = self.problem.collect_bid_prices(varsdict, varnames)
+        for t in range(self.test_total_time):
+            for s in range(self.problem.n_states):
+                remain_cap = RM_helper.remain_cap(self.problem.n_states, self.test_capacities, s)
+                expected = [max(varsdict['_'.join(['r', self.test_resources[i], str(t), str(remain_cap[i])])], 0) 
+                            for i in range(len(self.test_resources))]
+                np.testing.assert_almost_equal(bid_prices[t][s], expected)
+        
+        # simulators give the same results with bid prices in the compact form
+        compact_table = RM_helper.compact_bid_prices_table(compact_bid_prices)
+        np.random.seed(1)
+        for _ in range(5):
+            requests = np.random.choice(len(self.test_products) + 1, self.test_total_time).tolist()
+            results = RM_compare.simulate_network_bidprices_control([bid_prices, compact_table], 
+                                                                    self.test_products, self.test_resources, 
+                                                                    self.test_capacities, self.test_total_time, 
+                                                                    requests)
+            self.assertEqual(results[0], results[1])
+
+class DLBFA_tests(unittest.TestCase):
+
+    test_products = [['A-hub,1', 136, 0.015], ['B-hub,1', 64, 0.011], ['hub-A,1', 59, 0.015], 
+                     ['hub-B,1', 114, 0.03], ['A-hub-B,1', 80, 0.012], ['B-hub-A,1', 102, 0.01],
+                     ['A-hub-A,1', 60, 0.06], ['B-hub-B,1', 205, 0.048]]
+    test_resources = ['A-hub', 'B-hub', 'hub-A', 'hub-B']
+    test_capacities = [2, 3, 2, 1]
+    test_total_time = 5
+
+    def setUp(self):
+        self.problem = RM_ADP.DLBFA(self.test_products, self.test_resources, self.test_capacities, 
+                                    self.test_total_time)
+
+    def test_calc_value_func(self):
+        approx_weights = self.problem.calc_value_func()
+        self.assertEqual(len(approx_weights), self.test_total_time)
+        
+        for s in range(self.problem.n_subnets):
+            sub_products, sub_arrival_rates, _ = RM_helper.sort_product_demands(self.problem.dl_products[s][:])
+            sub_resources, sub_capacities = self.problem.capacity_of_subnetwork(self.test_capacities, s)
+            sub_problem = RM_exact.Network_RM(sub_products, sub_resources, sub_capacities, self.test_total_time, 
+                                              RM_demand_model.model([sub_arrival_rates], self.test_total_time, 1))
+            sub_value_funcs = sub_problem.calc_value_func()
+            
+            # weights are fitted to the values of the subnetwork in each time period
+            features = self.problem.dl_features[s]
+            self.assertEqual(len(features), sub_problem.n_states)
+            for t in range(self.test_total_time):
+                expected = np.linalg.lstsq(features, sub_value_funcs[t], rcond=None)[0]
+                np.testing.assert_almost_equal(approx_weights[t][s], expected)
+        
+        # features of states in each subnetwork: a constant, the minimum remaining capacity of resources used by each 
+        # product, the squared remaining capacity of each resource, and the product of remaining capacities
+        expected_features = {0: {(2, 1): [1, 2, 1, 2, 1, 4, 1, 2], (0, 2): [1, 0, 2, 0, 0, 0, 4, 0]}, 
+                             1: {(3, 1): [1, 3, 1, 3, 1, 9, 1, 3], (1, 0): [1, 1, 0, 1, 0, 1, 0, 0]}}
+        for s, states in expected_features.items():
+            for remain_cap, expected in states.items():
+                sub_state = np.dot(remain_cap, self.problem.dl_state_strides[s])
+                np.testing.assert_almost_equal(self.problem.dl_features[s][sub_state], expected)
+                np.testing.assert_almost_equal(self.problem.basis_func_vector(s, list(remain_cap)), expected)
+        
+        expected_value = sum(np.dot(self.problem.basis_func_vector(s, [1, 1]), approx_weights[2][s]) 
+                             for s in range(self.problem.n_subnets))
+        self.assertAlmostEqual(self.problem.approx_value_func(2, [1] * 4), expected_value)
+        self.assertFalse(self.problem.accept_request(2, [0, 1, 1, 1], 0))
+
+    def test_calc_value_func_parallel(self):
+        expected_weights = self.problem.calc_value_func()
+        approx_weights = self.problem.calc_value_func(n_workers=2)
+        np.testing.assert_almost_equal(approx_weights, expected_weights)
+
+a = One_state_transition_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+a = DP_w_featureExtraction_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+a = DLBFA_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+a = ALP_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,88 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import numpy as np
+import scipy.stats
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_approx
+import RM_demand_model
+import RM_helper
+
+
+class Batch_EMSR_tests(unittest.TestCase):
+
+    # test data, ref: example 2.3 in "The Theory and Practice of Revenue Management"
+    test_products = [[1, 1050], [2,567], [3, 534], [4,520]]
+    test_demands = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
+
+    def test_single_EMSR_protection_levels(self):
+        problem = RM_approx.Single_EMSR(self.test_products, self.test_demands, 80)
+        expected_protection_levels = [16.72, 50.94, 83.15, 80]
+        np.testing.assert_equal(problem.get_protection_levels(), expected_protection_levels)
+
+    def test_batch_EMSR_b_matches_single_legs(self):
+        second_products = [[1, 1050], [2,950], [3, 699], [4,520]]
+        fares = [[p[1] for p in self.test_products], [p[1] for p in second_products]]
+        means = [[d[0] for d in self.test_demands]] * 2
+        stds = [[d[1] for d in self.test_demands]] * 2
+        batch = RM_approx.Batch_EMSR(fares, means, stds, [80, 100])
+        protection_levels = batch.get_protection_levels('b')
+
+        # computed leg by leg with the EMSR-b formula, ref: section 2.2.4.2
+        expected_first = [16.72, 50.94, 83.15, 80]
+        expected_second = [9.71, 53.27, 96.83, 100]
+        np.testing.assert_almost_equal(protection_levels, [expected_first, expected_second])
+        np.testing.assert_almost_equal(RM_approx.Single_EMSR(second_products, self.test_demands, 
+                                                             100).get_protection_levels(), expected_second)
+
+    def test_batch_EMSR_a(self):
+        fares = [[p[1] for p in self.test_products]]
+        means = [[d[0] for d in self.test_demands]]
+        stds = [[d[1] for d in self.test_demands]]
+        batch = RM_approx.Batch_EMSR(fares, means, stds, [80])
+        protection_levels = batch.get_protection_levels('a')
+        # the highest class is protected against the second class alone, the same as EMSR-b
+        np.testing.assert_equal(protection_levels[0][0], 16.72)
+        # each higher class is protected against the third class separately
+        expected_second_level = scipy.stats.norm(17.3, 5.8).isf(534 / 1050) + \
+                                scipy.stats.norm(45.1, 15.0).isf(534 / 567)
+        np.testing.assert_almost_equal(protection_levels[0][1], expected_second_level, decimal=2)
+        np.testing.assert_equal(protection_levels[0][-1], 80)
+
+class Network_DLP_tests(unittest.TestCase):
+
+    test_products = [['1a', 1050], ['2a',590], ['1b', 801], ['2b', 752], ['1ab', 760,], ['2ab', 1400]]
+    test_resources = ['a', 'b']
+    test_arrival_rates = [[0.1, 0.2, 0.05, 0.28, 0.14, 0.21]]
+
+    def test_get_bid_prices_highs(self):
+        products = RM_helper.sort_product_revenues(self.test_products)
+        demand_model = RM_demand_model.model(self.test_arrival_rates, 10, 1)
+        problem = RM_approx.Network_DLP(products, self.test_resources, [3, 5], demand_model)
+        for remain_cap, t in [([3, 5], 0), ([1, 2], 3), ([3, 0], 8)]:
+            expected_bid_prices = problem.get_bid_prices(remain_cap, t)
+            expected_obj_value = problem.objective_value
+            np.testing.assert_almost_equal(problem.get_bid_prices(remain_cap, t, 'highs'), expected_bid_prices)
+            self.assertAlmostEqual(problem.objective_value, expected_obj_value, places=4)
+
+a = Batch_EMSR_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+a = Network_DLP_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
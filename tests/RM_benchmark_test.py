@@ -0,0 +1,62 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import copy
+import shutil
+import tempfile
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_benchmark
+
+
+class RM_benchmark_tests(unittest.TestCase):
+
+    test_sizes = [{'n_spokes': 2, 'cap': 1, 'total_time': 5}]
+    test_names = ['Network_RM.calc_value_func', 'Network_DLP.get_bid_prices', 'simulate_network_bidprices_control']
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_generate_problem_is_seeded(self):
+        problem = RM_benchmark.generate_problem(2, 3, 10, seed=1)
+        same_problem = RM_benchmark.generate_problem(2, 3, 10, seed=1)
+        self.assertEqual(problem[:4], same_problem[:4])
+        self.assertEqual(RM_benchmark.sample_requests(problem, 2), RM_benchmark.sample_requests(same_problem, 2))
+
+    def test_run_and_compare_benchmarks(self):
+        file_name = os.path.join(self.directory, 'results', 'benchmarks.json')
+        report = RM_benchmark.run_benchmarks(self.test_sizes, self.test_names, repeat=1, file_name=file_name)
+        self.assertEqual([r['name'] for r in report['results']], self.test_names)
+        self.assertEqual(RM_benchmark.load_benchmarks(file_name), report)
+
+        # doubles the time of the first benchmark
+        slower_report = copy.deepcopy(report)
+        slower_report['results'][0]['min'] *= 2
+        self.assertEqual(RM_benchmark.compare_benchmarks(file_name, report), [])
+        regressions = RM_benchmark.compare_benchmarks(file_name, slower_report)
+        self.assertEqual([r[0] for r in regressions], self.test_names[:1])
+        self.assertAlmostEqual(regressions[0][-1], 2)
+
+    def test_unknown_benchmark(self):
+        with self.assertRaises(ValueError):
+            RM_benchmark.run_benchmarks(self.test_sizes, ['Network_RM.unknown'], repeat=1)
+
+a = RM_benchmark_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,127 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import shutil
+import tempfile
+import time
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_ADP
+import RM_approx
+import RM_cache
+import RM_demand_model
+import RM_evaluator
+import RM_exact
+import RM_helper
+import RM_instrument
+
+
+class RM_cache_tests(unittest.TestCase):
+
+    test_products = [['1a', 1050], ['2a',590], ['1b', 801], ['2b', 752], ['1ab', 760,], ['2ab', 1400]]
+    test_resources = ['a', 'b']
+    test_arrival_rates = [[0.1, 0.2, 0.05, 0.28, 0.14, 0.21]]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.products = RM_helper.sort_product_revenues(self.test_products)
+        self.demand_model = RM_demand_model.model(self.test_arrival_rates, 10, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_problem_key(self):
+        key = RM_cache.problem_key(self.products, self.test_resources, [3, 5], 10, self.demand_model, 'ALP', {'K': 50})
+        self.assertEqual(key, RM_cache.problem_key(self.products, self.test_resources, [3, 5], 10,
+                                                   RM_demand_model.model(self.test_arrival_rates, 10, 1), 'ALP',
+                                                   {'K': 50}))
+        self.assertNotEqual(key, RM_cache.problem_key(self.products, self.test_resources, [3, 4], 10,
+                                                      self.demand_model, 'ALP', {'K': 50}))
+        self.assertNotEqual(key, RM_cache.problem_key(self.products, self.test_resources, [3, 5], 10,
+                                                      self.demand_model, 'ALP', {'K': 60}))
+
+    def test_network_RM_bid_prices(self):
+        for mmap in [False, True]:
+            cache = RM_cache.Cache(os.path.join(self.directory, str(mmap)), mmap=mmap)
+            expected = RM_exact.Network_RM(self.products, self.test_resources, [3, 5], 10,
+                                           self.demand_model).get_bid_prices()
+            for _ in range(2):
+                model = RM_exact.Network_RM(self.products, self.test_resources, [3, 5], 10, self.demand_model)
+                with RM_instrument.recording() as result:
+                    bid_prices = RM_cache.network_RM_bid_prices(model, cache)
+                self.assertEqual(bid_prices, expected)
+                self.assertEqual(model.total_expected_revenue(), model.calc_value_func()[0][-1])
+            # solved only once
+            self.assertEqual(result['counters'], {})
+            self.assertEqual([cache.hits, cache.misses], [1, 1])
+            self.assertEqual(len(cache.entries()), 1)
+
+    def test_ALP_and_DAVN(self):
+        cache = RM_cache.Cache(self.directory)
+        np.random.seed(0)
+        model = RM_ADP.ALP(self.products, self.test_resources, [3, 5], 10, self.demand_model)
+        compact = RM_cache.ALP_bid_prices(model, 20, cache, 'highs', compact=True)
+        bid_prices = RM_cache.ALP_bid_prices(model, 20, cache, 'highs')
+        self.assertEqual(bid_prices, RM_helper.expand_compact_bid_prices(compact, [3, 5]))
+        self.assertEqual(cache.hits, 1)
+
+        static_price = RM_approx.Network_DLP(self.products, self.test_resources, [3, 5],
+                                             self.demand_model).get_bid_prices([3, 5], 0)
+        expected = RM_approx.Network_DAVN(self.products, self.test_resources, [3, 5], 2,
+                                          self.demand_model).calc_value_function(static_price, [3, 5], 0)
+        for _ in range(2):
+            model = RM_approx.Network_DAVN(self.products, self.test_resources, [3, 5], 2, self.demand_model)
+            result = RM_cache.DAVN_value_function(model, static_price, [3, 5], 0, cache)
+            self.assertEqual(result[1:4], expected[1:4])
+            self.assertEqual([list(map(tuple, vc)) for vc in result[4]], [list(map(tuple, vc)) for vc in expected[4]])
+            np.testing.assert_allclose(np.concatenate(result[0]), np.concatenate(expected[0]))
+        self.assertEqual(cache.hits, 2)
+
+    def test_ALP_samples(self):
+        cache = RM_cache.Cache(self.directory)
+        model = RM_ADP.ALP(self.products, self.test_resources, [3, 5], 10, self.demand_model)
+        for sample in [0, 1, 0]:
+            RM_cache.ALP_bid_prices(model, 20, cache, 'highs', sample=sample)
+        # each sample is solved once
+        self.assertEqual([cache.hits, cache.misses], [1, 2])
+
+        # an evaluator solving ALP in every iteration caches a solution for each iteration
+        cache.clear()
+        RM_evaluator.compare_with_DLPVD(1, 2, 2, 3, 1, [2], [10], cache=cache)
+        self.assertEqual(len(cache.entries()), 3)
+
+    def test_eviction(self):
+        cache = RM_cache.Cache(self.directory, max_bytes=0)
+        cache.save('a', {'values': np.zeros(100), 'K': 50})
+        self.assertEqual(cache.entries(), [])
+
+        cache.max_bytes = 10 ** 6
+        for key in ['a', 'b', 'c']:
+            cache.save(key, {'values': np.random.random(1000), 'K': 50})
+            # makes sure the last used times differ
+            time.sleep(0.01)
+        self.assertEqual(cache.load('a')['K'], 50)
+        cache.max_bytes = cache.size() - 1
+        cache.evict()
+        self.assertEqual([entry[0] for entry in cache.entries()], ['c', 'a'])
+        self.assertIsNone(cache.load('b'))
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+a = RM_cache_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,120 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import random
+import shutil
+import tempfile
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_approx
+import RM_compare
+import RM_demand_model
+import RM_exact
+import RM_helper
+
+
+class single_static_simulation_tests(unittest.TestCase):
+
+    # test data, ref: example 2.3 in "The Theory and Practice of Revenue Management"
+    test_products = [[1, 1050], [2,567], [3, 534], [4,520]]
+    test_demands = [(17.3, 5.8), (45.1, 15.0), (39.6, 13.2), (34.0, 11.3)]
+    test_capacity = 80
+    test_requests = [[20, 40, 45, 30], [10, 60, 20, 5], [30, 0, 0, 90], [5, 10, 15, 20], [-2, 50, 60, -3]]
+
+    @classmethod
+    def setUpClass(cls):
+        exact = RM_exact.Single_RM_static(cls.test_products, cls.test_demands, cls.test_capacity)
+        cls.bid_prices = [exact.get_bid_prices()]
+        EMSR_protection_levels = RM_approx.Single_EMSR(cls.test_products, cls.test_demands,
+                                                       cls.test_capacity).get_protection_levels()
+        cls.protection_levels = [exact.get_protection_levels(), EMSR_protection_levels]
+
+    def test_bidprices_control_batch(self):
+        revs, load_factors = RM_compare.simulate_single_static_bidprices_control_batch(self.bid_prices,
+                                                                                       self.test_products,
+                                                                                       self.test_capacity,
+                                                                                       self.test_requests)
+        for i in range(len(self.test_requests)):
+            expected = RM_compare.simulate_single_static_bidprices_control(self.bid_prices, self.test_products,
+                                                                           self.test_demands, self.test_capacity,
+                                                                           self.test_requests[i])
+            np.testing.assert_almost_equal(revs[:, i], [r[0] for r in expected])
+            np.testing.assert_almost_equal(load_factors[:, i], [r[1] for r in expected])
+
+    def test_protectionlevel_control_batch(self):
+        revs, load_factors = RM_compare.simulate_single_static_protectionlevel_control_batch(self.protection_levels,
+                                                                                             self.test_products,
+                                                                                             self.test_capacity,
+                                                                                             self.test_requests)
+        for i in range(len(self.test_requests)):
+            expected = RM_compare.simulate_single_static_protectionlevel_control(self.protection_levels,
+                                                                                 self.test_products,
+                                                                                 self.test_demands,
+                                                                                 self.test_capacity,
+                                                                                 self.test_requests[i])
+            np.testing.assert_almost_equal(revs[:, i], [r[0] for r in expected])
+            np.testing.assert_almost_equal(load_factors[:, i], [r[1] for r in expected])
+
+class network_simulation_tests(unittest.TestCase):
+
+    test_products = [['1a', 1050], ['2a',590], ['1b', 801], ['2b', 752], ['1ab', 760,], ['2ab', 1400]]
+    test_resources = ['a', 'b']
+    test_capacities = [4, 6]
+    test_total_time = 20
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.products = RM_helper.sort_product_revenues(self.test_products)
+        self.demand_model = RM_demand_model.model([[0.1, 0.2, 0.05, 0.28, 0.14, 0.21]], self.test_total_time, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stored_value_functions(self):
+        exact = RM_exact.Network_RM(self.products, self.test_resources, self.test_capacities, self.test_total_time,
+                                    self.demand_model)
+        expected_bid_prices = exact.get_bid_prices()
+        storage = os.path.join(self.directory, 'value_functions.dat')
+        stored = RM_exact.Network_RM(self.products, self.test_resources, self.test_capacities, self.test_total_time,
+                                     self.demand_model, storage)
+        self.assertIsInstance(stored.calc_value_func(), np.memmap)
+        np.testing.assert_equal(stored.value_functions, exact.value_functions)
+
+        # loads the stored value functions in another model, and simulates with bid prices read from them
+        loaded = RM_exact.Network_RM(self.products, self.test_resources, self.test_capacities, self.test_total_time,
+                                     self.demand_model, storage)
+        loaded.load_value_func()
+        self.assertEqual(loaded.total_expected_revenue(), exact.total_expected_revenue())
+        bid_prices = loaded.get_bid_prices()
+        self.assertEqual(len(bid_prices), self.test_total_time)
+        self.assertEqual([bid_prices[t][s] for t in range(self.test_total_time) for s in range(exact.n_states)],
+                         [bp for bp_t in expected_bid_prices for bp in bp_t])
+        random.seed(0)
+        requests = self.demand_model.sample_network_arrival_rates()
+        results = RM_compare.simulate_network_bidprices_control([expected_bid_prices, bid_prices], self.products,
+                                                                self.test_resources, self.test_capacities,
+                                                                self.test_total_time, requests)
+        self.assertEqual(results[0], results[1])
+
+        wrong_size = RM_exact.Network_RM(self.products, self.test_resources, [4, 5], self.test_total_time,
+                                         self.demand_model, storage)
+        with self.assertRaises(ValueError):
+            wrong_size.load_value_func()
+
+a = single_static_simulation_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,86 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_decomposition
+import RM_demand_model
+import RM_exact
+import RM_helper
+
+
+class RM_decomposition_tests(unittest.TestCase):
+
+    test_products = [['A-hub,1', 136, 0.015], ['B-hub,1', 64, 0.011], ['hub-A,1', 59, 0.015], 
+                     ['hub-B,1', 114, 0.03], ['A-hub-B,1', 80, 0.012], ['B-hub-A,1', 102, 0.01],
+                     ['A-hub-A,1', 60, 0.06], ['B-hub-B,1', 205, 0.048]]
+    test_resources = ['A-hub', 'B-hub', 'hub-A', 'hub-B']
+
+    def test_connected_components(self):
+        incidence_matrix = [[1, 0, 1, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1], [0, 1, 0, 1]]
+        self.assertEqual(RM_decomposition.connected_components(incidence_matrix), [[0, 2], [1, 3, 4]])
+        
+    def test_partition_resources(self):
+        # a line of resources 0-1-2-3, with the heaviest product on resources 1 and 2
+        incidence_matrix = [[1, 0, 0, 1], [1, 1, 0, 0], [0, 1, 1, 0], [0, 0, 1, 0]]
+        groups = RM_decomposition.partition_resources(incidence_matrix, 2, [1, 5, 1, 0])
+        self.assertEqual(groups, [[1, 2], [0], [3]])
+        
+        incidence_matrix = RM_helper.calc_incidence_matrix(self.test_products, self.test_resources)
+        groups = RM_decomposition.partition_resources(incidence_matrix, 2)
+        self.assertEqual(sorted(i for group in groups for i in group), list(range(len(self.test_resources))))
+        self.assertTrue(all(len(group) <= 2 for group in groups))
+        # the round trips keep the legs between a spoke and the hub together
+        self.assertEqual(sorted(groups), [[0, 2], [1, 3]])
+        
+    def test_prorate_fares(self):
+        incidence_matrix = RM_helper.calc_incidence_matrix(self.test_products, self.test_resources)
+        groups = [[0, 2], [1, 3]]
+        prorated_fares = RM_decomposition.prorate_fares(self.test_products, incidence_matrix, groups)
+        np.testing.assert_almost_equal(prorated_fares.sum(axis=0), [p[1] for p in self.test_products])
+        np.testing.assert_almost_equal(prorated_fares[:, 4], [40, 40])
+        
+        prorated_fares = RM_decomposition.prorate_fares(self.test_products, incidence_matrix, groups, [3, 1, 1, 1])
+        np.testing.assert_almost_equal(prorated_fares[:, 4], [60, 20])
+        
+    def test_decomposition_of_independent_subnetworks(self):
+        # without products across subnetworks, the sum of values of subnetworks is the value of the network
+        products = [p for p in self.test_products if p[0] not in ['A-hub-B,1', 'B-hub-A,1']]
+        capacities = [2, 1, 2, 2]
+        total_time = 6
+        problem = RM_decomposition.Network_decomposition(products, self.test_resources, capacities, total_time)
+        self.assertEqual(len(problem.subproblems), 2)
+        
+        sorted_products, arrival_rates, _ = RM_helper.sort_product_demands([p[:] for p in products])
+        exact = RM_exact.Network_RM(sorted_products, self.test_resources, capacities, total_time, 
+                                    RM_demand_model.model([arrival_rates], total_time, 1))
+        exact_value_funcs = exact.calc_value_func()
+        for t in [0, 3]:
+            for state in range(exact.n_states):
+                remain_cap = RM_helper.remain_cap(exact.n_states, capacities, state)
+                self.assertAlmostEqual(problem.approx_value_func(t, remain_cap), exact_value_funcs[t][state], 
+                                       places=2)
+        
+        parallel_value_funcs = problem.calc_value_func(n_workers=2)
+        serial_value_funcs = problem.calc_value_func()
+        for g in range(len(problem.subproblems)):
+            np.testing.assert_almost_equal(parallel_value_funcs[g], serial_value_funcs[g])
+        self.assertFalse(problem.accept_request(0, [0, 1, 1, 1], 0))
+
+a = RM_decomposition_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
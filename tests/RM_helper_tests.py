@@ -32,6 +32,81 @@ class RM_helper_tests(unittest.TestCase):
         remain_cap = RM_helper.remain_cap(test_states, test_capacity, test_state_number)
         np.testing.assert_equal(remain_cap, expected_remain_cap)
         
+    def test_sample_single_static_demands_batch(self):
+        test_demands = [(17.3, 5.8), (45.1, 15.0), (4.0, 6.0)]
+        np.random.seed(0)
+        samples = RM_helper.sample_single_static_demands_batch(test_demands, 1000)
+        np.testing.assert_equal(samples.shape, (1000, 3))
+        self.assertTrue((samples >= 0).all())
+        
+        for distribution in ['poisson', 'negative_binomial', 'gamma']:
+            samples = RM_helper.sample_single_static_demands_batch(test_demands, 1000, distribution)
+            np.testing.assert_equal(samples.shape, (1000, 3))
+            self.assertTrue((samples >= 0).all())
+            
+    def test_discretised_demand_pmf(self):
+        test_mean = 4.0
+        test_std = 6.0
+        pmf = RM_helper.discretised_demand_pmf(test_mean, test_std, rounding = 'round')
+        np.testing.assert_almost_equal(sum(pmf), 1, decimal=4)
+        
+        np.random.seed(0)
+        samples = RM_helper.sample_single_static_demands_batch([(test_mean, test_std)], 100000, rounding = 'round')
+        sampled_freq = np.bincount(samples[:, 0], minlength=len(pmf))[:len(pmf)] / len(samples)
+        np.testing.assert_almost_equal(sampled_freq, pmf, decimal=2)
+        
+    def test_state_table_and_offsets(self):
+        test_capacity = [1, 2, 1]
+        n_states = 12
+        states = RM_helper.state_table(test_capacity)
+        strides = RM_helper.state_strides(test_capacity)
+        np.testing.assert_equal(strides, [6, 2, 1])
+        # products using resources [0], [1, 2], [0, 1, 2]
+        incidence_matrix = [[1, 0, 1], [0, 1, 1], [0, 1, 1]]
+        offsets = RM_helper.sell_offsets(incidence_matrix, test_capacity)
+        for s in range(n_states):
+            remain_cap = RM_helper.remain_cap(n_states, test_capacity, s)
+            np.testing.assert_equal(states[s], remain_cap)
+            self.assertEqual(states[s].dot(strides), s)
+            for i in range(len(test_capacity)):
+                if remain_cap[i] > 0:
+                    reduced_cap = remain_cap[:]
+                    reduced_cap[i] -= 1
+                    self.assertEqual(RM_helper.state_index(n_states, test_capacity, reduced_cap), s - strides[i])
+            for j in range(len(offsets)):
+                reduced_cap = [x - row[j] for x, row in zip(remain_cap, incidence_matrix)]
+                if min(reduced_cap) >= 0:
+                    self.assertEqual(RM_helper.state_index(n_states, test_capacity, reduced_cap), s - offsets[j])
+        
+    def test_expand_compact_bid_prices(self):
+        capacities = [2, 1]
+        compact_bid_prices = np.array([[[5, 4, 3], [7, 6, 0]], [[2, 1, 0], [9, 8, 0]]])
+        bid_prices = RM_helper.expand_compact_bid_prices(compact_bid_prices, capacities)
+        self.assertEqual(len(bid_prices), 2)
+        # states in the order of remaining capacities: [0,0], [0,1], [1,0], [1,1], [2,0], [2,1]
+        self.assertEqual(bid_prices[0], [[5, 7], [5, 6], [4, 7], [4, 6], [3, 7], [3, 6]])
+        compact_table = RM_helper.compact_bid_prices_table(compact_bid_prices)
+        for t in range(2):
+            for s in range(6):
+                remain_cap = RM_helper.remain_cap(6, capacities, s)
+                np.testing.assert_equal(RM_helper.bid_prices_at(compact_table, t, s, remain_cap), bid_prices[t][s])
+                self.assertEqual(RM_helper.bid_prices_at(bid_prices, t, s, remain_cap), bid_prices[t][s])
+        
+        # bid prices for every state, as an np array of the same shape as the compact form, with capacities [1, 0]
+        bid_prices = np.array([[[5, 4], [3, 2]]])
+        np.testing.assert_equal(RM_helper.bid_prices_at(bid_prices, 0, 1, [1, 0]), [3, 2])
+        compact_table = RM_helper.compact_bid_prices_table(bid_prices)
+        np.testing.assert_equal(RM_helper.bid_prices_at(compact_table, 0, 1, [1, 0]), [4, 3])
+        
+    def test_project_nonincreasing(self):
+        np.testing.assert_almost_equal(RM_helper.project_nonincreasing([5, 3, 3, 1]), [5, 3, 3, 1])
+        np.testing.assert_almost_equal(RM_helper.project_nonincreasing([3, 5, 1, 2, 2, 0]), 
+                                       [4, 4, 5/3, 5/3, 5/3, 0])
+        
+    def test_round_values(self):
+        values = np.array([3651.3315, 2.0005, 1.2344, 0.5, 7.0015])
+        np.testing.assert_equal(RM_helper.round_values(values, 3), [round(float(v), 3) for v in values])
+    
     
 a = RM_helper_tests()
 suite = unittest.TestLoader().loadTestsFromModule(a)
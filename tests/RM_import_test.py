@@ -0,0 +1,62 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import subprocess
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_helper
+
+
+class Module_import_tests(unittest.TestCase):
+
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    modules = ['RM', 'RM_ADP', 'RM_approx', 'RM_benchmark', 'RM_cache', 'RM_compare', 'RM_decomposition',
+               'RM_demand_model', 'RM_evaluator', 'RM_exact', 'RM_helper', 'RM_instrument', 'RM_results',
+               'RM_scaling', 'iterative_DAVN', 'network_DAVN', 'singleResource_DCM']
+    optional_dependencies = ['pulp', 'matplotlib', 'networkx', 'pandas']
+
+    def test_import_has_no_side_effects(self):
+        for module in self.modules:
+            # imports the module in a fresh interpreter, and reports the optional dependencies loaded
+            code = "import sys; import %s; print(sorted(set(%r) & set(sys.modules)))" % \
+                   (module, self.optional_dependencies)
+            output = subprocess.check_output([sys.executable, '-c', code], cwd=self.src_dir,
+                                             universal_newlines=True)
+            self.assertEqual(output.strip(), '[]', module)
+
+    def test_lightweight_modules_defer_scipy(self):
+        # modules imported by every other module, or by scripts only writing results, don't import scipy
+        for module in ['RM_helper', 'RM_instrument', 'RM_cache', 'RM_results']:
+            code = "import sys; import %s; print('scipy' in sys.modules)" % module
+            output = subprocess.check_output([sys.executable, '-c', code], cwd=self.src_dir,
+                                             universal_newlines=True)
+            self.assertEqual(output.strip(), 'False', module)
+
+    def test_lazy_import(self):
+        lazy_json = RM_helper.lazy_import('json')
+        self.assertIsNone(lazy_json._module)
+        self.assertEqual(lazy_json.dumps([1]), '[1]')
+        self.assertIs(lazy_json._load(), sys.modules['json'])
+        # attributes of the module are not hidden by the proxy
+        self.assertIs(lazy_json.load, sys.modules['json'].load)
+
+        missing = RM_helper.lazy_import('a_module_not_installed')
+        with self.assertRaises(ImportError):
+            missing.anything
+
+a = Module_import_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
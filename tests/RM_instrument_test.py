@@ -0,0 +1,119 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import shutil
+import tempfile
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_ADP
+import RM_approx
+import RM_demand_model
+import RM_evaluator
+import RM_exact
+import RM_helper
+import RM_instrument
+
+
+class RM_instrument_tests(unittest.TestCase):
+
+    test_products = [['1a', 1050], ['2a',590], ['1b', 801], ['2b', 752], ['1ab', 760,], ['2ab', 1400]]
+    test_resources = ['a', 'b']
+    test_arrival_rates = [[0.1, 0.2, 0.05, 0.28, 0.14, 0.21]]
+
+    def setUp(self):
+        self.products = RM_helper.sort_product_revenues(self.test_products)
+        self.demand_model = RM_demand_model.model(self.test_arrival_rates, 10, 1)
+        RM_instrument.reset()
+
+    def test_disabled(self):
+        RM_exact.Network_RM(self.products, self.test_resources, [3, 5], 10, self.demand_model).calc_value_func()
+        self.assertEqual(RM_instrument.report(), {'timers': {}, 'counters': {}})
+        self.assertEqual(RM_exact.Network_RM.calc_value_func.__name__, 'calc_value_func')
+
+    def test_recording(self):
+        with RM_instrument.recording() as result:
+            RM_exact.Network_RM(self.products, self.test_resources, [3, 5], 10, self.demand_model).get_bid_prices()
+            with RM_instrument.timer('outer'):
+                RM_approx.Network_DLP(self.products, self.test_resources, [3, 5],
+                                      self.demand_model).get_bid_prices([3, 5], 0, 'highs')
+        self.assertFalse(RM_instrument.enabled)
+
+        self.assertEqual(result['counters'], {'DP_cells': 10 * 24, 'LP_solves': 1})
+        self.assertEqual(set(result['timers']), {'Network_RM.calc_value_func', 'Network_RM.bid_prices', 'outer',
+                                                 'Network_DLP.get_bid_prices', 'Network_DLP.solve_LP'})
+        self.assertEqual(result['timers']['Network_RM.calc_value_func']['calls'], 1)
+        self.assertGreaterEqual(result['timers']['outer']['total'],
+                                result['timers']['Network_DLP.solve_LP']['total'])
+
+        table = RM_instrument.to_dataframe([result, {'timers': {}, 'counters': {'LP_solves': 3}}], ['DP', 'DLP'])
+        self.assertEqual(list(table['LP_solves']), [1, 3])
+        self.assertIn('time: Network_RM.calc_value_func', table.columns)
+
+    def test_single_resource_counters(self):
+        with RM_instrument.recording() as result:
+            RM_exact.Single_RM_dynamic([[1, 1050], [2, 567]], [[0.1, 0.4]], 5, 8).calc_value_func()
+        # a cell for each remaining capacity from 0 to 5, in each time period
+        self.assertEqual(result['counters'], {'DP_cells': 8 * 6})
+
+    def test_ALP_counters(self):
+        np.random.seed(0)
+        problem = RM_ADP.ALP(self.products, self.test_resources, [3, 5], 10, self.demand_model)
+        with RM_instrument.recording() as result:
+            problem.get_bid_prices(30, 'highs')
+        counters = result['counters']
+        self.assertEqual(counters['ALP.states_sampled'], 30)
+        self.assertEqual(counters['LP_solves'], counters['ALP.DLP_cache_misses'] + problem.RLP_rounds)
+        # with the static policy, the DLP is solved at most once in each time period
+        self.assertLessEqual(counters['ALP.DLP_cache_misses'], 9)
+        self.assertIn('ALP.DLP_cache_hits', counters)
+        self.assertIn('ALP.sample_states', result['timers'])
+        self.assertIn('ALP.solve_RLP', result['timers'])
+
+    def test_method_profiler(self):
+        self.assertIs(RM_instrument.Method_profiler().phase('DP', 'planning'), RM_instrument._NO_TIMER)
+        self.assertIsNone(RM_instrument.Method_profiler(False).dump())
+
+        directory = tempfile.mkdtemp()
+        try:
+            profiler = RM_instrument.Method_profiler(os.path.join(directory, 'profiles'), top=3)
+            for _ in range(2):
+                with profiler.phase('DP', 'planning'):
+                    RM_exact.Network_RM(self.products, self.test_resources, [3, 5], 10,
+                                        self.demand_model).calc_value_func()
+            table = profiler.dump()
+            self.assertEqual(list(table['method']), ['DP'] * 3)
+            self.assertEqual(list(table['cumtime']), sorted(table['cumtime'], reverse=True))
+            self.assertTrue(any('calc_value_func' in function for function in table['function']))
+            self.assertEqual(sorted(os.listdir(os.path.join(directory, 'profiles'))),
+                             ['DP_planning.prof', 'profile_summary.csv'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_evaluator_profile(self):
+        directory = tempfile.mkdtemp()
+        try:
+            np.random.seed(0)
+            RM_evaluator.LPADP_compare_K(1, 2, 1, 1, 1, [10], profile=directory)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['DLPVD_simulation.prof', 'LPADP_K=10_planning.prof', 'LPADP_simulation.prof',
+                              'profile_summary.csv'])
+        finally:
+            shutil.rmtree(directory)
+
+a = RM_instrument_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,211 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import random
+import shutil
+import tempfile
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_evaluator
+import RM_results
+
+
+class interrupted_stream(RM_results.Result_stream):
+    """a stream which fails after the given number of iterations written, as if the run was interrupted"""
+    def __init__(self, file_name, n_iterations):
+        super().__init__(file_name, flush_every=1)
+        self.n_iterations = n_iterations
+
+    def write(self, problem, iteration, rows):
+        if self.n_iterations == 0:
+            raise KeyboardInterrupt()
+        self.n_iterations -= 1
+        super().write(problem, iteration, rows)
+
+class RM_results_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'results', 'rows.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_and_table(self):
+        stream = RM_results.Result_stream(self.file_name, flush_every=3)
+        stream.write(0, 0, {'DLPVD': {'revenue': 100, 'load_factor': 50.0},
+                            'DLPDAVN_vc=2': {'revenue': 90, 'revenue_gap %': -10.0}})
+        self.assertFalse(os.path.exists(self.file_name))
+        stream.write(0, 1, {'DLPVD': {'revenue': 200, 'load_factor': 70.0},
+                            'DLPDAVN_vc=2': {'revenue': 210, 'revenue_gap %': 5.0}})
+        self.assertTrue(os.path.exists(self.file_name))
+        stream.write(1, 0, {'DLPVD': {'revenue': 0.1, 'load_factor': 1 / 3}})
+        with self.assertRaises(ValueError):
+            stream.write(1, 1, {'DLPVD': {'profit': 1}})
+
+        self.assertEqual(len(stream.read()), 5)
+        table_data = stream.table(2, [('DLPVD', 'revenue'), ('DLPVD', 'load_factor'),
+                                      [('DLPDAVN_vc=2', 'revenue_gap %'), ('DLPDAVN_vc=2', 'revenue')]])
+        self.assertEqual(table_data[0][:2], [150, 60])
+        np.testing.assert_equal(table_data[0][2], [-2.5, 150])
+        # values are read back exactly
+        self.assertEqual(table_data[1][:2], [0.1, 1 / 3])
+        np.testing.assert_equal(table_data[1][2], [np.nan, np.nan])
+
+        resumed = RM_results.Result_stream(self.file_name)
+        self.assertTrue(resumed.done(0, 1))
+        self.assertFalse(resumed.done(1, 1))
+        self.assertTrue(RM_results.Result_stream(self.file_name, resume=False).read().empty)
+
+    def test_resume_evaluator(self):
+        def run(stream = None):
+            random.seed(4)
+            np.random.seed(4)
+            return RM_evaluator.LPADP_compare_K(2, 2, 2, 3, 1, [10], stream=stream)[0]
+
+        expected = run()
+        with self.assertRaises(KeyboardInterrupt):
+            run(interrupted_stream(self.file_name, 4))
+        self.assertEqual(len(RM_results.Result_stream(self.file_name).read()), 4 * 2)
+        table_data = run(RM_results.Result_stream(self.file_name))
+        for row, expected_row in zip(table_data, expected):
+            # except the planning time
+            for value, expected_value in zip(row[:-1], expected_row[:-1]):
+                np.testing.assert_allclose(value, expected_value)
+
+    def test_resume_compare_with_DLPVD(self):
+        def run(stream = None):
+            random.seed(5)
+            np.random.seed(5)
+            return RM_evaluator.compare_with_DLPVD(2, 2, 2, 3, 1, [2], [10], stream=stream)[0]
+
+        expected = run()
+        with self.assertRaises(KeyboardInterrupt):
+            run(interrupted_stream(self.file_name, 4))
+        # LPADP of the iterations skipped is solved again, so the iterations resumed sample the same requests
+        table_data = run(RM_results.Result_stream(self.file_name))
+        self.assertEqual(len(RM_results.Result_stream(self.file_name).read()), 2 * 3 * 3)
+        for row, expected_row in zip(table_data, expected):
+            for value, expected_value in zip(row, expected_row):
+                np.testing.assert_allclose(value, expected_value)
+
+    def test_online_stats(self):
+        values = np.random.RandomState(0).normal(10, 2, size=1000)
+        stats = RM_results.Online_stats(sketch_size=50)
+        for value in values[:10]:
+            stats.add(value)
+        # exact before the sketch is compacted
+        self.assertEqual(stats.quantile(0.5), np.sort(values[:10])[4])
+        self.assertEqual(stats.quantile(1), max(values[:10]))
+
+        merged = RM_results.Online_stats(sketch_size=50)
+        for value in values[10:]:
+            merged.add(value)
+        stats.merge(merged)
+        self.assertEqual(stats.n, 1000)
+        self.assertAlmostEqual(stats.mean, np.mean(values))
+        self.assertAlmostEqual(stats.variance(), np.var(values, ddof=1))
+        self.assertEqual([stats.min, stats.max], [min(values), max(values)])
+        self.assertLess(sum(len(level) for level in stats.levels), 300)
+        for q in [0.1, 0.5, 0.9]:
+            self.assertLess(abs(stats.quantile(q) - np.quantile(values, q)), 0.5)
+        self.assertAlmostEqual(stats.ci_half_width(), 1.9623 * np.std(values, ddof=1) / np.sqrt(1000), places=3)
+        self.assertTrue(np.isnan(RM_results.Online_stats().ci_half_width()))
+
+    def test_sketch_weight(self):
+        values = np.random.RandomState(1).random_sample(2000)
+        stats = RM_results.Online_stats(sketch_size=7)
+        for n in [5, 4, 3, 6, 57, 200]:
+            other = RM_results.Online_stats(sketch_size=7)
+            for value in values[:n]:
+                other.add(value)
+            stats.merge(other)
+            # every value added is accounted for once, and no level is over the sketch size
+            self.assertEqual(sum(len(level) * 2 ** h for h, level in enumerate(stats.levels)), stats.n)
+            self.assertTrue(all(len(level) <= 7 for level in stats.levels))
+
+    def test_stats_table(self):
+        table = RM_results.Stats_table()
+        table.add(0, {'DLPVD': {'revenue': 100, 'load_factor': 50.0}})
+        other = RM_results.Stats_table()
+        other.add(0, {'DLPVD': {'revenue': 200, 'load_factor': 70.0}})
+        other.add(1, {'DLPVD': {'revenue': 0.5, 'load_factor': 1.0}})
+        table.merge(other)
+        table_data = table.table(2, [('DLPVD', 'revenue'), [('DLPVD', 'load_factor'), ('LPADP', 'load_factor')]])
+        self.assertEqual(table_data[0][0], 150)
+        np.testing.assert_equal(table_data[0][1], [60, np.nan])
+        self.assertEqual(table_data[1][0], 0.5)
+        summary = table.to_dataframe()
+        self.assertEqual(list(summary['n']), [2, 2, 1, 1])
+
+    def test_evaluator_stats(self):
+        random.seed(4)
+        np.random.seed(4)
+        stats = RM_results.Stats_table()
+        table_data = RM_evaluator.LPADP_compare_K(2, 2, 2, 3, 1, [10], stats=stats)[0]
+        self.assertEqual(stats.get(1, 'LPADP_K=10', 'revenue_gap %').n, 3)
+        self.assertEqual(table_data[1][0], stats.get(1, 'DLPVD', 'revenue').mean)
+
+    def test_converged(self):
+        table = RM_results.Stats_table()
+        self.assertFalse(table.converged(0, 'revenue_gap %', 1))
+        for gap in [1.0, 1.1, 0.9]:
+            table.add(0, {'DLPVD': {'revenue': 100 * gap}, 'LPADP': {'revenue_gap %': gap}})
+        self.assertTrue(table.converged(0, 'revenue_gap %', 1))
+        self.assertFalse(table.converged(0, 'revenue_gap %', 1, min_n=4))
+        self.assertFalse(table.converged(0, 'revenue_gap %', 0.1))
+        table.add(0, {'DLPDAVN': {'revenue_gap %': 5.0}})
+        self.assertFalse(table.converged(0, 'revenue_gap %', 1))
+
+        stream = RM_results.Result_stream(self.file_name)
+        stream.write(0, 0, {'DLPVD': {'revenue': 100}, 'LPADP': {'revenue_gap %': 1.0, 'time': 2.0}})
+        stream.write(0, 1, {'DLPVD': {'revenue': 200}, 'LPADP': {'revenue_gap %': 3.0, 'time': 2.0}})
+        resumed = RM_results.Stats_table()
+        resumed.add_dataframe(stream.read())
+        self.assertEqual(list(resumed.stats.keys()), [(0, 'DLPVD', 'revenue'), (0, 'LPADP', 'revenue_gap %'),
+                                                      (0, 'LPADP', 'time')])
+        self.assertEqual(resumed.get(0, 'LPADP', 'revenue_gap %').mean, 2.0)
+
+    def test_adaptive_evaluator(self):
+        def run(ci_target, stream = None):
+            random.seed(4)
+            np.random.seed(4)
+            stats = RM_results.Stats_table()
+            RM_evaluator.LPADP_compare_K(2, 2, 2, 6, 1, [10], stream=stream, stats=stats, ci_target=ci_target,
+                                         min_iterations=3)
+            return [stats.get(problem, 'LPADP_K=10', 'revenue_gap %').n for problem in range(2)]
+
+        # stops at min_iterations with a loose target, runs the full budget with an unreachable one
+        self.assertEqual(run(10 ** 6), [3, 3])
+        self.assertEqual(run(0), [6, 6])
+
+        # resumed from a stream, the iterations written count towards the target, so nothing more is simulated
+        def run_stream():
+            random.seed(4)
+            np.random.seed(4)
+            RM_evaluator.LPADP_compare_K(2, 2, 2, 6, 1, [10], stream=RM_results.Result_stream(self.file_name),
+                                         ci_target=10 ** 6, min_iterations=3)
+            return len(RM_results.Result_stream(self.file_name).read())
+        self.assertEqual(run_stream(), 2 * 3 * 2)
+        self.assertEqual(run_stream(), 2 * 3 * 2)
+        # also when given stats to accumulate into
+        self.assertEqual(run(10 ** 6, RM_results.Result_stream(self.file_name)), [3, 3])
+        self.assertEqual(len(RM_results.Result_stream(self.file_name).read()), 2 * 3 * 2)
+
+a = RM_results_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,73 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import numpy as np
+import scipy.optimize
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM_exact
+import RM_scaling
+
+
+class RM_scaling_tests(unittest.TestCase):
+
+    def test_fit_exponent(self):
+        sizes = [1, 2, 4, 8]
+        self.assertAlmostEqual(RM_scaling.fit_exponent(sizes, [3 * s ** 2.5 for s in sizes]), 2.5)
+        self.assertTrue(np.isnan(RM_scaling.fit_exponent([2, 2], [1, 3])))
+
+    def test_count_calls(self):
+        linprog = scipy.optimize.linprog
+        with RM_scaling.count_calls() as counts:
+            scipy.optimize.linprog([1], bounds=[(0, 1)], method='highs')
+            scipy.optimize.linprog([1], bounds=[(0, 1)], method='highs')
+        self.assertEqual(counts, {'LP_solves': 2, 'DP_solves': 0})
+        # the functions are restored after the context
+        self.assertIs(scipy.optimize.linprog, linprog)
+        self.assertNotIn('wrapper', RM_exact.Network_RM.calc_value_func.__name__)
+
+    def test_peak_rss_mb(self):
+        peak = RM_scaling.peak_rss_mb()
+        self.assertGreater(peak, 0)
+        # the peak covers an array of 64MB allocated and filled in this process
+        big = np.ones(2 ** 23)
+        self.assertGreaterEqual(RM_scaling.peak_rss_mb(), max(peak, big.nbytes / 2 ** 20))
+
+    def test_sweep(self):
+        rows = RM_scaling.sweep('cap', [1, 2], ['exact_DP', 'DLPVD'], {'total_time': 5}, isolate=False)
+        self.assertEqual([(r['method'], r['value']) for r in rows],
+                         [('exact_DP', 1), ('exact_DP', 2), ('DLPVD', 1), ('DLPVD', 2)])
+        self.assertEqual([r['n_states'] for r in rows], [16, 81, 16, 81])
+        self.assertEqual([r['DP_solves'] for r in rows], [1, 1, 0, 0])
+        self.assertTrue(all(r['LP_solves'] > 0 for r in rows[2:]))
+        self.assertTrue(all(r['wall_time'] > 0 for r in rows))
+
+        with self.assertRaises(ValueError):
+            RM_scaling.sweep('unknown', [1, 2])
+
+    def test_sweep_isolated(self):
+        # each point is measured in a new worker process, with the peak RSS of that process
+        if __name__ == '__mp_main__':
+            # the spawned worker imports this script again when it is run directly
+            self.skipTest('in a worker process')
+        rows = RM_scaling.sweep('cap', [1], ['exact_DP'], {'total_time': 5})
+        self.assertEqual([(r['method'], r['value'], r['n_states'], r['DP_solves']) for r in rows],
+                         [('exact_DP', 1, 16, 1)])
+        self.assertGreater(rows[0]['peak_rss_mb'], 0)
+
+a = RM_scaling_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
@@ -0,0 +1,64 @@
+
+# coding: utf-8
+
+# In[1]:
+
+import unittest
+
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import RM
+
+
+class RM_single_DCM_tests(unittest.TestCase):
+
+    # test data, ref: section 2.6.2.1 and 2.6.2.5
+    test_products = [['Y', 800], ['M',500], ['K',450]]
+    test_sets = [[0.3, 0, 0], [0, 0.4, 0], [0, 0, 0.5], [0.1, 0.6, 0], [0.3,0,0.5], [0,0.4,0.5], [0.1, 0.4,0.5]]
+    test_marginal_values = [780, 624, 520, 445.71, 390,346.67, 312.00, 283.64, 260.00, 
+                            240,222.86,208,195,183.53,173.33,164.21,156,148.57,141.82,135.65]
+    test_efficient_sets = [['Y', 0.3, 240], ['YK', 0.8, 465], ['YMK', 1, 505]]
+
+    def test_efficient_sets_hull(self):
+        efficient_sets = RM.efficient_sets_hull(self.test_products, self.test_sets)
+        expected_efficient_sets = RM.efficient_sets(self.test_products, self.test_sets)
+        self.assertEqual([s[0] for s in efficient_sets], [s[0] for s in expected_efficient_sets])
+        np.testing.assert_almost_equal([s[1:] for s in efficient_sets], [s[1:] for s in expected_efficient_sets])
+        np.testing.assert_almost_equal([s[1:] for s in efficient_sets], [s[1:] for s in self.test_efficient_sets])
+
+    def test_optimal_sets_for_capacities(self):
+        marginal_values = self.test_marginal_values + [800, 2000]
+        optimal_sets = RM.optimal_sets_for_capacities(self.test_efficient_sets, marginal_values)
+        self.assertEqual(optimal_sets, RM.optimal_set_for_capacity(self.test_efficient_sets, marginal_values))
+        self.assertEqual(optimal_sets[-1], -1)
+        np.testing.assert_equal(RM.optimal_set_indices([0.3, 0.8, 1], [240, 465, 505], [600, 300, 100]), [0, 1, 2])
+        np.testing.assert_equal(RM.optimal_set_indices([], [], [600, 300]), [-1, -1])
+
+    def test_SINGLE_value_function_vectorized(self):
+        expected_values = RM.SINGLE_value_function(self.test_efficient_sets, 20, 30, 0.5)
+        values = RM.SINGLE_value_function_vectorized(self.test_efficient_sets, 20, 30, 0.5, 3)
+        # values are rounded in every period in both, but rounding ties can go either way
+        np.testing.assert_allclose(values, expected_values, atol=0.01)
+
+        # optimal sets are searched in all sets, if the sets are not efficient
+        sets = [['Y', 0.3, 240], ['M', 0.4, 200], ['K', 0.5, 225], ['YM', 0.7, 380], ['YK', 0.8, 465],
+                ['MK', 0.9, 425], ['YMK', 1, 505]]
+        exact_values = RM.SINGLE_value_function_vectorized(self.test_efficient_sets, 20, 30, 0.5)
+        np.testing.assert_almost_equal(RM.SINGLE_value_function_vectorized(sets, 20, 30, 0.5), exact_values)
+        np.testing.assert_almost_equal(RM.SINGLE_value_function_vectorized(self.test_efficient_sets, 20, 30, 0.5,
+                                                                           full=False), exact_values[0])
+        np.testing.assert_equal(RM.SINGLE_value_function_vectorized([[]], 4, 2, 0.5), np.zeros((3, 5)))
+
+a = RM_single_DCM_tests()
+suite = unittest.TestLoader().loadTestsFromModule(a)
+unittest.TextTestRunner().run(suite)
+
+
+# In[ ]:
+
+
+
+
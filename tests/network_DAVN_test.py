@@ -7,9 +7,10 @@ import unittest
 
 import numpy as np
 
+import os
 import sys
-sys.path.append('/Users/jshan/Desktop/RevenueManagement')
-from src import network_DAVN
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import network_DAVN
 
 
 class network_DAVN_tests(unittest.TestCase):
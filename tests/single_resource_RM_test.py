@@ -40,6 +40,51 @@ class singleResource_DCM_tests(unittest.TestCase):
         optimal_protection_levels = singleResource_DCM.optimal_protection_levels(effi_sets, self.test_marginal_values)
         expected_optimal_protection_levels = [3, 12, 20]
         np.testing.assert_equal(optimal_protection_levels, expected_optimal_protection_levels)
+
+    def test_efficient_sets_hull(self):
+        sets= [[0.3, 0, 0], [0, 0.4, 0], [0, 0, 0.5], [0.1, 0.6, 0], [0.3,0,0.5], [0,0.4,0.5], [0.1, 0.4,0.5]]
+        efficient_sets = singleResource_DCM.efficient_sets_hull(self.test_products, sets)
+        expected_efficient_sets = singleResource_DCM.efficient_sets(self.test_products, sets)
+        self.assertEqual([s[0] for s in efficient_sets], [s[0] for s in expected_efficient_sets])
+        np.testing.assert_almost_equal([s[1:] for s in efficient_sets], [s[1:] for s in expected_efficient_sets])
+
+        # sets of a multinomial logit model, with all subsets of 5 products
+        np.random.seed(0)
+        products = [[str(i), fare] for i, fare in enumerate(np.random.randint(50, 1000, 5))]
+        weights = np.random.rand(5)
+        sets = []
+        for code in range(1, 2 ** 5):
+            offered = np.array([(code >> i) & 1 for i in range(5)])
+            sets.append(offered * weights / (1 + offered.dot(weights)))
+        efficient_sets = singleResource_DCM.efficient_sets_hull(products, sets)
+        expected_efficient_sets = singleResource_DCM.efficient_sets(products, sets)
+        self.assertEqual([s[0] for s in efficient_sets], [s[0] for s in expected_efficient_sets])
+        np.testing.assert_almost_equal([s[1:] for s in efficient_sets], [s[1:] for s in expected_efficient_sets])
+
+    def test_optimal_sets_for_capacities(self):
+        effi_sets = [['Y', 0.3, 240], ['YK', 0.8, 465], ['YMK', 1, 505]]
+        marginal_values = self.test_marginal_values + [800, 2000]
+        optimal_sets = singleResource_DCM.optimal_sets_for_capacities(effi_sets, marginal_values)
+        expected_optimal_sets = singleResource_DCM.optimal_set_for_capacity(effi_sets, marginal_values)
+        self.assertEqual(optimal_sets, expected_optimal_sets)
+        self.assertEqual(optimal_sets[-1], -1)
+
+    def test_calc_value_function_vectorized(self):
+        effi_sets = [['Y', 0.3, 240], ['YK', 0.8, 465], ['YMK', 1, 505]]
+        expected_values = singleResource_DCM.calc_value_function(effi_sets, 20, 30, 0.5)
+        values = singleResource_DCM.calc_value_function_vectorized(effi_sets, 20, 30, 0.5, 3)
+        # values are rounded in every period in both, but rounding ties can go either way
+        np.testing.assert_allclose(values, expected_values, atol=0.01)
+
+        # optimal sets are searched in all sets, if the sets are not efficient
+        sets = [['Y', 0.3, 240], ['M', 0.4, 200], ['K', 0.5, 225], ['YM', 0.7, 380], ['YK', 0.8, 465],
+                ['MK', 0.9, 425], ['YMK', 1, 505]]
+        exact_values = singleResource_DCM.calc_value_function_vectorized(effi_sets, 20, 30, 0.5)
+        np.testing.assert_almost_equal(singleResource_DCM.calc_value_function_vectorized(sets, 20, 30, 0.5),
+                                       exact_values)
+        np.testing.assert_almost_equal(singleResource_DCM.calc_value_function_vectorized(effi_sets, 20, 30, 0.5,
+                                                                                         full=False),
+                                       exact_values[0])
         
 a = singleResource_DCM_tests()
 suite = unittest.TestLoader().loadTestsFromModule(a)